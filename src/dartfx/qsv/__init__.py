@@ -2,18 +2,42 @@
 #
 # SPDX-License-Identifier: MIT
 
-from dartfx.qsv.utils import (
-    convert_stat_file_to_csv,
-    export_stat_metadata_to_json,
-    generate_ddi_codebook,
-    generate_sql,
-    read_stat_metadata,
-)
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from dartfx.qsv.load import load_sqlite
+    from dartfx.qsv.utils import (
+        convert_stat_file_to_csv,
+        export_stat_metadata_to_json,
+        generate_ddi_codebook,
+        generate_sql,
+        profile_once,
+        read_stat_metadata,
+        write_ddi_codebook,
+        write_sql,
+    )
 
 __all__ = [
     "generate_ddi_codebook",
+    "write_ddi_codebook",
     "generate_sql",
+    "write_sql",
+    "load_sqlite",
+    "profile_once",
     "convert_stat_file_to_csv",
     "export_stat_metadata_to_json",
     "read_stat_metadata",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # The exports are imported on first use, so that importing a submodule (such as the CLI
+    # or the socket client) does not import pydantic and the modelling code
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+
+    module = importlib.import_module("dartfx.qsv.load" if name == "load_sqlite" else "dartfx.qsv.utils")
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
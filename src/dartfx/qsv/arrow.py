@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# pyarrow is an optional dependency: pip install 'dartfx-qsv[arrow]'
+def _require_pyarrow() -> Any:
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError(
+            "Loading qsv results into pandas through Arrow requires pyarrow. "
+            "Install it with `pip install 'dartfx-qsv[arrow]'` or `pip install pyarrow`."
+        ) from e
+    return pyarrow
+
+
+def table_to_pandas(table: Any) -> pd.DataFrame:
+    """Convert a pyarrow Table to a pandas DataFrame whose columns wrap the Arrow arrays (no copy)."""
+    import pandas as pd
+
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def read_arrow_ipc(path: str | os.PathLike[str], memory_map: bool = True) -> pd.DataFrame:
+    """
+    Load an Arrow IPC file (e.g. written by `qsv sqlp --format arrow`) into pandas.
+    With `memory_map`, the DataFrame's buffers are backed by the mapped file: the file
+    must be uncompressed for this to be zero-copy.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.ipc
+
+    # The source is not closed here: the table's buffers may point into the mapping
+    source = pa.memory_map(os.fspath(path), "r") if memory_map else pa.OSFile(os.fspath(path), "r")
+    return table_to_pandas(pyarrow.ipc.open_file(source).read_all())
+
+
+def read_parquet(path: str | os.PathLike[str]) -> pd.DataFrame:
+    """Load a Parquet file (e.g. written by `qsv to parquet` or `qsv sqlp --format parquet`) into pandas."""
+    _require_pyarrow()
+    import pyarrow.parquet
+
+    return table_to_pandas(pyarrow.parquet.read_table(os.fspath(path), memory_map=True))
+
+
+def read_csv_buffer(data: bytes | memoryview, delimiter: str = ",") -> pd.DataFrame:
+    """
+    Parse CSV output held in memory with Arrow's multi-threaded CSV reader, without
+    decoding it to a Python string first. The buffer is wrapped, not copied.
+    """
+    pa = _require_pyarrow()
+    import pyarrow.csv
+
+    buffer = pa.py_buffer(data)
+    parse_options = pyarrow.csv.ParseOptions(delimiter=delimiter)
+    return table_to_pandas(pyarrow.csv.read_csv(pa.BufferReader(buffer), parse_options=parse_options))
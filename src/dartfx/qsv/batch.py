@@ -0,0 +1,361 @@
+from __future__ import annotations
+
+import copy
+import os
+import subprocess
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+from dartfx.qsv.cmd import JOBS_COMMANDS, QSVCommand
+from dartfx.qsv.model import CSV_EXTENSIONS, DataFile, DataProduct, QsvProfile
+from dartfx.qsv.runtime import available_cpus
+
+# qsv processes `profile_once` runs at the same time for one file: stats, frequency and
+# count (or schema, when it reuses a fresh stats cache)
+PROFILE_CONCURRENCY = 3
+
+
+class BatchResult(BaseModel):
+    """Outcome of running a command over one input of a batch."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    input: str
+    size: int
+    jobs: int | None = None
+    output: Any = None
+    returncode: int = 0
+    error: str | None = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class BatchExecutor:
+    """
+    Runs one `QSVCommand` over many input files in parallel.
+
+    Inputs are scheduled largest first (longest-processing-time ordering), which keeps the
+    big files from straggling at the end of the batch. At most `max_workers` qsv processes
+    run at a time and, for commands that accept `--jobs`, the machine's CPUs are split
+    between them so the total stays within the CPU count.
+
+    Example:
+        >>> for result in BatchExecutor(Stats(infer_dates=True)).run(csv_files):
+        ...     print(result.input, result.ok, result.elapsed)
+    """
+
+    def __init__(
+        self,
+        command: QSVCommand,
+        max_workers: int | None = None,
+        cpus: int | None = None,
+        sink: Any = None,
+        output_for: Callable[[str], str | os.PathLike[str]] | None = None,
+    ):
+        """
+        Args:
+            command: The command to run over each input.
+            max_workers: Maximum number of concurrent qsv processes.
+                Defaults to the number of CPUs, capped by the number of inputs.
+            cpus: Number of CPUs to share between the processes. Defaults to `available_cpus()`.
+            sink: Passed to `QSVCommand.run` for every input (e.g. `bytes`).
+            output_for: Maps an input path to an output path, as an alternative to `sink`.
+        """
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be a positive integer.")
+        self.command = command
+        self.max_workers = max_workers
+        self.cpus = cpus or available_cpus()
+        self.sink = sink
+        self.output_for = output_for
+
+    def plan(self, inputs: Iterable[str | os.PathLike[str]]) -> tuple[list[tuple[str, int]], int, int | None]:
+        """
+        Returns the schedule for the given inputs: the (path, size) pairs in execution
+        order, the number of workers, and the `--jobs` value given to each process.
+        """
+        sized = []
+        for item in inputs:
+            path = os.fspath(item)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = 0
+            sized.append((path, size))
+        sized.sort(key=lambda pair: pair[1], reverse=True)
+        workers = min(self.max_workers or self.cpus, max(1, len(sized)))
+        jobs = None
+        if self.command.command in JOBS_COMMANDS and self.command.params.get("jobs") is None:
+            jobs = max(1, self.cpus // workers)
+        return sized, workers, jobs
+
+    def _run_one(self, command: QSVCommand, path: str, size: int, jobs: int | None) -> BatchResult:
+        sink = self.output_for(path) if self.output_for else self.sink
+        start = time.perf_counter()
+        result = BatchResult(input=path, size=size, jobs=jobs)
+        try:
+            result.output = command.run(path, sink=sink) if sink is not None else command.run(path)
+        except subprocess.CalledProcessError as e:
+            result.returncode = e.returncode
+            result.error = (e.stderr or str(e)).strip()
+        except Exception as e:
+            result.returncode = -1
+            result.error = str(e)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def run(self, inputs: Iterable[str | os.PathLike[str]]) -> Iterator[BatchResult]:
+        """
+        Run the command over every input, yielding each `BatchResult` as soon as it completes.
+        Failures are reported in the results instead of being raised. Closing the iterator
+        early cancels the inputs that have not started yet.
+        """
+        sized, workers, jobs = self.plan(inputs)
+        command = self.command
+        if jobs is not None:
+            command = copy.copy(self.command)
+            command.params = {**self.command.params, "jobs": jobs}
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qsv-batch")
+        try:
+            # The pool's work queue is FIFO, so submitting in schedule order preserves it
+            pending: set[Future[BatchResult]] = {
+                executor.submit(self._run_one, command, path, size, jobs) for path, size in sized
+            }
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _init_product_worker(jobs: int | None) -> None:
+    # qsv reads its default --jobs from QSV_MAX_JOBS, which splits the CPUs between the workers
+    if jobs is not None:
+        os.environ["QSV_MAX_JOBS"] = str(jobs)
+
+
+def _profile_product_file(
+    path: str, artifact_base: str | None, options: dict[str, Any], keep_profile: bool
+) -> tuple[list[str], QsvProfile | None]:
+    """Profiles one file of a product and writes its artifacts (run in a worker process)."""
+    from dartfx.qsv.utils import generate_sql, profile_once, write_ddi_codebook
+
+    profile = profile_once(path, **options["profile"])
+    outputs = []
+    if artifact_base is not None:
+        os.makedirs(os.path.dirname(artifact_base) or ".", exist_ok=True)
+        for version in options["ddi_versions"]:
+            output = f"{artifact_base}.ddi-{version}.xml"
+            write_ddi_codebook(output, version=version, profile=profile)
+            outputs.append(output)
+        for flavor in options["flavors"]:
+            output = f"{artifact_base}.{flavor}.sql"
+            generate_sql(flavor=flavor, output_sql_path=output, profile=profile, **options["sql"])
+            outputs.append(output)
+    return outputs, profile if keep_profile else None
+
+
+class ProductBatch:
+    """
+    Generates DDI codebooks and SQL scripts for every delimited file of a `DataProduct`.
+
+    Files are discovered under the product root (see `DataProduct.data_files`) and profiled
+    with `profile_once` in a pool of worker processes, largest first like `BatchExecutor`.
+    At most `max_workers` files are profiled at a time. As each profile runs up to
+    `PROFILE_CONCURRENCY` qsv processes at once, the CPUs are split between all of them
+    through `QSV_MAX_JOBS` (at least one job each), and the default number of workers keeps
+    the total within the CPU count.
+
+    Each file gets `<stem>.ddi-<version>.xml` and `<stem>.<flavor>.sql` in the output
+    directory, at the file's path relative to the root. With `single_codebook`, one
+    `<product>.ddi-<version>.xml` codebook is written instead, with a `<fileDscr>` per file.
+    Its variables are linked to their files. The profiles are then kept until the end of
+    the batch.
+
+    Example:
+        >>> batch = ProductBatch(DataProduct(root="/data/census"), flavors=["postgres"])
+        >>> for result in batch.run():
+        ...     print(result.input, result.ok, result.output)
+    """
+
+    def __init__(
+        self,
+        product: DataProduct,
+        output_dir: str | os.PathLike[str] | None = None,
+        ddi_versions: Iterable[str] = ("2.6",),
+        flavors: Iterable[str] = (),
+        single_codebook: bool = False,
+        max_workers: int | None = None,
+        cpus: int | None = None,
+        processes: bool = True,
+        extensions: tuple[str, ...] = CSV_EXTENSIONS,
+        categorical_threshold: int = 20,
+        speculative_frequency: bool = False,
+        schema_name: str | None = None,
+    ):
+        """
+        Args:
+            product: The data product to document.
+            output_dir: Directory for the artifacts. Defaults to the product root.
+            ddi_versions: DDI-Codebook versions to generate.
+            flavors: SQL flavors to generate scripts for (not with `single_codebook`).
+            single_codebook: Write one codebook for the whole product instead of one per file.
+            max_workers: Maximum number of files profiled at a time.
+                Defaults to the number of CPUs divided by `PROFILE_CONCURRENCY` (at least 1),
+                capped by the number of files.
+            cpus: Number of CPUs to share between the workers. Defaults to `available_cpus()`.
+            processes: Profile in worker processes; with False, threads of this process are
+                used and `QSV_MAX_JOBS` is not set.
+            extensions: Extensions of the files to document.
+            categorical_threshold, speculative_frequency: See `generate_ddi_codebook`.
+            schema_name: Database schema of the SQL tables.
+        """
+        from dartfx.qsv.utils import SQL_FLAVORS, _check_ddi_version
+
+        if max_workers is not None and max_workers < 1:
+            raise ValueError("max_workers must be a positive integer.")
+        self.ddi_versions = list(dict.fromkeys(ddi_versions))
+        for version in self.ddi_versions:
+            _check_ddi_version(version)
+        self.flavors = list(dict.fromkeys(flavor.lower() for flavor in flavors))
+        unsupported = [flavor for flavor in self.flavors if flavor not in SQL_FLAVORS]
+        if unsupported:
+            raise ValueError(f"Unsupported flavors {unsupported}. Supported: {', '.join(SQL_FLAVORS)}.")
+        if single_codebook and self.flavors:
+            raise ValueError("SQL scripts are generated per file, not with single_codebook.")
+        self.product = product
+        self.output_dir = os.fspath(output_dir) if output_dir is not None else product.root
+        self.single_codebook = single_codebook
+        self.max_workers = max_workers
+        self.cpus = cpus or available_cpus()
+        self.processes = processes
+        self.extensions = extensions
+        self.options = {
+            "profile": {"categorical_threshold": categorical_threshold, "speculative_frequency": speculative_frequency},
+            "ddi_versions": self.ddi_versions,
+            "flavors": self.flavors,
+            "sql": {"schema_name": schema_name},
+        }
+        self.codebooks: list[str] = []  # the product codebooks written by the last run
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(os.path.normpath(self.product.root)) or "product"
+
+    def files(self) -> list[DataFile]:
+        return list(self.product.data_files(self.extensions))
+
+    def _relative_path(self, datafile: DataFile) -> str:
+        return os.path.normpath(os.path.join(datafile.subpath, datafile.name))
+
+    def _artifact_base(self, datafile: DataFile) -> str:
+        return os.path.join(self.output_dir, datafile.subpath, datafile.stem)
+
+    def plan(self, files: list[DataFile] | None = None) -> tuple[list[tuple[DataFile, int]], int, int | None]:
+        """
+        Returns the schedule for the files of the product (or the given files): the (file, size)
+        pairs in execution order, the number of workers, and the `QSV_MAX_JOBS` value of each worker.
+        """
+        files = self.files() if files is None else files
+        sized = []
+        for datafile in files:
+            try:
+                size = os.path.getsize(datafile.filepath)
+            except OSError:
+                size = 0
+            sized.append((datafile, size))
+        sized.sort(key=lambda pair: pair[1], reverse=True)
+        workers = min(self.max_workers or max(1, self.cpus // PROFILE_CONCURRENCY), max(1, len(sized)))
+        jobs = max(1, self.cpus // (workers * PROFILE_CONCURRENCY)) if self.processes else None
+        return sized, workers, jobs
+
+    def run(self, files: list[DataFile] | None = None) -> Iterator[BatchResult]:
+        """
+        Profile every file (or the given files of the product), yielding a `BatchResult` as each
+        one completes: its `output` is the list of artifacts written. Failures are reported in the
+        results instead of being raised.
+        With `single_codebook`, the product codebooks are written once every file is done, from
+        the files that succeeded, and their paths are stored in `codebooks`.
+        """
+        files = self.files() if files is None else files
+        sized, workers, jobs = self.plan(files)
+
+        executor: Executor
+        if self.processes:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_product_worker, initargs=(jobs,))
+        else:
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qsv-product")
+        profiles: dict[str, QsvProfile] = {}
+        self.codebooks = []
+        try:
+            futures: dict[Future[tuple[list[str], QsvProfile | None]], tuple[DataFile, int, float]] = {}
+            for datafile, size in sized:
+                future = executor.submit(
+                    _profile_product_file,
+                    datafile.filepath,
+                    None if self.single_codebook else self._artifact_base(datafile),
+                    self.options,
+                    self.single_codebook,
+                )
+                futures[future] = (datafile, size, time.perf_counter())
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    datafile, size, start = futures[future]
+                    result = BatchResult(input=datafile.filepath, size=size, jobs=jobs)
+                    try:
+                        result.output, profile = future.result()
+                    except Exception as e:
+                        result.returncode = getattr(e, "returncode", -1)
+                        result.error = (getattr(e, "stderr", None) or str(e) or type(e).__name__).strip()
+                    else:
+                        if profile is not None:
+                            profiles[datafile.filepath] = profile
+                    result.elapsed = time.perf_counter() - start
+                    yield result
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        if self.single_codebook:
+            self._write_codebooks([datafile for datafile in files if datafile.filepath in profiles], profiles)
+
+    def _write_codebooks(self, files: list[DataFile], profiles: dict[str, QsvProfile]) -> None:
+        from dartfx.qsv.utils import _write_ddi_codebook
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        for version in self.ddi_versions:
+            path = os.path.join(self.output_dir, f"{self.name}.ddi-{version}.xml")
+            with open(path, "w", encoding="utf-8") as f:
+                _write_ddi_codebook(
+                    f,
+                    [profiles[datafile.filepath] for datafile in files],
+                    version,
+                    title=self.name,
+                    file_names=[self._relative_path(datafile) for datafile in files],
+                )
+            self.codebooks.append(path)
+
+
+def failure_report(results: Iterable[BatchResult]) -> dict[str, Any]:
+    """Summarizes batch results: the number of inputs that succeeded and failed, and the error of each failure."""
+    results = list(results)
+    failures = [
+        {"input": result.input, "returncode": result.returncode, "error": result.error}
+        for result in results
+        if not result.ok
+    ]
+    return {
+        "total": len(results),
+        "succeeded": len(results) - len(failures),
+        "failed": len(failures),
+        "failures": failures,
+    }
@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import contextlib
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Future
+from typing import Any
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import Blake3, QSVCommand
+from dartfx.qsv.runtime import get_runtime
+
+try:  # POSIX only, used to serialise writers sharing a cache directory
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+# Commands whose output is not a pure function of their arguments and input files,
+# or whose useful result is a side effect (files written next to the input).
+UNCACHEABLE_COMMANDS = frozenset(
+    {
+        "clipboard",
+        "describegpt",
+        "fetch",
+        "fetchpost",
+        "foreach",
+        "geocode",
+        "index",
+        "lens",
+        "log",
+        "partition",
+        "pro",
+        "prompt",
+        "split",
+        "to",
+    }
+)
+
+# Commands that are deterministic only when given a random seed
+SEEDED_COMMANDS = frozenset({"sample", "synthesize"})
+
+# Options that make a command write files (an output file, or the stats cache sidecars
+# written next to the input), which a cache hit would not write
+FILE_WRITING_PARAMS = frozenset({"output", "stats_jsonl", "cache_threshold"})
+
+
+def _default_cache_dir() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "dartfx-qsv", "results")
+
+
+class ResultCache:
+    """
+    Content-addressed, on-disk cache of qsv command outputs.
+
+    Entries are keyed by the qsv version, the command name, its normalised arguments and a
+    fingerprint of every input file: (device, inode, size, mtime) by default, or the file's
+    BLAKE3 hash computed with `qsv blake3` when `fingerprint="blake3"`.
+
+    The directory can be shared by several processes: entries are written atomically
+    (temporary file + rename), and writers take an exclusive lock on the directory while
+    evicting least recently used entries to keep the total size under `max_bytes`.
+    Within one process, concurrent identical requests are coalesced into a single qsv run.
+
+    Example:
+        >>> cache = ResultCache(max_bytes=512 * 1024**2)
+        >>> stats_csv = cache.run(Stats(infer_dates=True), "data.csv")
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str] | None = None,
+        max_bytes: int = 1024**3,
+        fingerprint: str = "stat",
+    ):
+        if fingerprint not in ("stat", "blake3"):
+            raise ValueError("fingerprint must be 'stat' or 'blake3'.")
+        self.directory = os.fspath(directory) if directory is not None else _default_cache_dir()
+        self.max_bytes = max_bytes
+        self.fingerprint_mode = fingerprint
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future[bytes]] = {}
+        self._blake3: dict[tuple[int, int, int, int], Future[str]] = {}
+        self._approx_size: int | None = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def fingerprint(self, path: str) -> dict[str, Any]:
+        """Returns the fingerprint of an input file."""
+        st = os.stat(path)
+        identity = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        if self.fingerprint_mode == "stat":
+            return {"dev": st.st_dev, "ino": st.st_ino, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        # Single flight, as in _fetch: concurrent misses on a file wait for one `qsv blake3` run
+        with self._lock:
+            future = self._blake3.get(identity)
+            leader = future is None
+            if future is None:
+                future = self._blake3[identity] = Future()
+        if not leader:
+            return {"blake3": future.result()}
+        try:
+            # Bypass QSVCommand.run(), which may itself be routed through this cache
+            blake3 = Blake3(no_names=True)
+            output = qsv_cmd._run_qsv_command(blake3.command, blake3._build_args(path))
+            digest = output.split()[0]
+        except BaseException as e:
+            with self._lock:
+                del self._blake3[identity]  # a later call tries again
+            future.set_exception(e)
+            raise
+        future.set_result(digest)
+        return {"blake3": digest}
+
+    @staticmethod
+    def is_cacheable(command: QSVCommand) -> bool:
+        if command.command in UNCACHEABLE_COMMANDS:
+            return False
+        if any(command.params.get(param) for param in FILE_WRITING_PARAMS):
+            return False  # a hit would not write the files
+        if command.command in SEEDED_COMMANDS:
+            return command.params.get("seed") is not None
+        return True
+
+    def key(self, command: QSVCommand, *inputs: str | None) -> str | None:
+        """Returns the cache key of a command invocation, or None if it cannot be cached."""
+        if not self.is_cacheable(command):
+            return None
+        # Normalise the flags so that keyword order does not matter
+        normalised = copy.copy(command)
+        normalised.params = dict(sorted(command.params.items()))
+        args: list[Any] = []
+        for arg in normalised._build_args(*inputs):
+            args.append({"file": self.fingerprint(arg)} if os.path.isfile(arg) else arg)
+        payload = {"qsv": get_runtime().version, "command": command.command, "args": args}
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> bytes | None:
+        """Returns the cached output for `key`, or None. A hit refreshes the entry's LRU position."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return data
+
+    @contextlib.contextmanager
+    def _locked(self) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, ".lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an output under `key`, evicting least recently used entries if over `max_bytes`."""
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+        with self._lock:
+            if self._approx_size is not None:
+                self._approx_size += len(data)
+            if self._approx_size is None or self._approx_size > self.max_bytes:
+                with self._locked():
+                    self._approx_size = self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                with contextlib.suppress(FileNotFoundError):
+                    st = entry.stat()
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def _evict(self) -> int:
+        """
+        Delete the least recently used entries until the cache fits. Returns the new total size.
+        Eviction goes down to 90% of `max_bytes` so that the directory is not rescanned on every put.
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return total
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+        return total
+
+    def size(self) -> int:
+        """Total size in bytes of the cached entries."""
+        return sum(size for _, size, _ in self._entries())
+
+    def clear(self) -> None:
+        """Delete every cached entry."""
+        with self._lock, self._locked():
+            for _, _, path in self._entries():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+            self._approx_size = 0
+
+    def _fetch(self, command: QSVCommand, inputs: tuple[str | None, ...], key: str) -> bytes:
+        """Single-flight lookup: the first caller for a key runs qsv, concurrent callers wait for it."""
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if future is None:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self.hits += 1
+            return future.result()
+        try:
+            data = self.get(key)
+            if data is None:
+                self.misses += 1
+                command._prepare_inputs(*inputs)
+                data = qsv_cmd._run_qsv_command(command.command, command._build_args(*inputs), sink=bytes)
+                self.put(key, data)
+            else:
+                self.hits += 1
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def run(self, command: QSVCommand, *inputs: str | None, sink: Any = None) -> Any:
+        """
+        Cached counterpart of `command.run(*inputs)`. Commands that cannot be cached are run directly.
+        `sink` may be None (decoded text), `bytes` or `memoryview`.
+        """
+        if sink not in (None, bytes, memoryview):
+            raise ValueError("ResultCache.run only supports the text, bytes and memoryview sinks.")
+        key = self.key(command, *inputs)
+        if key is None:
+            command._prepare_inputs(*inputs)
+            return qsv_cmd._run_qsv_command(command.command, command._build_args(*inputs), sink=sink)
+        data = self._fetch(command, inputs, key)
+        if sink is bytes:
+            return data
+        if sink is memoryview:
+            return memoryview(data)
+        return qsv_cmd._decode_text(data)
+
+
+def enable_result_cache(cache: ResultCache | None = None) -> ResultCache:
+    """
+    Route every cacheable `QSVCommand.run()` call of this process through a `ResultCache`
+    (a default one if not given). This includes the runs made by `generate_ddi_codebook`
+    and `generate_sql`.
+    """
+    cache = cache or ResultCache()
+    qsv_cmd._result_cache = cache
+    return cache
+
+
+def disable_result_cache() -> None:
+    """Stop routing `QSVCommand.run()` calls through the result cache."""
+    qsv_cmd._result_cache = None
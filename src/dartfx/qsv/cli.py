@@ -1,10 +1,13 @@
 from __future__ import annotations
 
+import sys
 from pathlib import Path
+from typing import Any
 
 import typer
 
-from dartfx.qsv.utils import generate_ddi_codebook, generate_sql
+# The modules doing the work (and pydantic) are imported by the commands that need them, so
+# that a request sent to a `serve` daemon with --socket does not pay for importing them
 
 app = typer.Typer(help="Dartfx CLI for QSV tools.")
 
@@ -17,6 +20,34 @@ def main() -> None:
     pass
 
 
+def _split_values(values: list[str] | None) -> list[str] | None:
+    """Flatten options that can be given several times and/or as comma-separated values."""
+    if not values:
+        return None
+    return [v.strip() for value in values for v in value.split(",") if v.strip()]
+
+
+def _run_on_server(socket_path: Path, op: str, output: Path | None, error_prefix: str, **params: Any) -> None:
+    """Send a request to a profiling daemon and print or write its result."""
+    from dartfx.qsv.server import ProfileClient
+
+    # The daemon has its own working directory, so paths are sent absolute
+    params = {
+        key: str(value.resolve()) if isinstance(value, Path) else value
+        for key, value in params.items()
+        if value is not None
+    }
+    try:
+        content = ProfileClient(socket_path).request(op, **params)
+        if output:
+            output.write_text(content, encoding="utf-8")
+        else:
+            typer.echo(content)
+    except Exception as e:
+        typer.echo(f"{error_prefix}: {e}", err=True)
+        raise typer.Exit(code=1) from e
+
+
 @app.command()
 def toddic(
     csv_path: Path = typer.Argument(
@@ -79,34 +110,58 @@ def toddic(
         dir_okay=False,
         readable=True,
     ),
+    speculative_frequency: bool = typer.Option(
+        False,
+        "--speculative-frequency",
+        help="Start frequency on likely categorical columns while stats is still running.",
+    ),
+    socket_path: Path | None = typer.Option(
+        None,
+        "--socket",
+        envvar="DARTFX_QSV_SOCKET",
+        help="Send the request to a `dartfx-qsv serve` daemon listening on this Unix socket.",
+    ),
 ) -> None:
     """
     Generate a DDI-Codebook XML document from a CSV file using QSV outputs.
     """
     # Parse categorical columns, allowing comma-separated values in addition to multiple flags
-    flat_categorical_columns: list[str] | None = None
-    if categorical_column:
-        flat_categorical_columns = []
-        for col in categorical_column:
-            if "," in col:
-                flat_categorical_columns.extend(c.strip() for c in col.split(",") if c.strip())
-            else:
-                if col.strip():
-                    flat_categorical_columns.append(col.strip())
+    flat_categorical_columns = _split_values(categorical_column)
+
+    if socket_path is not None:
+        _run_on_server(
+            socket_path,
+            "toddic",
+            output,
+            "Error generating DDI codebook",
+            csv_path=csv_path,
+            stats_data=stats_data,
+            schema_data=schema_data,
+            frequency_data=frequency_data,
+            version=ddi_version,
+            categorical_threshold=categorical_threshold,
+            categorical_columns=flat_categorical_columns,
+            speculative_frequency=speculative_frequency,
+        )
+        return
+
+    from dartfx.qsv.utils import write_ddi_codebook
 
     try:
-        xml_content = generate_ddi_codebook(
+        # The codebook is written one variable at a time rather than built in memory
+        write_ddi_codebook(
+            output or sys.stdout,
             csv_path=csv_path,
             stats_data=stats_data,
             schema_data=schema_data,
             frequency_data=frequency_data,
             version=ddi_version,
-            output_xml_path=output,
             categorical_threshold=categorical_threshold,
             categorical_columns=flat_categorical_columns,
+            speculative_frequency=speculative_frequency,
         )
         if not output:
-            typer.echo(xml_content)
+            sys.stdout.write("\n")
     except Exception as e:
         typer.echo(f"Error generating DDI codebook: {e}", err=True)
         raise typer.Exit(code=1) from e
@@ -129,13 +184,14 @@ def tosql(
         help="Path to write the generated SQL script. If not specified, outputs to stdout.",
         writable=True,
     ),
-    flavor: str = typer.Option(
-        "postgres",
+    flavor: str | None = typer.Option(
+        None,
         "--flavor",
         "-f",
         help=(
             "Database flavor ('postgres', 'sqlite', 'mysql', 'mssql', 'oracle', "
-            "'clickhouse', 'duckdb', 'snowflake', 'bigquery', 'redshift', 'mariadb')."
+            "'clickhouse', 'duckdb', 'snowflake', 'bigquery', 'redshift', 'mariadb'). "
+            "Defaults to 'postgres', or 'sqlite' with --load."
         ),
     ),
     table: str | None = typer.Option(
@@ -183,12 +239,118 @@ def tosql(
         "-pk",
         help="Primary key column name(s). For composite keys, use comma-separated names.",
     ),
+    socket_path: Path | None = typer.Option(
+        None,
+        "--socket",
+        envvar="DARTFX_QSV_SOCKET",
+        help="Send the request to a `dartfx-qsv serve` daemon listening on this Unix socket.",
+    ),
+    load: Path | None = typer.Option(
+        None,
+        "--load",
+        help=(
+            "Create the table in this SQLite database and load the CSV file into it. "
+            "The SQL script is then only written if --output is given."
+        ),
+        dir_okay=False,
+    ),
+    batch_size: int | None = typer.Option(
+        None,
+        "--batch-size",
+        help="Rows inserted per batch with --load. Defaults to 50000.",
+        min=1,
+    ),
+    if_exists: str = typer.Option(
+        "fail",
+        "--if-exists",
+        help="With --load, what to do if the table exists: 'fail', 'replace' or 'append'.",
+    ),
+    insert_data: bool = typer.Option(
+        False,
+        "--insert-data",
+        help="Append multi-row INSERT statements holding the rows of the CSV file to the script.",
+    ),
+    insert_batch_rows: int | None = typer.Option(
+        None,
+        "--insert-batch-rows",
+        help="Maximum number of rows per INSERT statement with --insert-data. Defaults to 500.",
+        min=1,
+    ),
+    insert_batch_bytes: int | None = typer.Option(
+        None,
+        "--insert-batch-bytes",
+        help="Maximum size in bytes of the rows of an INSERT statement with --insert-data. Defaults to 1 MiB.",
+        min=1,
+    ),
 ) -> None:
     """
     Generate a SQL script to host a CSV file using QSV schema output.
     """
+    if load is not None:
+        if flavor is not None and flavor.lower() != "sqlite":
+            typer.echo("Error: --load only supports the sqlite flavor.", err=True)
+            raise typer.Exit(code=1)
+        from dartfx.qsv.load import DEFAULT_BATCH_SIZE, load_sqlite
+        from dartfx.qsv.utils import _sql_profile, generate_sql
+
+        try:
+            # One profiling run for both the script and the load
+            profile = _sql_profile(csv_path, stats_data, schema_data)
+            if output:
+                generate_sql(
+                    flavor="sqlite",
+                    table_name=table,
+                    output_sql_path=output,
+                    primary_key=primary_key,
+                    profile=profile,
+                )
+            result = load_sqlite(
+                csv_path,
+                load,
+                table_name=table,
+                profile=profile,
+                primary_key=primary_key,
+                if_exists=if_exists,
+                batch_size=batch_size or DEFAULT_BATCH_SIZE,
+            )
+        except Exception as e:
+            typer.echo(f"Error loading CSV file: {e}", err=True)
+            raise typer.Exit(code=1) from e
+        typer.echo(
+            f"Loaded {result.rows} rows into {result.table} in {result.elapsed:.2f}s "
+            f"({result.rows_per_second:,.0f} rows/s)",
+            err=True,
+        )
+        return
+    flavor = flavor or "postgres"
+
+    if socket_path is not None:
+        if insert_data:
+            # The daemon returns whole responses and caches them, the rows are streamed locally instead
+            typer.echo("Error: --insert-data cannot be used with --socket.", err=True)
+            raise typer.Exit(code=1)
+        _run_on_server(
+            socket_path,
+            "tosql",
+            output,
+            "Error generating SQL script",
+            csv_path=csv_path,
+            schema_data=schema_data,
+            stats_data=stats_data,
+            frequency_data=frequency_data,
+            flavor=flavor,
+            table_name=table,
+            schema_name=schema,
+            primary_key=primary_key,
+        )
+        return
+
+    from dartfx.qsv.utils import DEFAULT_INSERT_BATCH_BYTES, DEFAULT_INSERT_BATCH_ROWS, write_sql
+
     try:
-        sql_content = generate_sql(
+        # With --insert-data, the rows are written one INSERT statement at a time
+        write_sql(
+            output or sys.stdout,
             csv_path=csv_path,
             schema_data=schema_data,
             stats_data=stats_data,
@@ -196,15 +358,306 @@ def tosql(
             flavor=flavor,
             table_name=table,
             schema_name=schema,
-            output_sql_path=output,
             primary_key=primary_key,
+            insert_data=insert_data,
+            insert_batch_rows=insert_batch_rows or DEFAULT_INSERT_BATCH_ROWS,
+            insert_batch_bytes=insert_batch_bytes or DEFAULT_INSERT_BATCH_BYTES,
         )
         if not output:
-            typer.echo(sql_content)
+            sys.stdout.write("\n")
     except Exception as e:
         typer.echo(f"Error generating SQL script: {e}", err=True)
         raise typer.Exit(code=1) from e
 
 
+@app.command()
+def profile(
+    csv_path: Path = typer.Argument(
+        ...,
+        help="Path to the source CSV file.",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True,
+    ),
+    output_dir: Path | None = typer.Option(
+        None,
+        "--output-dir",
+        "-o",
+        help="Directory to write the artifacts to. Defaults to the directory of the CSV file.",
+        file_okay=False,
+        dir_okay=True,
+    ),
+    ddi_version: list[str] | None = typer.Option(
+        None,
+        "--ddi-version",
+        "-v",
+        help="DDI-Codebook version(s) to generate ('2.5', '2.6'). Can be specified multiple times, or comma-separated.",
+    ),
+    flavor: list[str] | None = typer.Option(
+        None,
+        "--flavor",
+        "-f",
+        help="SQL flavor(s) to generate scripts for. Can be specified multiple times, or comma-separated.",
+    ),
+    table: str | None = typer.Option(
+        None,
+        "--table",
+        "-t",
+        help="Custom table name for the SQL scripts. Defaults to 'tbl_<csv-filename>'.",
+    ),
+    schema: str | None = typer.Option(
+        None,
+        "--schema",
+        "-s",
+        help="Optional database schema for the SQL scripts.",
+    ),
+    primary_key: str | None = typer.Option(
+        None,
+        "--primary-key",
+        "-pk",
+        help="Primary key column name(s). For composite keys, use comma-separated names.",
+    ),
+    categorical_threshold: int = typer.Option(
+        20,
+        "--categorical-threshold",
+        help="Cardinality threshold for auto-detecting categorical variables.",
+    ),
+    categorical_column: list[str] | None = typer.Option(
+        None,
+        "--categorical-column",
+        "-c",
+        help="Explicit list of categorical column names. Can be specified multiple times, or comma-separated.",
+    ),
+    stats_data: Path | None = typer.Option(
+        None,
+        "--stats-data",
+        help="Path to pre-computed stats data file (JSON, JSONL, or CSV).",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True,
+    ),
+    schema_data: Path | None = typer.Option(
+        None,
+        "--schema-data",
+        help="Path to pre-computed schema data file (JSON).",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True,
+    ),
+    frequency_data: Path | None = typer.Option(
+        None,
+        "--frequency-data",
+        help="Path to pre-computed frequency data file (JSON).",
+        exists=True,
+        file_okay=True,
+        dir_okay=False,
+        readable=True,
+    ),
+    speculative_frequency: bool = typer.Option(
+        False,
+        "--speculative-frequency",
+        help="Start frequency on likely categorical columns while stats is still running.",
+    ),
+) -> None:
+    """
+    Profile a CSV file once and generate several DDI codebooks and SQL scripts from the results.
+
+    The artifacts are written as <stem>.ddi-<version>.xml and <stem>.<flavor>.sql.
+    """
+    from dartfx.qsv.utils import SQL_FLAVORS, generate_sql, profile_once, write_ddi_codebook
+
+    versions = list(dict.fromkeys(_split_values(ddi_version) or []))
+    flavors = list(dict.fromkeys(f.lower().replace("postgresql", "postgres") for f in _split_values(flavor) or []))
+    invalid = [v for v in versions if v not in ("2.5", "2.6")] + [f for f in flavors if f not in SQL_FLAVORS]
+    if invalid or not (versions or flavors):
+        message = f"Invalid values: {', '.join(invalid)}." if invalid else "Nothing to generate."
+        typer.echo(f"{message} Use --ddi-version (2.5, 2.6) and/or --flavor ({', '.join(SQL_FLAVORS)}).", err=True)
+        raise typer.Exit(code=1)
+
+    directory = output_dir or csv_path.parent
+    stem = csv_path.stem
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        result = profile_once(
+            csv_path=csv_path,
+            stats_data=stats_data,
+            schema_data=schema_data,
+            frequency_data=frequency_data,
+            categorical_threshold=categorical_threshold,
+            categorical_columns=_split_values(categorical_column),
+            speculative_frequency=speculative_frequency,
+        )
+        for version in versions:
+            path = directory / f"{stem}.ddi-{version}.xml"
+            write_ddi_codebook(path, version=version, profile=result)
+            typer.echo(str(path))
+        for sql_flavor in flavors:
+            path = directory / f"{stem}.{sql_flavor}.sql"
+            generate_sql(
+                flavor=sql_flavor,
+                table_name=table,
+                schema_name=schema,
+                output_sql_path=path,
+                primary_key=primary_key,
+                profile=result,
+            )
+            typer.echo(str(path))
+    except Exception as e:
+        typer.echo(f"Error profiling {csv_path}: {e}", err=True)
+        raise typer.Exit(code=1) from e
+
+
+@app.command()
+def batch(
+    root: Path = typer.Argument(
+        ...,
+        help="Root directory of the data product.",
+        exists=True,
+        file_okay=False,
+        dir_okay=True,
+        readable=True,
+    ),
+    output_dir: Path | None = typer.Option(
+        None,
+        "--output-dir",
+        "-o",
+        help="Directory to write the artifacts to. Defaults to the product root.",
+        file_okay=False,
+        dir_okay=True,
+    ),
+    ddi_version: list[str] | None = typer.Option(
+        None,
+        "--ddi-version",
+        "-v",
+        help="DDI-Codebook version(s) to generate. Defaults to 2.6 when no SQL flavor is given.",
+    ),
+    flavor: list[str] | None = typer.Option(
+        None,
+        "--flavor",
+        "-f",
+        help="SQL flavor(s) to generate scripts for. Can be specified multiple times, or comma-separated.",
+    ),
+    single_codebook: bool = typer.Option(
+        False,
+        "--single-codebook",
+        help="Write one codebook for the whole product, with a fileDscr per file, instead of one per file.",
+    ),
+    workers: int | None = typer.Option(
+        None,
+        "--workers",
+        "-j",
+        help="Number of files profiled in parallel. Defaults to a third of the CPUs.",
+    ),
+    report: Path | None = typer.Option(
+        None,
+        "--report",
+        help="Path of the JSON failure report. Defaults to batch-report.json in the output directory.",
+    ),
+    schema: str | None = typer.Option(
+        None,
+        "--schema",
+        "-s",
+        help="Optional database schema for the SQL scripts.",
+    ),
+    categorical_threshold: int = typer.Option(
+        20,
+        "--categorical-threshold",
+        help="Cardinality threshold for auto-detecting categorical variables.",
+    ),
+    speculative_frequency: bool = typer.Option(
+        False,
+        "--speculative-frequency",
+        help="Start frequency on likely categorical columns while stats is still running.",
+    ),
+) -> None:
+    """
+    Generate DDI codebooks and SQL scripts for every CSV file of a data product, in parallel.
+    """
+    import json
+
+    from dartfx.qsv.batch import ProductBatch, failure_report
+    from dartfx.qsv.model import DataProduct
+
+    versions = _split_values(ddi_version)
+    flavors = [f.lower().replace("postgresql", "postgres") for f in _split_values(flavor) or []]
+    try:
+        product_batch = ProductBatch(
+            DataProduct(root=str(root)),
+            output_dir=output_dir,
+            ddi_versions=versions if versions is not None else ([] if flavors else ["2.6"]),
+            flavors=flavors,
+            single_codebook=single_codebook,
+            max_workers=workers,
+            categorical_threshold=categorical_threshold,
+            speculative_frequency=speculative_frequency,
+            schema_name=schema,
+        )
+    except ValueError as e:
+        typer.echo(f"Error: {e}", err=True)
+        raise typer.Exit(code=1) from e
+
+    files = product_batch.files()
+    results = []
+    for i, result in enumerate(product_batch.run(files), start=1):
+        results.append(result)
+        status = "ok" if result.ok else f"FAILED: {result.error}"
+        typer.echo(f"[{i}/{len(files)}] {result.input} ({result.elapsed:.1f}s) {status}", err=True)
+    for path in product_batch.codebooks:
+        typer.echo(path)
+
+    summary = failure_report(results)
+    report_path = report or Path(product_batch.output_dir) / "batch-report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    typer.echo(
+        f"{summary['succeeded']} of {summary['total']} files documented, report written to {report_path}", err=True
+    )
+    if summary["failed"]:
+        raise typer.Exit(code=1)
+
+
+@app.command()
+def serve(
+    socket_path: Path | None = typer.Option(
+        None,
+        "--socket",
+        envvar="DARTFX_QSV_SOCKET",
+        help="Unix socket to listen on. Defaults to dartfx-qsv.sock in $XDG_RUNTIME_DIR or the temp directory.",
+    ),
+    cache_dir: Path | None = typer.Option(
+        None,
+        "--cache-dir",
+        help="Directory of the qsv result cache. Defaults to ~/.cache/dartfx-qsv/results.",
+    ),
+    max_responses: int = typer.Option(
+        256,
+        "--max-responses",
+        help="Number of toddic/tosql/stats responses kept in memory.",
+    ),
+) -> None:
+    """
+    Run a profiling daemon that serves toddic/tosql requests (sent with --socket) from warm caches.
+    """
+    from dartfx.qsv.cache import ResultCache
+    from dartfx.qsv.server import ProfileServer
+
+    server = ProfileServer(
+        socket_path, cache=ResultCache(cache_dir) if cache_dir else None, max_responses=max_responses
+    )
+    try:
+        server.warm()
+    except Exception as e:
+        typer.echo(f"Error starting the server: {e}", err=True)
+        raise typer.Exit(code=1) from e
+    typer.echo(f"Listening on {server.socket_path}", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
 if __name__ == "__main__":
     app()
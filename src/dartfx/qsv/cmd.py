@@ -1,25 +1,608 @@
 from __future__ import annotations
 
+import asyncio
 import builtins
-import re
-import shutil
+import contextlib
+import copy
+import csv
+import io
+import locale
+import os
+import struct
 import subprocess
-
-
-def _run_qsv_command(command: str, args: list[str]) -> str:
+import tempfile
+import threading
+import time
+import weakref
+from collections.abc import AsyncGenerator, AsyncIterator, Iterable, Iterator
+from typing import IO, TYPE_CHECKING, Any, overload
+
+from pydantic import BaseModel
+
+from dartfx.qsv.index import IndexManager
+from dartfx.qsv.metrics import InvocationMetrics, MetricsRegistry, rusage_max_rss
+from dartfx.qsv.runtime import get_runtime
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:  # POSIX only, used to sample pipe occupancy in pipelines
+    import fcntl
+    import termios
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+    termios = None  # type: ignore[assignment]
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# qsv commands that accept a `--jobs` option to control their parallelism
+JOBS_COMMANDS = frozenset(
+    {
+        "apply",
+        "blake3",
+        "datefmt",
+        "dedup",
+        "diff",
+        "excel",
+        "extsort",
+        "frequency",
+        "geocode",
+        "jsonl",
+        "moarstats",
+        "pragmastat",
+        "profile",
+        "replace",
+        "schema",
+        "search",
+        "searchset",
+        "snappy",
+        "sort",
+        "split",
+        "stats",
+        "synthesize",
+        "template",
+        "to",
+        "tojsonl",
+        "validate",
+    }
+)
+
+# Maximum number of qsv processes started concurrently through arun()/astream() (None = unlimited).
+# Semaphores are bound to an event loop, so one is created lazily per running loop.
+_async_concurrency: int | None = None
+# Process-wide ResultCache used by QSVCommand.run(), see `cache.enable_result_cache()`
+_result_cache: Any = None
+
+# Builds the .idx files of large inputs of index-accelerated commands, see `index.enable_auto_index()`
+_index_manager: IndexManager | None = None
+
+# Every qsv invocation is recorded here (see dartfx.qsv.metrics)
+_metrics_registry: MetricsRegistry | None = MetricsRegistry()
+
+# CpuBudget coordinating --jobs between concurrent invocations, see `scheduler.enable_cpu_budget()`
+_cpu_budget: Any = None
+# Pass the granted CPUs as QSV_MAX_JOBS instead of --jobs
+_cpu_budget_env = False
+
+_async_semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = weakref.WeakKeyDictionary()
+
+
+def _qsv_argv(command: str, args: list[str]) -> list[str]:
     """
-    Helper function to run a qsv command.
-    Checks that the `qsv` executable is available in the PATH.
+    Build the full argument vector for a qsv invocation.
+    The `qsv` executable is resolved once through the process-wide `QsvRuntime`.
     Raises a RuntimeError if not found.
     """
-    if shutil.which("qsv") is None:
-        raise RuntimeError("The 'qsv' command-line tool is not installed or not found in PATH.")
-    cmd = ["qsv"]
+    cmd = [get_runtime().path]
     if command:
         cmd.append(command)
     cmd.extend(args)
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-    return result.stdout
+    return cmd
+
+
+def _stdin_source(stdin: Any) -> tuple[Any, Iterable[bytes | str] | None]:
+    """
+    Resolve a stdin source into a `Popen` stdin argument plus the chunks to pump into it.
+
+    Sources backed by a real file descriptor (open files, another process's stdout) are
+    handed to the child directly. Bytes, iterables of chunks and other readable objects are
+    pumped through a pipe by a writer thread, so they never need to be fully in memory.
+    """
+    if stdin is None:
+        return None, None
+    if isinstance(stdin, (bytes, bytearray, memoryview)):
+        return subprocess.PIPE, [stdin]  # type: ignore[list-item]
+    if isinstance(stdin, (str, os.PathLike)):
+        raise TypeError("stdin must be bytes, an iterable of byte chunks or a readable file object, not a path.")
+    if hasattr(stdin, "read"):
+        try:
+            fd = stdin.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            fd = None
+        if fd is not None:
+            if stdin.seekable():
+                # Buffered file objects may have read ahead of their logical position
+                os.lseek(fd, stdin.tell(), os.SEEK_SET)
+            return fd, None
+        return subprocess.PIPE, iter(lambda: stdin.read(DEFAULT_CHUNK_SIZE), stdin.read(0))
+    return subprocess.PIPE, stdin
+
+
+class _StdinFeeder:
+    """Writer thread pumping chunks into a child's stdin pipe."""
+
+    def __init__(self, pipe: IO[bytes], chunks: Iterable[bytes | str]):
+        self.pipe = pipe
+        self.chunks = chunks
+        self.error: BaseException | None = None
+        self.bytes_written = 0
+        self._thread = threading.Thread(target=self._feed, name="qsv-stdin-feeder", daemon=True)
+        self._thread.start()
+
+    def _feed(self) -> None:
+        try:
+            for chunk in self.chunks:
+                data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+                self.pipe.write(data)
+                self.bytes_written += len(data)
+        except BrokenPipeError:
+            pass  # the child stopped reading, its exit status tells why
+        except BaseException as e:
+            self.error = e
+        finally:
+            with contextlib.suppress(BrokenPipeError):
+                self.pipe.close()
+
+    def join(self) -> None:
+        """Wait for the writer and re-raise any error raised by the source, as the output is then incomplete."""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+
+class _MeasuredPopen(subprocess.Popen):
+    """
+    A `Popen` that reaps its child with `os.wait4`, keeping the child's resource usage
+    (CPU times, peak RSS) in `rusage`. Elsewhere it behaves like `Popen`.
+    """
+
+    rusage: Any = None
+    started: float = 0.0
+    ended: float | None = None
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        self.started = time.perf_counter()
+        super().__init__(*args, **kwargs)
+
+    def _wait4pid(self, pid: int, flags: int) -> tuple[int, int]:
+        pid, status, rusage = os.wait4(pid, flags)
+        if pid:
+            self.rusage = rusage
+            self.ended = time.perf_counter()
+        return pid, status
+
+    if hasattr(os, "wait4"):
+
+        def _try_wait(self, wait_flags: int) -> tuple[int, int]:  # type: ignore[override]
+            # Same as Popen._try_wait, with os.wait4 in place of os.waitpid
+            try:
+                return self._wait4pid(self.pid, wait_flags)
+            except ChildProcessError:
+                return self.pid, 0
+
+        def _internal_poll(self, _deadstate: Any = None, **_kwargs: Any) -> int | None:  # type: ignore[override]
+            return super()._internal_poll(_deadstate, _waitpid=self._wait4pid)  # type: ignore[misc]
+
+
+class _CountingReader(io.RawIOBase):
+    """Raw stream wrapper counting the bytes read from a process's stdout."""
+
+    def __init__(self, raw: Any):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int | None:
+        n = self.raw.readinto(buffer)
+        if n:
+            self.bytes_read += n
+        return n
+
+    def fileno(self) -> int:
+        return self.raw.fileno()
+
+    def close(self) -> None:
+        self.raw.close()
+        super().close()
+
+
+def _fd_position(stream: Any) -> int | None:
+    """The current offset of a file (object or descriptor), or None if it is not seekable."""
+    try:
+        fd = stream if isinstance(stream, int) else stream.fileno()
+        return os.lseek(fd, 0, os.SEEK_CUR)
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        return None
+
+
+def _record_invocation(
+    command: str,
+    args: list[str],
+    returncode: int | None,
+    started: float,
+    rusage: Any = None,
+    stdin_bytes: int | None = None,
+    stdout_bytes: int | None = None,
+    stderr_bytes: int | None = None,
+    ended: float | None = None,
+) -> None:
+    """Record the metrics of a finished qsv invocation in the metrics registry, if any."""
+    registry = _metrics_registry
+    if registry is None:
+        return
+    input_sizes = {}
+    for arg in args:
+        with contextlib.suppress(OSError, ValueError):
+            if os.path.isfile(arg):
+                input_sizes[arg] = os.path.getsize(arg)
+    metrics = InvocationMetrics(
+        command=command,
+        args=args,
+        returncode=returncode,
+        wall_time=(ended or time.perf_counter()) - started,
+        input_sizes=input_sizes,
+        stdin_bytes=stdin_bytes,
+        stdout_bytes=stdout_bytes,
+        stderr_bytes=stderr_bytes,
+    )
+    if rusage is not None:
+        metrics.user_time = rusage.ru_utime
+        metrics.system_time = rusage.ru_stime
+        metrics.max_rss = rusage_max_rss(rusage.ru_maxrss)
+    registry.record(metrics)
+
+
+def _record_process(
+    command: str,
+    args: list[str],
+    proc: subprocess.Popen,
+    feeder: _StdinFeeder | None = None,
+    stdout_bytes: int | None = None,
+    stderr_bytes: int | None = None,
+) -> None:
+    _record_invocation(
+        command,
+        args,
+        proc.returncode,
+        getattr(proc, "started", time.perf_counter()),
+        rusage=getattr(proc, "rusage", None),
+        stdin_bytes=feeder.bytes_written if feeder is not None else None,
+        stdout_bytes=stdout_bytes,
+        stderr_bytes=stderr_bytes,
+        ended=getattr(proc, "ended", None),
+    )
+
+
+def _jobs_request(command: str, args: list[str]) -> tuple[int | None, bool] | None:
+    """
+    The CPUs an invocation should reserve from the CPU budget, as (want, fixed), or None if
+    the command is not multi-threaded. A `--jobs` already in the arguments is reserved as is.
+    """
+    if command not in JOBS_COMMANDS:
+        return None
+    for flag in ("--jobs", "-j"):
+        if flag in args:
+            try:
+                return int(args[args.index(flag) + 1]), True
+            except (IndexError, ValueError):
+                return None
+    return None, False
+
+
+def _apply_jobs(args: list[str], jobs: int, fixed: bool) -> tuple[list[str], dict[str, str] | None]:
+    """Hand the granted CPUs to qsv, as `--jobs` or as `QSV_MAX_JOBS`. Returns the args and environment."""
+    if fixed:
+        return args, None
+    if _cpu_budget_env:
+        return args, {**os.environ, "QSV_MAX_JOBS": str(jobs)}
+    return ["--jobs", str(jobs), *args], None
+
+
+@contextlib.contextmanager
+def _cpu_slot(command: str, args: list[str], block: bool = True) -> Iterator[tuple[list[str], dict[str, str] | None]]:
+    """Reserve CPUs from the CPU budget (if enabled) for the duration of an invocation."""
+    budget = _cpu_budget
+    request = _jobs_request(command, args) if budget is not None else None
+    if request is None:
+        yield args, None
+        return
+    want, fixed = request
+    with budget.reserve(want, block=block, fixed=fixed) as jobs:
+        yield _apply_jobs(args, jobs, fixed)
+
+
+@contextlib.asynccontextmanager
+async def _acpu_slot(command: str, args: list[str]) -> AsyncIterator[tuple[list[str], dict[str, str] | None]]:
+    """Asyncio counterpart of `_cpu_slot`: waiting for CPUs does not block the event loop."""
+    budget = _cpu_budget
+    request = _jobs_request(command, args) if budget is not None else None
+    if request is None:
+        yield args, None
+        return
+    want, fixed = request
+    task = asyncio.ensure_future(asyncio.to_thread(budget.acquire, want, True, fixed))
+    try:
+        reservation = await asyncio.shield(task)
+    except asyncio.CancelledError:
+        # The worker thread cannot be interrupted: give the CPUs back once it gets them
+        task.add_done_callback(lambda t: t.cancelled() or t.exception() or budget.release(t.result()))
+        raise
+    try:
+        yield _apply_jobs(args, reservation.jobs, fixed)
+    finally:
+        budget.release(reservation)
+
+
+def _start_process(
+    cmd: list[str], stdin: Any, stdout: Any, stderr: Any, env: dict[str, str] | None = None
+) -> tuple[subprocess.Popen, _StdinFeeder | None]:
+    """Start a process, with a writer thread feeding its stdin if the source needs one."""
+    stdin_arg, chunks = _stdin_source(stdin)
+    proc = _MeasuredPopen(cmd, stdin=stdin_arg, stdout=stdout, stderr=stderr, env=env)
+    feeder = None
+    if chunks is not None:
+        assert proc.stdin is not None
+        feeder = _StdinFeeder(proc.stdin, chunks)
+        proc.stdin = None  # owned by the feeder, keep communicate() from closing it
+    return proc, feeder
+
+
+def _run_binary(command: str, args: list[str], stdout: Any, stdin: Any = None) -> bytes:
+    """Run a qsv command with binary stdout, raising a CalledProcessError with decoded stderr on failure."""
+    with _cpu_slot(command, args) as (args, env):
+        cmd = _qsv_argv(command, args)
+        start_position = None if stdout is subprocess.PIPE else _fd_position(stdout)
+        proc, feeder = _start_process(cmd, stdin, stdout, subprocess.PIPE, env)
+        try:
+            out, err = proc.communicate()
+        except BaseException:
+            proc.kill()
+            proc.wait()
+            _record_process(command, args, proc, feeder)
+            raise
+        if stdout is subprocess.PIPE:
+            stdout_bytes: int | None = len(out)
+        else:
+            end_position = _fd_position(stdout) if start_position is not None else None
+            stdout_bytes = (
+                end_position - start_position if end_position is not None and start_position is not None else None
+            )
+        _record_process(command, args, proc, feeder, stdout_bytes, len(err))
+        if feeder is not None:
+            feeder.join()
+        if proc.returncode != 0:
+            raise subprocess.CalledProcessError(proc.returncode, cmd, output=out, stderr=_decode_text(err))
+        return out
+
+
+def _run_qsv_command(command: str, args: list[str], sink: Any = None, stdin: Any = None) -> Any:
+    """
+    Helper function to run a qsv command.
+    Raises a RuntimeError if qsv is not found, or a CalledProcessError if it fails.
+
+    The `sink` selects where stdout goes (see `QSVCommand.run`):
+    None returns the decoded text, `bytes` the raw output, `memoryview` a zero-copy view
+    of the raw output. A path or binary file object receives the output directly.
+    The optional `stdin` source is fed to the command (see `_stdin_source`).
+    """
+    if sink is None:
+        return _decode_text(_run_binary(command, args, subprocess.PIPE, stdin))
+    if sink is bytes:
+        return _run_binary(command, args, subprocess.PIPE, stdin)
+    if sink is memoryview:
+        return memoryview(_run_binary(command, args, subprocess.PIPE, stdin))
+    if isinstance(sink, (str, os.PathLike)):
+        with open(sink, "wb") as f:
+            _run_binary(command, args, f, stdin)
+        return os.fspath(sink)
+    try:
+        fd = sink.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fd = None
+    if fd is not None:
+        # Real file: the child writes to it directly, at the file's current position
+        sink.flush()
+        _run_binary(command, args, fd, stdin)
+    else:
+        with _open_qsv_stdout(command, args, stdin) as stdout:
+            while chunk := stdout.read1(DEFAULT_CHUNK_SIZE):  # type: ignore[attr-defined]
+                sink.write(chunk)
+    return None
+
+
+@contextlib.contextmanager
+def _open_qsv_stdout(command: str, args: list[str], stdin: Any = None) -> Iterator[IO[bytes]]:
+    """
+    Start a qsv command and yield its stdout as a binary stream.
+
+    The child's stderr is spooled to a temporary file so it can never block the pipe.
+    If the caller leaves the block early (an exception, or a generator being closed),
+    the child is killed instead of being waited on. Otherwise the exit status is checked
+    and a CalledProcessError is raised on failure, like `subprocess.run(check=True)`.
+    """
+    with _cpu_slot(command, args) as (args, env):
+        cmd = _qsv_argv(command, args)
+        with tempfile.TemporaryFile() as stderr_file:
+            proc, feeder = _start_process(cmd, stdin, subprocess.PIPE, stderr_file, env)
+            assert proc.stdout is not None
+            counter = _CountingReader(proc.stdout.raw)  # type: ignore[attr-defined]
+            stdout = io.BufferedReader(counter, DEFAULT_CHUNK_SIZE)
+            try:
+                yield stdout
+            except BaseException:
+                # A feeder blocked on its source exits on its next write, no need to wait for it
+                proc.kill()
+                raise
+            finally:
+                stdout.close()
+                returncode = proc.wait()
+                stderr_bytes = os.fstat(stderr_file.fileno()).st_size
+                _record_process(command, args, proc, feeder, counter.bytes_read, stderr_bytes)
+            if feeder is not None:
+                feeder.join()
+            if returncode != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode("utf-8", errors="replace")
+                raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
+
+
+def set_async_concurrency(limit: int | None) -> None:
+    """
+    Set the maximum number of qsv processes that `arun()`/`astream()` keep in flight
+    per event loop. `None` removes the limit.
+    """
+    global _async_concurrency
+    if limit is not None and limit < 1:
+        raise ValueError("The async concurrency limit must be a positive integer or None.")
+    _async_concurrency = limit
+    _async_semaphores.clear()
+
+
+def _default_async_semaphore() -> asyncio.Semaphore | None:
+    if _async_concurrency is None:
+        return None
+    loop = asyncio.get_running_loop()
+    semaphore = _async_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _async_semaphores[loop] = asyncio.Semaphore(_async_concurrency)
+    return semaphore
+
+
+@contextlib.asynccontextmanager
+async def _async_slot(semaphore: asyncio.Semaphore | None) -> AsyncIterator[None]:
+    """Hold a slot of the given (or default) semaphore for the duration of a qsv process."""
+    semaphore = semaphore or _default_async_semaphore()
+    if semaphore is None:
+        yield
+        return
+    async with semaphore:
+        yield
+
+
+def _decode_text(data: bytes) -> str:
+    """Decode process output the same way `subprocess.run(text=True)` does."""
+    text = data.decode(locale.getpreferredencoding(False))
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+async def _kill_async_process(proc: asyncio.subprocess.Process) -> None:
+    with contextlib.suppress(ProcessLookupError):
+        proc.kill()
+    await proc.wait()
+
+
+def _astdin_source(stdin: Any) -> tuple[Any, Any]:
+    """Like `_stdin_source`, but also accepting async iterables of chunks."""
+    if hasattr(stdin, "__aiter__"):
+        return subprocess.PIPE, stdin
+    return _stdin_source(stdin)
+
+
+async def _afeed_stdin(writer: asyncio.StreamWriter, chunks: Any) -> None:
+    """Asyncio counterpart of `_StdinFeeder`: pump chunks into the child's stdin with flow control."""
+    try:
+        if hasattr(chunks, "__aiter__"):
+            async for chunk in chunks:
+                writer.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                await writer.drain()
+        else:
+            for chunk in chunks:
+                writer.write(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+                await writer.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # the child stopped reading, its exit status tells why
+    finally:
+        with contextlib.suppress(BrokenPipeError, ConnectionResetError):
+            writer.close()
+
+
+@contextlib.asynccontextmanager
+async def _async_process(
+    cmd: list[str], stdin: Any, stderr: Any, env: dict[str, str] | None = None
+) -> AsyncIterator[asyncio.subprocess.Process]:
+    """
+    Start a process with asyncio, feeding its stdin from a task if needed.
+    Leaving the block with an exception (including cancellation) kills the process.
+    On normal exit the feeder task is awaited, so errors raised by the source propagate.
+    """
+    stdin_arg, chunks = _astdin_source(stdin)
+    proc = await asyncio.create_subprocess_exec(*cmd, stdin=stdin_arg, stdout=subprocess.PIPE, stderr=stderr, env=env)
+    feeder = None
+    if chunks is not None:
+        assert proc.stdin is not None
+        feeder = asyncio.create_task(_afeed_stdin(proc.stdin, chunks))
+    try:
+        yield proc
+    except BaseException:
+        if feeder is not None:
+            feeder.cancel()
+        await _kill_async_process(proc)
+        raise
+    if feeder is not None:
+        await feeder
+
+
+async def _arun_qsv_command(
+    command: str, args: list[str], semaphore: asyncio.Semaphore | None = None, stdin: Any = None
+) -> str:
+    """
+    Asyncio counterpart of `_run_qsv_command`.
+    Cancelling the awaiting task kills the qsv process.
+    """
+    async with _async_slot(semaphore), _acpu_slot(command, args) as (args, env):
+        cmd = _qsv_argv(command, args)
+        started = time.perf_counter()
+        async with _async_process(cmd, stdin, subprocess.PIPE, env) as proc:
+            assert proc.stdout is not None
+            assert proc.stderr is not None
+            stdout, stderr = await asyncio.gather(proc.stdout.read(), proc.stderr.read())
+            returncode = await proc.wait()
+        _record_invocation(command, args, returncode, started, stdout_bytes=len(stdout), stderr_bytes=len(stderr))
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd, output=_decode_text(stdout), stderr=_decode_text(stderr))
+    return _decode_text(stdout)
+
+
+async def _astream_qsv_command(
+    command: str,
+    args: list[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    semaphore: asyncio.Semaphore | None = None,
+    stdin: Any = None,
+) -> AsyncGenerator[bytes, None]:
+    """Asyncio counterpart of `QSVCommand.stream`, see `_open_qsv_stdout` for the process lifecycle."""
+    async with _async_slot(semaphore), _acpu_slot(command, args) as (args, env):
+        cmd = _qsv_argv(command, args)
+        with tempfile.TemporaryFile() as stderr_file:
+            started = time.perf_counter()
+            stdout_bytes = 0
+            returncode = None
+            try:
+                async with _async_process(cmd, stdin, stderr_file, env) as proc:
+                    assert proc.stdout is not None
+                    while chunk := await proc.stdout.read(chunk_size):
+                        stdout_bytes += len(chunk)
+                        yield chunk
+                    returncode = await proc.wait()
+            finally:
+                stderr_bytes = os.fstat(stderr_file.fileno()).st_size
+                _record_invocation(command, args, returncode, started, None, None, stdout_bytes, stderr_bytes)
+            if returncode != 0:
+                stderr_file.seek(0)
+                stderr = stderr_file.read().decode("utf-8", errors="replace")
+                raise subprocess.CalledProcessError(returncode, cmd, stderr=stderr)
 
 
 class QSVCommand:
@@ -59,12 +642,125 @@ class QSVCommand:
                 args.extend([flag, str(value)])
         return args
 
-    def run(self, *inputs: str | None) -> str:
+    def _prepare_inputs(self, *inputs: str | None) -> None:
+        """Index the inputs before a run, when automatic indexing is on (see `index.enable_auto_index`)."""
+        if _index_manager is not None:
+            _index_manager.prepare(self.command, inputs)
+
+    def _build_args(self, *inputs: str | None) -> list[str]:
         # Build full CLI arguments: [flags] + [init_args] + [inputs]
         args = self._get_args()
         args.extend(self.init_args)
         args.extend(str(i) for i in inputs if i is not None)
-        return _run_qsv_command(self.command, args)
+        return args
+
+    @overload
+    def run(self, *inputs: str | None, sink: None = None, stdin: Any = None) -> str: ...
+    @overload
+    def run(self, *inputs: str | None, sink: type[bytes], stdin: Any = None) -> bytes: ...
+    @overload
+    def run(self, *inputs: str | None, sink: type[memoryview], stdin: Any = None) -> memoryview: ...
+    @overload
+    def run(self, *inputs: str | None, sink: str | os.PathLike[str], stdin: Any = None) -> str: ...
+    @overload
+    def run(self, *inputs: str | None, sink: IO[bytes], stdin: Any = None) -> None: ...
+
+    def run(self, *inputs: str | None, sink: Any = None, stdin: Any = None) -> Any:
+        """
+        Run the command and return its output.
+
+        Args:
+            inputs: Input files (or other positional arguments) appended to the command line.
+                Leave the input out to have qsv read the `stdin` source instead.
+            sink: Where the output goes. By default the decoded text is returned.
+                `bytes` returns the raw output, skipping the decode step.
+                `memoryview` returns a zero-copy view of the raw output buffer.
+                A path writes the output to that file and returns the path.
+                A binary file object receives the output and None is returned. Real files are
+                handed to qsv as its stdout, so the data never passes through Python.
+            stdin: Data fed to qsv's stdin: bytes, an iterable of byte chunks, or a readable
+                binary file object. Files and pipes (such as another process's stdout) are
+                handed to qsv directly; other sources are pumped by a writer thread, so they
+                never need to be fully in memory or on disk.
+        """
+        if _result_cache is not None and stdin is None and (sink is None or sink is bytes or sink is memoryview):
+            return _result_cache.run(self, *inputs, sink=sink)
+        self._prepare_inputs(*inputs)
+        args = self._build_args(*inputs)
+        if sink is None and stdin is None:
+            return _run_qsv_command(self.command, args)
+        return _run_qsv_command(self.command, args, sink=sink, stdin=stdin)
+
+    def stream(self, *inputs: str | None, chunk_size: int = DEFAULT_CHUNK_SIZE, stdin: Any = None) -> Iterator[bytes]:
+        """
+        Run the command and yield its stdout incrementally as raw byte chunks.
+
+        Memory use is bounded by `chunk_size`. Closing the iterator early (e.g. breaking out
+        of a loop, or `contextlib.closing`) kills the qsv process instead of waiting for it.
+        See `run()` for the accepted `stdin` sources.
+        """
+        self._prepare_inputs(*inputs)
+        with _open_qsv_stdout(self.command, self._build_args(*inputs), stdin) as stdout:
+            while chunk := stdout.read1(chunk_size):  # type: ignore[attr-defined]
+                yield chunk
+
+    def iter_lines(self, *inputs: str | None, encoding: str = "utf-8", stdin: Any = None) -> Iterator[str]:
+        """Run the command and yield its decoded stdout line by line, without line terminators."""
+        self._prepare_inputs(*inputs)
+        with _open_qsv_stdout(self.command, self._build_args(*inputs), stdin) as stdout:
+            for line in io.TextIOWrapper(stdout, encoding=encoding, newline=""):
+                yield line.rstrip("\r\n")
+
+    def iter_records(
+        self, *inputs: str | None, encoding: str = "utf-8", delimiter: str = ",", stdin: Any = None
+    ) -> Iterator[list[str]]:
+        """Run the command and yield its CSV output one parsed record at a time."""
+        self._prepare_inputs(*inputs)
+        with _open_qsv_stdout(self.command, self._build_args(*inputs), stdin) as stdout:
+            yield from csv.reader(io.TextIOWrapper(stdout, encoding=encoding, newline=""), delimiter=delimiter)
+
+    async def arun(self, *inputs: str | None, semaphore: asyncio.Semaphore | None = None, stdin: Any = None) -> str:
+        """
+        Asyncio counterpart of `run()`, built on `asyncio.create_subprocess_exec`.
+
+        The number of concurrent processes is bounded by `semaphore` if given, or by the
+        module-wide limit set with `set_async_concurrency()`. Cancelling the task kills qsv.
+        Besides the `run()` stdin sources, `stdin` may be an async iterable of byte chunks.
+        """
+        if _index_manager is not None:
+            # Index builds block, keep them off the event loop
+            await asyncio.to_thread(self._prepare_inputs, *inputs)
+        return await _arun_qsv_command(self.command, self._build_args(*inputs), semaphore, stdin)
+
+    async def astream(
+        self,
+        *inputs: str | None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        semaphore: asyncio.Semaphore | None = None,
+        stdin: Any = None,
+    ) -> AsyncIterator[bytes]:
+        """Asyncio counterpart of `stream()`. Closing the iterator early kills the qsv process."""
+        if _index_manager is not None:
+            await asyncio.to_thread(self._prepare_inputs, *inputs)
+        chunks = _astream_qsv_command(self.command, self._build_args(*inputs), chunk_size, semaphore, stdin)
+        async with contextlib.aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+
+    def to_pandas(self, *inputs: str | None, stdin: Any = None) -> pd.DataFrame:
+        """
+        Run the command and load its CSV output into a pandas DataFrame with the pyarrow
+        backend. The raw output is parsed by Arrow's CSV reader straight from the captured
+        buffer, without decoding it to text first. Requires pyarrow.
+        """
+        from dartfx.qsv.arrow import read_csv_buffer
+
+        delimiter = self.params.get("delimiter") or ","
+        return read_csv_buffer(self.run(*inputs, sink=memoryview, stdin=stdin), delimiter=delimiter)
+
+    def __or__(self, other: QSVCommand | Pipeline) -> Pipeline:
+        """Chain commands into a `Pipeline`, e.g. `Select("a,b") | Search("foo") | Frequency()`."""
+        return Pipeline(self) | other
 
     @classmethod
     def name(cls) -> str:
@@ -95,8 +791,8 @@ class QSV(QSVCommand):
 
     @staticmethod
     def version() -> str:
-        """Returns the full output of `qsv --version`."""
-        return _run_qsv_command("", ["--version"])
+        """Returns the full output of `qsv --version` (cached by the `QsvRuntime`)."""
+        return get_runtime().version_output
 
     @staticmethod
     def version_number() -> str:
@@ -104,48 +800,21 @@ class QSV(QSVCommand):
         Returns the QSV version number extracted from the `qsv --version` command.
         For example '19.1.0'.
         """
-        output = QSV.version()
-        match = re.search(r"qsv\s+([\d\.]+)", output)
-        if match:
-            return match.group(1)
-        return "unknown"
+        return get_runtime().version
 
     @staticmethod
     def list() -> builtins.list[dict[str, str]]:
         """
         Parses the output of `qsv --list` and returns a list of command name/description objects.
         """
-        output = _run_qsv_command("", ["--list"])
-        commands = []
-        started = False
-        for line in output.splitlines():
-            if "Installed commands" in line:
-                started = True
-                continue
-            if started and line.startswith("    "):
-                stripped = line.strip()
-                parts = stripped.split(maxsplit=1)
-                if len(parts) == 2:
-                    commands.append({"name": parts[0], "description": parts[1]})
-            elif started and line.strip() == "":
-                if commands:
-                    break
-        return commands
+        return get_runtime().commands
 
     @staticmethod
     def envlist() -> builtins.list[dict[str, str]]:
         """
         Parses the output of `qsv --envlist` and returns a list of environment variable objects.
         """
-        output = _run_qsv_command("", ["--envlist"])
-        env_vars = []
-        for line in output.splitlines():
-            if ":" in line:
-                parts = line.split(":", 1)
-                name = parts[0].strip()
-                value = parts[1].strip().strip('"')
-                env_vars.append({"name": name, "value": value})
-        return env_vars
+        return get_runtime().env
 
 
 class Apply(QSVCommand):
@@ -224,10 +893,10 @@ class Diff(QSVCommand):
     def __init__(self, **kwargs):
         super().__init__("diff", **kwargs)
 
-    def run(self, *inputs: str | None) -> str:
+    def _build_args(self, *inputs: str | None) -> list[str]:
         input1 = inputs[0] if len(inputs) > 0 else None
         input2 = inputs[1] if len(inputs) > 1 else None
-        return super().run(input1, input2)
+        return super()._build_args(input1, input2)
 
 
 class Edit(QSVCommand):
@@ -259,10 +928,10 @@ class Exclude(QSVCommand):
         self.columns1 = columns1
         self.columns2 = columns2
 
-    def run(self, *inputs: str | None) -> str:
+    def _build_args(self, *inputs: str | None) -> list[str]:
         input1 = inputs[0] if len(inputs) > 0 else None
         input2 = inputs[1] if len(inputs) > 1 else None
-        return super().run(self.columns1, input1, self.columns2, input2)
+        return super()._build_args(self.columns1, input1, self.columns2, input2)
 
 
 class Explode(QSVCommand):
@@ -399,10 +1068,10 @@ class Join(QSVCommand):
         self.columns1 = columns1
         self.columns2 = columns2
 
-    def run(self, *inputs: str | None) -> str:
+    def _build_args(self, *inputs: str | None) -> list[str]:
         input1 = inputs[0] if len(inputs) > 0 else None
         input2 = inputs[1] if len(inputs) > 1 else None
-        return super().run(self.columns1, input1, self.columns2, input2)
+        return super()._build_args(self.columns1, input1, self.columns2, input2)
 
 
 class Joinp(QSVCommand):
@@ -413,10 +1082,10 @@ class Joinp(QSVCommand):
         self.columns1 = columns1
         self.columns2 = columns2
 
-    def run(self, *inputs: str | None) -> str:
+    def _build_args(self, *inputs: str | None) -> list[str]:
         input1 = inputs[0] if len(inputs) > 0 else None
         input2 = inputs[1] if len(inputs) > 1 else None
-        return super().run(self.columns1, input1, self.columns2, input2)
+        return super()._build_args(self.columns1, input1, self.columns2, input2)
 
 
 class Json(QSVCommand):
@@ -636,7 +1305,33 @@ class Sqlp(QSVCommand):
     """Run a SQL query against several CSVs using the Pola.rs engine."""
 
     def __init__(self, query: str, **kwargs):
-        super().__init__("sqlp", query, **kwargs)
+        super().__init__("sqlp", **kwargs)
+        self.query = query
+
+    def _build_args(self, *inputs: str | None) -> list[str]:
+        # Usage: qsv sqlp [options] <input>... <sql>
+        paths = [i for i in inputs if i is not None] or ["-"]
+        return super()._build_args(*paths, self.query)
+
+    def to_pandas(self, *inputs: str | None, stdin: Any = None) -> pd.DataFrame:
+        """
+        Run the query with `--format arrow` into an uncompressed Arrow IPC file and memory-map
+        it into a pandas DataFrame with the pyarrow backend, so the result is never serialised
+        to CSV nor copied. Requires pyarrow.
+        """
+        from dartfx.qsv.arrow import read_arrow_ipc
+
+        fd, path = tempfile.mkstemp(prefix="qsv-sqlp-", suffix=".arrow")
+        os.close(fd)
+        try:
+            command = copy.copy(self)
+            command.params = {**self.params, "format": "arrow", "compression": "uncompressed", "output": path}
+            command.run(*inputs, stdin=stdin)
+            return read_arrow_ipc(path)
+        finally:
+            # On POSIX the mapping stays valid once the file is unlinked
+            with contextlib.suppress(OSError):
+                os.remove(path)
 
 
 class Stats(QSVCommand):
@@ -673,6 +1368,26 @@ class To(QSVCommand):
     def __init__(self, subcommand: str, destination: str, **kwargs):
         super().__init__("to", subcommand, destination, **kwargs)
 
+    def to_pandas(self, *inputs: str | None, stdin: Any = None) -> pd.DataFrame:
+        """
+        Convert one CSV input (or `stdin`) with `to parquet` and load the resulting Parquet
+        file into a pandas DataFrame with the pyarrow backend. Requires pyarrow.
+        """
+        from dartfx.qsv.arrow import read_parquet
+
+        subcommand, destination = self.init_args[:2]
+        if subcommand != "parquet":
+            raise ValueError(f"Only 'to parquet' results can be loaded into pandas, not 'to {subcommand}'.")
+        paths = [os.fspath(i) for i in inputs if i is not None]
+        if len(paths) > 1:
+            raise ValueError("to_pandas() converts a single input.")
+        if paths and paths[0] != "-":
+            default_name = os.path.splitext(os.path.basename(paths[0]))[0]
+        else:
+            default_name = "stdin"
+        self.run(*paths, stdin=stdin)
+        return read_parquet(os.path.join(destination, f"{self.params.get('table') or default_name}.parquet"))
+
 
 class ToJsonl(QSVCommand):
     """Convert CSV to newline-delimited JSON."""
@@ -695,11 +1410,250 @@ class Validate(QSVCommand):
         super().__init__("validate", **kwargs)
         self.json_schema = json_schema
 
-    def run(self, *input_paths: str | None) -> str:
+    def _build_args(self, *input_paths: str | None) -> list[str]:
         args = [p for p in input_paths if p is not None]
         if self.json_schema:
             args.append(self.json_schema)
-        return super().run(*args)
+        return super()._build_args(*args)
+
+
+# --- Pipelines ---
+
+
+class PipelineStage(BaseModel):
+    """Outcome of one stage of a `Pipeline` run."""
+
+    command: str
+    args: list[str]
+    returncode: int | None = None
+    stderr: str = ""
+    # Occupancy of the pipe between this stage and the next one (None for the last stage,
+    # or when sampling is disabled/unsupported). `backpressure` is the fraction of samples
+    # in which the pipe was full, i.e. the next stage could not keep up with this one.
+    pipe_capacity: int | None = None
+    peak_pipe_bytes: int | None = None
+    backpressure: float | None = None
+
+
+class PipelineResult(BaseModel):
+    """Outcome of a `Pipeline` run: per-stage status plus the last stage's output."""
+
+    stages: list[PipelineStage]
+    stdout: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return all(stage.returncode == 0 for stage in self.stages)
+
+    def failed_stage(self) -> PipelineStage | None:
+        """
+        Returns the stage that caused the pipeline to fail, if any.
+        When a stage stops early, the stages before it fail with a broken pipe (SIGPIPE or
+        EPIPE), so the failure furthest down the chain is the one that is reported.
+        """
+        failed = [stage for stage in self.stages if stage.returncode != 0]
+        return failed[-1] if failed else None
+
+
+class PipelineError(subprocess.CalledProcessError):
+    """Raised when a stage of a `Pipeline` fails. The full report is available as `result`."""
+
+    def __init__(self, result: PipelineResult):
+        stage = result.failed_stage()
+        assert stage is not None
+        super().__init__(stage.returncode or 0, ["qsv", stage.command, *stage.args], stderr=stage.stderr)
+        self.result = result
+
+
+class _PipeMonitor:
+    """
+    Periodically samples how many bytes are queued in each inter-stage pipe.
+
+    The parent keeps a duplicate of each pipe's read end for `ioctl(FIONREAD)`. The duplicate
+    is closed as soon as the downstream stage exits, so upstream stages still get SIGPIPE.
+    """
+
+    def __init__(self, procs: list[subprocess.Popen], fds: list[int], stages: list[PipelineStage], interval: float):
+        self.procs = procs
+        self.fds: list[int | None] = list(fds)
+        self.stages = stages
+        self.interval = interval
+        self.samples = [0] * len(fds)
+        self.full_samples = [0] * len(fds)
+        get_pipe_size = getattr(fcntl, "F_GETPIPE_SZ", None)
+        for i, fd in enumerate(fds):
+            stage = stages[i]
+            stage.peak_pipe_bytes = 0
+            if fcntl is not None and get_pipe_size is not None:
+                stage.pipe_capacity = fcntl.fcntl(fd, get_pipe_size)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="qsv-pipe-monitor", daemon=True)
+        self._thread.start()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self) -> None:
+        if fcntl is None or termios is None:
+            return
+        for i, fd in enumerate(self.fds):
+            if fd is None:
+                continue
+            if self.procs[i + 1].poll() is not None:
+                os.close(fd)
+                self.fds[i] = None
+                continue
+            queued = struct.unpack("i", fcntl.ioctl(fd, termios.FIONREAD, b"\0\0\0\0"))[0]
+            stage = self.stages[i]
+            stage.peak_pipe_bytes = max(stage.peak_pipe_bytes or 0, queued)
+            self.samples[i] += 1
+            if stage.pipe_capacity and queued >= stage.pipe_capacity:
+                self.full_samples[i] += 1
+
+    def close(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        for i, fd in enumerate(self.fds):
+            if fd is not None:
+                os.close(fd)
+                self.fds[i] = None
+            if self.samples[i] and self.stages[i].pipe_capacity:
+                self.stages[i].backpressure = self.full_samples[i] / self.samples[i]
+
+
+class Pipeline:
+    """
+    A chain of qsv commands whose processes are connected stdout-to-stdin through OS pipes.
+
+    Intermediate data never passes through Python; only the last stage's output is read
+    (by `run()` or `stream()`). Inputs given to `run()`/`stream()` go to the first stage,
+    every later stage reads from stdin.
+
+    Example:
+        >>> result = (Select("a,b") | Search("foo") | Frequency()).run("data.csv")
+        >>> result.stdout, [stage.returncode for stage in result.stages]
+    """
+
+    def __init__(self, *commands: QSVCommand):
+        self.commands: list[QSVCommand] = list(commands)
+
+    def __or__(self, other: QSVCommand | Pipeline) -> Pipeline:
+        if isinstance(other, Pipeline):
+            return Pipeline(*self.commands, *other.commands)
+        return Pipeline(*self.commands, other)
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def __repr__(self) -> str:
+        return " | ".join(f"qsv {cmd.command}".strip() for cmd in self.commands)
+
+    @contextlib.contextmanager
+    def _open(
+        self, inputs: tuple[str | None, ...], monitor_interval: float | None, stdin: Any = None
+    ) -> Iterator[tuple[IO[bytes], PipelineResult]]:
+        if not self.commands:
+            raise ValueError("Cannot run an empty pipeline.")
+        result = PipelineResult(stages=[])
+        procs: list[subprocess.Popen] = []
+        stderr_files: list[IO[bytes]] = []
+        read_fds: list[int] = []
+        monitor: _PipeMonitor | None = None
+        feeder: _StdinFeeder | None = None
+        prev_stdout: IO[bytes] | None = None
+        counter: _CountingReader | None = None
+        # Stages run together, so they must not wait on each other's CPUs (that could deadlock)
+        cpu_slots = contextlib.ExitStack()
+        try:
+            for i, command in enumerate(self.commands):
+                if i == 0:
+                    command._prepare_inputs(*inputs)
+                args = command._build_args(*inputs) if i == 0 else command._build_args()
+                args, env = cpu_slots.enter_context(_cpu_slot(command.command, args, block=False))
+                argv = _qsv_argv(command.command, args)
+                result.stages.append(PipelineStage(command=command.command, args=args))
+                stderr_files.append(tempfile.TemporaryFile())
+                if i == 0:
+                    proc, feeder = _start_process(argv, stdin, subprocess.PIPE, stderr_files[-1], env)
+                else:
+                    proc = _MeasuredPopen(
+                        argv, stdin=prev_stdout, stdout=subprocess.PIPE, stderr=stderr_files[-1], env=env
+                    )
+                procs.append(proc)
+                if prev_stdout is not None:
+                    if monitor_interval and fcntl is not None:
+                        read_fds.append(os.dup(prev_stdout.fileno()))
+                    # Only the child may hold the read end, so upstream gets SIGPIPE if it exits.
+                    prev_stdout.close()
+                prev_stdout = proc.stdout
+            if read_fds:
+                monitor = _PipeMonitor(procs, read_fds, result.stages, monitor_interval or 0)
+                read_fds = []
+            assert prev_stdout is not None
+            counter = _CountingReader(prev_stdout.raw)  # type: ignore[attr-defined]
+            prev_stdout = io.BufferedReader(counter, DEFAULT_CHUNK_SIZE)
+            yield prev_stdout, result
+        except BaseException:
+            for proc in procs:
+                proc.kill()
+            raise
+        finally:
+            if prev_stdout is not None:
+                prev_stdout.close()
+            for fd in read_fds:
+                os.close(fd)
+            for proc in procs:
+                proc.wait()
+            cpu_slots.close()
+            if monitor is not None:
+                monitor.close()
+            for i, (stage, proc, stderr_file) in enumerate(zip(result.stages, procs, stderr_files, strict=False)):
+                stage.returncode = proc.returncode
+                stderr_file.seek(0)
+                stderr = stderr_file.read()
+                stage.stderr = stderr.decode("utf-8", errors="replace")
+                stderr_file.close()
+                # Inter-stage pipes are not read by Python, so only the last stage's stdout is counted
+                stdout_bytes = counter.bytes_read if i == len(procs) - 1 and counter is not None else None
+                _record_process(stage.command, stage.args, proc, feeder if i == 0 else None, stdout_bytes, len(stderr))
+        if feeder is not None:
+            feeder.join()
+
+    def run(
+        self,
+        *inputs: str | None,
+        check: bool = True,
+        monitor_interval: float | None = 0.05,
+        stdin: Any = None,
+    ) -> PipelineResult:
+        """
+        Run the pipeline and return a `PipelineResult` holding the last stage's decoded stdout,
+        and each stage's exit status, stderr and output-pipe backpressure.
+
+        Args:
+            inputs: Inputs of the first stage.
+            check: Raise a `PipelineError` if any stage fails.
+            monitor_interval: Seconds between pipe occupancy samples, or None to disable sampling.
+            stdin: Data fed to the first stage (see `QSVCommand.run`).
+        """
+        with self._open(inputs, monitor_interval, stdin) as (stdout, result):
+            data = stdout.read()
+        result.stdout = _decode_text(data)
+        if check and not result.ok:
+            raise PipelineError(result)
+        return result
+
+    def stream(self, *inputs: str | None, chunk_size: int = DEFAULT_CHUNK_SIZE, stdin: Any = None) -> Iterator[bytes]:
+        """
+        Run the pipeline and yield the last stage's stdout incrementally.
+        Closing the iterator early kills every stage. Raises a `PipelineError` if any stage fails.
+        """
+        with self._open(inputs, None, stdin) as (stdout, result):
+            while chunk := stdout.read1(chunk_size):  # type: ignore[attr-defined]
+                yield chunk
+        if not result.ok:
+            raise PipelineError(result)
 
 
 # --- Function Wrappers for Backward Compatibility ---
@@ -0,0 +1,321 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from typing import Literal
+
+from pydantic import BaseModel
+
+try:  # POSIX only, used to serialise index builds across processes
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+# Commands that use a <input>.idx file when one exists (stats and frequency also run in parallel with it)
+INDEXED_COMMANDS = frozenset({"count", "frequency", "sample", "slice", "stats"})
+
+DEFAULT_MIN_INDEX_SIZE = 16 * 1024**2
+
+# Inputs qsv cannot index
+_UNINDEXABLE_SUFFIXES = (".sz", ".idx")
+
+
+class IndexDecision(BaseModel):
+    """What the `IndexManager` did for one input file."""
+
+    path: str
+    action: Literal["indexed", "reused", "rebuilt", "skipped", "failed"]
+    reason: str
+    size: int | None = None
+    elapsed: float = 0.0
+
+
+def index_path(path: str) -> str:
+    """Returns the path of the index qsv uses for a CSV file."""
+    return path + ".idx"
+
+
+def is_index_fresh(path: str) -> bool:
+    """True if `path` has an index that is not older than the file itself."""
+    try:
+        idx_mtime = os.stat(index_path(path)).st_mtime_ns
+    except FileNotFoundError:
+        return False
+    return idx_mtime >= os.stat(path).st_mtime_ns
+
+
+class StaleIndexError(ValueError):
+    """Raised when a CSV file's index is missing or older than the file."""
+
+
+class CsvIndex:
+    """
+    Random access to the rows of a CSV file through its qsv index, without running qsv.
+
+    Both the `.idx` file and the CSV are memory-mapped: the row count is read from the last
+    index entry in O(1), row N is resolved to its byte offset with one lookup, and rows are
+    returned as `memoryview` slices of the mapped CSV (raw bytes, line terminator included),
+    so nothing is copied. Row numbers are 0-based and exclude the header unless `has_headers`
+    is False.
+
+    The index must be at least as recent as the CSV (`StaleIndexError` otherwise), and the
+    file must not be modified while it is open. Views returned by `get_rows()` must be
+    released before `close()`.
+
+    Example:
+        >>> with CsvIndex("data.csv") as index:
+        ...     print(index.row_count, bytes(index.get_rows(1000, 1)[0]))
+    """
+
+    def __init__(self, path: str | os.PathLike[str], has_headers: bool = True, check_fresh: bool = True):
+        self.path = os.fspath(path)
+        self.has_headers = has_headers
+        if check_fresh and not is_index_fresh(self.path):
+            state = "older than the file" if os.path.exists(index_path(self.path)) else "missing"
+            raise StaleIndexError(f"The index of {self.path} is {state}, run qsv index first.")
+        with open(index_path(self.path), "rb") as f:
+            self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        size = len(self._index)
+        if size < 8 or size % 8:
+            self._index.close()
+            raise ValueError(f"{index_path(self.path)} is not a qsv index.")
+        (self.record_count,) = struct.unpack_from(">Q", self._index, size - 8)
+        if (self.record_count + 1) * 8 != size:
+            self._index.close()
+            raise ValueError(
+                f"{index_path(self.path)} is corrupt: it holds {size // 8 - 1} offsets, not {self.record_count}."
+            )
+        self._data: mmap.mmap | None = None
+        self._data_size = os.path.getsize(self.path)
+
+    def __enter__(self) -> CsvIndex:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def close(self) -> None:
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        self._index.close()
+
+    @property
+    def row_count(self) -> int:
+        """Number of data rows (records, without the header if `has_headers`)."""
+        return max(0, self.record_count - self._first)
+
+    def __len__(self) -> int:
+        return self.row_count
+
+    @property
+    def _first(self) -> int:
+        return 1 if self.has_headers else 0
+
+    def _record_offsets(self, first: int, n: int) -> tuple[int, ...]:
+        """Byte offsets of records first..first+n, the offset past the last record being the file size."""
+        available = min(n + 1, self.record_count - first)
+        offsets = struct.unpack_from(f">{available}Q", self._index, first * 8) if available > 0 else ()
+        return offsets + (self._data_size,) * (n + 1 - available)
+
+    def offset(self, row: int) -> int:
+        """Byte offset in the CSV of the start of data row `row`."""
+        if not 0 <= row < self.row_count:
+            raise IndexError(f"Row {row} is out of range, the file has {self.row_count} rows.")
+        return struct.unpack_from(">Q", self._index, (row + self._first) * 8)[0]
+
+    def byte_range(self, start: int, n: int) -> tuple[int, int]:
+        """Byte range (start, end) holding data rows start..start+n (clipped to the file)."""
+        if start < 0 or n < 0:
+            raise IndexError("start and n must not be negative.")
+        start = min(start, self.row_count)
+        n = min(n, self.row_count - start)
+        offsets = self._record_offsets(start + self._first, n)
+        return offsets[0], offsets[-1]
+
+    def _mapped(self) -> memoryview:
+        if self._data is None:
+            if self._data_size == 0:
+                return memoryview(b"")
+            with open(self.path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._data)
+
+    def header(self) -> memoryview:
+        """The raw header record (empty without headers)."""
+        if not self.has_headers or not self.record_count:
+            return memoryview(b"")
+        return self._mapped()[: self._record_offsets(0, 1)[1]]
+
+    def get_rows(self, start: int, n: int) -> list[memoryview]:
+        """Returns data rows start..start+n (fewer at the end of the file) as views of the mapped CSV."""
+        if start < 0 or n < 0:
+            raise IndexError("start and n must not be negative.")
+        n = max(0, min(n, self.row_count - start))
+        if not n:
+            return []
+        offsets = self._record_offsets(start + self._first, n)
+        data = self._mapped()
+        return [data[offsets[i] : offsets[i + 1]] for i in range(n)]
+
+
+class IndexManager:
+    """
+    Creates and refreshes the `.idx` files of the inputs of index-accelerated commands.
+
+    An input is indexed when it is at least `min_size` bytes and has no index, and its index
+    is rebuilt when it is older than the file (qsv refuses to use a stale index). Existing
+    fresh indexes are always reused, whatever the file size.
+
+    Builds are serialised per file within the process (a lock per path) and across processes
+    (an flock on a lock file in the temporary directory); the index is written to a temporary
+    file and renamed into place, so readers never see a partial index.
+
+    Every decision is kept in `decisions` (the most recent `history` ones) and passed to
+    `on_decision` if given.
+    """
+
+    def __init__(
+        self,
+        min_size: int = DEFAULT_MIN_INDEX_SIZE,
+        commands: Iterable[str] = INDEXED_COMMANDS,
+        on_decision: Callable[[IndexDecision], None] | None = None,
+        history: int = 1000,
+    ):
+        self.min_size = min_size
+        self.commands = frozenset(commands)
+        self.on_decision = on_decision
+        self.decisions: collections.deque[IndexDecision] = collections.deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._path_locks: dict[str, threading.Lock] = {}
+
+    def _record(self, decision: IndexDecision) -> IndexDecision:
+        self.decisions.append(decision)
+        if self.on_decision is not None:
+            self.on_decision(decision)
+        return decision
+
+    @contextlib.contextmanager
+    def _locked(self, path: str) -> Iterator[None]:
+        with self._lock:
+            path_lock = self._path_locks.setdefault(os.path.abspath(path), threading.Lock())
+        with path_lock:
+            if fcntl is None:
+                yield
+                return
+            lock_dir = os.path.join(tempfile.gettempdir(), "dartfx-qsv-index-locks")
+            os.makedirs(lock_dir, exist_ok=True)
+            key = os.path.abspath(path).encode("utf-8")
+            lock_name = hashlib.sha256(key).hexdigest()[:32] + ".lock"
+            with open(os.path.join(lock_dir, lock_name), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _build(self, path: str) -> None:
+        from dartfx.qsv import cmd as qsv_cmd
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".", suffix=".idx.tmp")
+        os.close(fd)
+        try:
+            qsv_cmd._run_qsv_command("index", ["--output", tmp_path, path])
+            os.replace(tmp_path, index_path(path))
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+            raise
+
+    def ensure(self, path: str) -> IndexDecision:
+        """Make sure `path` has a fresh index if it should have one, and report what was done."""
+        try:
+            size = os.stat(path).st_size
+        except OSError as e:
+            return self._record(IndexDecision(path=path, action="skipped", reason=f"not accessible: {e}"))
+        if path.endswith(_UNINDEXABLE_SUFFIXES):
+            return self._record(IndexDecision(path=path, action="skipped", reason="format not indexable", size=size))
+
+        has_index = os.path.exists(index_path(path))
+        if has_index and is_index_fresh(path):
+            return self._record(IndexDecision(path=path, action="reused", reason="index is fresh", size=size))
+        if not has_index and size < self.min_size:
+            return self._record(
+                IndexDecision(path=path, action="skipped", reason=f"smaller than {self.min_size} bytes", size=size)
+            )
+
+        start = time.perf_counter()
+        with self._locked(path):
+            # Another thread or process may have built it while we waited
+            if is_index_fresh(path):
+                return self._record(IndexDecision(path=path, action="reused", reason="built concurrently", size=size))
+            stale = os.path.exists(index_path(path))
+            try:
+                self._build(path)
+            except Exception as e:
+                return self._record(
+                    IndexDecision(
+                        path=path,
+                        action="failed",
+                        reason=str(getattr(e, "stderr", None) or e).strip(),
+                        size=size,
+                        elapsed=time.perf_counter() - start,
+                    )
+                )
+        return self._record(
+            IndexDecision(
+                path=path,
+                action="rebuilt" if stale else "indexed",
+                reason="index was older than the file" if stale else f"at least {self.min_size} bytes",
+                size=size,
+                elapsed=time.perf_counter() - start,
+            )
+        )
+
+    def prepare(self, command: str, inputs: Iterable[str | None]) -> list[IndexDecision]:
+        """Ensure indexes for the file inputs of `command` if it benefits from them."""
+        if command not in self.commands:
+            return []
+        paths = [os.fspath(i) for i in inputs if i is not None]
+        return [self.ensure(path) for path in paths if path != "-" and os.path.isfile(path)]
+
+
+def enable_auto_index(manager: IndexManager | None = None) -> IndexManager:
+    """
+    Index the large inputs of index-accelerated commands before `QSVCommand` runs them, with
+    `manager` (a default one, indexing files of `DEFAULT_MIN_INDEX_SIZE` bytes or more, if not
+    given). This writes `.idx` files next to the input files, so it is off until enabled.
+    """
+    manager = manager or IndexManager()
+    set_index_manager(manager)
+    return manager
+
+
+def disable_auto_index() -> None:
+    """Stop indexing the inputs of `QSVCommand` runs. Existing indexes are still used by qsv."""
+    set_index_manager(None)
+
+
+def set_index_manager(manager: IndexManager | None) -> None:
+    """
+    Replace the index manager used by `QSVCommand` (None, the default, turns automatic
+    indexing off). See `enable_auto_index`.
+    """
+    from dartfx.qsv import cmd as qsv_cmd
+
+    qsv_cmd._index_manager = manager
+
+
+def get_index_manager() -> IndexManager | None:
+    """Returns the index manager used by `QSVCommand`, if any."""
+    from dartfx.qsv import cmd as qsv_cmd
+
+    return qsv_cmd._index_manager
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import csv
+import itertools
+import os
+import sqlite3
+import time
+from collections.abc import Callable, Iterable
+from typing import Any
+
+from pydantic import BaseModel
+
+from dartfx.qsv.model import QsvProfile, QsvStatsDataModel
+from dartfx.qsv.utils import (
+    _BOOLEAN_VALUES,
+    _csv_delimiter,
+    _default_table_name,
+    _resolve_primary_key,
+    _sql_profile,
+    generate_sql,
+)
+
+# Pragmas set on the connection for the load. WAL keeps readers working and makes the large
+# transactions cheap to commit, a large page cache keeps the B-tree pages being filled in memory
+DEFAULT_SQLITE_PRAGMAS: dict[str, Any] = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -256 * 1024,  # in KiB when negative: 256 MiB
+    "temp_store": "MEMORY",
+}
+DEFAULT_BATCH_SIZE = 50_000
+DEFAULT_TRANSACTION_ROWS = 1_000_000
+
+
+class LoadResult(BaseModel):
+    """Outcome of loading a CSV file into a database table."""
+
+    database: str
+    table: str
+    rows: int
+    elapsed: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _converter(declared_type: str, boolean: bool) -> Callable[[str], Any]:
+    """
+    Converts a CSV value for a column. Numbers are passed as text: SQLite's type affinity stores
+    them as INTEGER or REAL values in C, which is faster than converting them in Python.
+    Only empty values (NULL) and booleans (0/1) need converting.
+    """
+    if boolean and "INT" in declared_type.upper():
+        return lambda value: _BOOLEAN_VALUES.get(value.lower(), value) if value else None
+    return lambda value: value if value else None
+
+
+def load_sqlite(
+    csv_path: str | os.PathLike[str],
+    database: str | os.PathLike[str],
+    table_name: str | None = None,
+    schema_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+    stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None = None,
+    primary_key: list[str] | str | None = None,
+    indexes: Iterable[list[str] | str] = (),
+    if_exists: str = "fail",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    transaction_rows: int = DEFAULT_TRANSACTION_ROWS,
+    pragmas: dict[str, Any] | None = None,
+    profile: QsvProfile | None = None,
+) -> LoadResult:
+    """
+    Creates a SQLite table for a CSV file and loads the file into it, with the standard library's `sqlite3`.
+
+    The table is created from the `CREATE TABLE` statement of `generate_sql(flavor="sqlite")`,
+    so its columns get the same INTEGER/REAL/TEXT types (from the qsv schema and stats, which
+    are computed if not given). Rows are streamed from the file with `csv` and inserted with
+    `executemany` in batches of `batch_size`, committing every `transaction_rows` rows. Empty
+    values are loaded as NULL, and boolean columns as 0/1. The primary key and the `indexes`
+    are created once the rows are loaded, since building an index in one pass is much faster
+    than maintaining it during the inserts. As SQLite cannot add a primary key to an existing
+    table, the primary key is a unique index named `<table>_pkey`.
+
+    Args:
+        csv_path: The CSV file (`.tsv`/`.tab` files are read as tab-delimited, `.ssv` as semicolon-delimited).
+        database: Path of the SQLite database, created if missing.
+        table_name: Defaults to "tbl_<csv-filename>", as in `generate_sql`.
+        schema_data: Pre-computed schema data (dict, file path, or JSON string).
+        stats_data: Pre-computed stats data.
+        primary_key: Primary key column name(s), as a list or a comma-separated string.
+        indexes: Columns to index: a column name, or a list of names for a composite index.
+        if_exists: What to do if the table exists: "fail", "replace" (drop it) or "append".
+        batch_size: Rows per `executemany` call.
+        transaction_rows: Rows per transaction.
+        pragmas: Pragmas set on the connection, over `DEFAULT_SQLITE_PRAGMAS`.
+        profile: The result of `profile_once`, used instead of `schema_data` and `stats_data`.
+            When not given, the file is profiled once (stats and schema) for both the table
+            definition and the conversion of boolean columns.
+
+    Returns:
+        LoadResult: The number of rows loaded, and the time taken (`rows_per_second`).
+    """
+    if if_exists not in ("fail", "replace", "append"):
+        raise ValueError("if_exists must be 'fail', 'replace' or 'append'.")
+    if batch_size < 1 or transaction_rows < 1:
+        raise ValueError("batch_size and transaction_rows must be positive integers.")
+    csv_path = os.fspath(csv_path)
+    table_name = table_name or _default_table_name(csv_path)
+    table = _quote(table_name)
+
+    start = time.perf_counter()
+    # Profiled once: the boolean columns of the stats are needed to convert their values
+    if profile is None:
+        profile = _sql_profile(csv_path, stats_data, schema_data)
+    conn = sqlite3.connect(os.fspath(database), isolation_level=None)
+    try:
+        for name, value in {**DEFAULT_SQLITE_PRAGMAS, **(pragmas or {})}.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,)).fetchone()
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table {table_name} already exists in {database}.")
+        if exists and if_exists == "replace":
+            conn.execute(f"DROP TABLE {table}")
+        if not exists or if_exists == "replace":
+            # The primary key is created after the load
+            conn.executescript(generate_sql(csv_path, flavor="sqlite", table_name=table_name, profile=profile))
+
+        columns = [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({table})")]
+        names = [name for name, _ in columns]
+        index_columns = [(f"{table_name}_pkey", _resolve_primary_key(primary_key, names), True)] if primary_key else []
+        for columns_spec in indexes:
+            resolved = _resolve_primary_key(columns_spec, names)
+            index_columns.append((f"{table_name}_{'_'.join(resolved)}_idx", resolved, False))
+
+        booleans = {row["field"] for row in profile.stats_data if str(row.get("type", "")).lower() == "boolean"}
+        for name, prop in profile.schema_data.get("properties", {}).items():
+            types = prop.get("type", [])
+            if "boolean" in ([types] if isinstance(types, str) else types):
+                booleans.add(name)
+        converters = [_converter(declared, name in booleans) for name, declared in columns]
+
+        insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})"
+        rows = 0
+        with open(csv_path, encoding="utf-8", newline="") as f:
+            reader = csv.reader(f, delimiter=_csv_delimiter(csv_path))
+            header = next(reader, None)
+            if header is not None and len(header) != len(columns):
+                raise ValueError(f"The CSV file has {len(header)} columns, the table {table_name} has {len(columns)}.")
+            in_transaction = 0
+            conn.execute("BEGIN")
+            while batch := list(itertools.islice(reader, batch_size)):
+                conn.executemany(
+                    insert, [[convert(value) for convert, value in zip(converters, row, strict=True)] for row in batch]
+                )
+                rows += len(batch)
+                in_transaction += len(batch)
+                if in_transaction >= transaction_rows:
+                    conn.execute("COMMIT")
+                    conn.execute("BEGIN")
+                    in_transaction = 0
+            conn.execute("COMMIT")
+
+        for index_name, index_fields, unique in index_columns:
+            conn.execute(
+                f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {_quote(index_name)} "
+                f"ON {table} ({', '.join(_quote(field) for field in index_fields)})"
+            )
+    except BaseException:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return LoadResult(database=os.fspath(database), table=table_name, rows=rows, elapsed=time.perf_counter() - start)
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import bisect
+import collections
+import json
+import math
+import sys
+import threading
+from typing import Any
+
+from pydantic import BaseModel
+
+# Histogram bucket upper bounds (Prometheus `le` labels)
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+BYTES_BUCKETS = tuple(float(1024 * 4**i) for i in range(14))  # 1 KiB .. 64 GiB
+
+
+class InvocationMetrics(BaseModel):
+    """
+    Resource usage of one qsv invocation.
+
+    CPU times and `max_rss` come from the rusage returned by `os.wait4`, so they are None when
+    the process is reaped by something else (e.g. the asyncio child watcher) or on Windows.
+    Byte counts are None when the stream does not pass through this process (e.g. stdout
+    handed to a pipe).
+    """
+
+    command: str
+    args: list[str] = []
+    returncode: int | None = None
+    wall_time: float
+    user_time: float | None = None
+    system_time: float | None = None
+    max_rss: int | None = None
+    input_sizes: dict[str, int] = {}
+    stdin_bytes: int | None = None
+    stdout_bytes: int | None = None
+    stderr_bytes: int | None = None
+
+    @property
+    def cpu_time(self) -> float | None:
+        if self.user_time is None or self.system_time is None:
+            return None
+        return self.user_time + self.system_time
+
+    @property
+    def input_bytes(self) -> int:
+        return sum(self.input_sizes.values())
+
+
+def rusage_max_rss(ru_maxrss: int) -> int:
+    """Converts `ru_maxrss` to bytes (it is reported in KiB on Linux and in bytes on macOS)."""
+    return ru_maxrss if sys.platform == "darwin" else ru_maxrss * 1024
+
+
+def _format_bound(bound: float) -> str:
+    return str(int(bound)) if bound.is_integer() else str(bound)
+
+
+class Histogram:
+    """A cumulative histogram with fixed bucket bounds, as exposed by Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> float | None:
+        """Estimates the q-quantile (0 <= q <= 1) by linear interpolation within its bucket."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if i == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                return lower + (self.buckets[i] - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def to_dict(self) -> dict[str, Any]:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip([*self.buckets, math.inf], self.counts, strict=True):
+            cumulative += count
+            buckets["+Inf" if bound == math.inf else _format_bound(bound)] = cumulative
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+
+class CommandMetrics:
+    """Aggregated metrics of every invocation of one qsv command."""
+
+    HISTOGRAMS = {
+        "wall_seconds": SECONDS_BUCKETS,
+        "cpu_seconds": SECONDS_BUCKETS,
+        "max_rss_bytes": BYTES_BUCKETS,
+        "input_bytes": BYTES_BUCKETS,
+        "stdout_bytes": BYTES_BUCKETS,
+        "stderr_bytes": BYTES_BUCKETS,
+    }
+
+    def __init__(self):
+        self.invocations = 0
+        self.failures = 0
+        self.histograms = {name: Histogram(buckets) for name, buckets in self.HISTOGRAMS.items()}
+
+    def observe(self, metrics: InvocationMetrics) -> None:
+        self.invocations += 1
+        if metrics.returncode != 0:
+            self.failures += 1
+        values = {
+            "wall_seconds": metrics.wall_time,
+            "cpu_seconds": metrics.cpu_time,
+            "max_rss_bytes": metrics.max_rss,
+            "input_bytes": metrics.input_bytes if metrics.input_sizes else None,
+            "stdout_bytes": metrics.stdout_bytes,
+            "stderr_bytes": metrics.stderr_bytes,
+        }
+        for name, value in values.items():
+            if value is not None:
+                self.histograms[name].observe(value)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "invocations": self.invocations,
+            "failures": self.failures,
+            **{name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+
+class MetricsRegistry:
+    """
+    In-process registry of qsv invocation metrics.
+
+    Every invocation made through `dartfx.qsv.cmd` is recorded here: the most recent
+    `history` ones are kept as `InvocationMetrics`, and all of them feed per-command
+    histograms of wall time, CPU time, peak RSS and bytes in/out. The registry can be
+    exported as JSON (`to_json()`) or in the Prometheus text format (`to_prometheus()`).
+    """
+
+    def __init__(self, history: int = 1000):
+        self._lock = threading.Lock()
+        self.recent: collections.deque[InvocationMetrics] = collections.deque(maxlen=history)
+        self.commands: dict[str, CommandMetrics] = {}
+
+    def record(self, metrics: InvocationMetrics) -> None:
+        with self._lock:
+            self.recent.append(metrics)
+            command = self.commands.get(metrics.command)
+            if command is None:
+                command = self.commands[metrics.command] = CommandMetrics()
+            command.observe(metrics)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.recent.clear()
+            self.commands.clear()
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {name: command.to_dict() for name, command in sorted(self.commands.items())}
+
+    def to_json(self, indent: int | None = None) -> str:
+        return json.dumps(self.to_dict(), indent=indent)
+
+    def to_prometheus(self, prefix: str = "qsv") -> str:
+        """Export the per-command counters and histograms in the Prometheus text exposition format."""
+        commands = self.to_dict()
+        lines = [
+            f"# HELP {prefix}_invocations_total Number of qsv invocations.",
+            f"# TYPE {prefix}_invocations_total counter",
+        ]
+        for name, data in commands.items():
+            lines.append(f'{prefix}_invocations_total{{command="{name}"}} {data["invocations"]}')
+        lines += [
+            f"# HELP {prefix}_failures_total Number of qsv invocations that exited with a non-zero status.",
+            f"# TYPE {prefix}_failures_total counter",
+        ]
+        for name, data in commands.items():
+            lines.append(f'{prefix}_failures_total{{command="{name}"}} {data["failures"]}')
+        for histogram in CommandMetrics.HISTOGRAMS:
+            metric = f"{prefix}_{histogram}"
+            lines += [
+                f"# HELP {metric} Per-invocation {histogram.replace('_', ' ')} of qsv commands.",
+                f"# TYPE {metric} histogram",
+            ]
+            for name, data in commands.items():
+                values = data[histogram]
+                for bound, count in values["buckets"].items():
+                    lines.append(f'{metric}_bucket{{command="{name}",le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{command="{name}"}} {values["sum"]}')
+                lines.append(f'{metric}_count{{command="{name}"}} {values["count"]}')
+        return "\n".join(lines) + "\n"
+
+
+def set_metrics_registry(registry: MetricsRegistry | None) -> None:
+    """Replace the registry qsv invocations are recorded in. Pass None to stop recording."""
+    from dartfx.qsv import cmd as qsv_cmd
+
+    qsv_cmd._metrics_registry = registry
+
+
+def get_metrics_registry() -> MetricsRegistry | None:
+    """Returns the registry qsv invocations are recorded in, if any."""
+    from dartfx.qsv import cmd as qsv_cmd
+
+    return qsv_cmd._metrics_registry
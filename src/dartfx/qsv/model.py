@@ -1,12 +1,57 @@
+from __future__ import annotations
+
+import hashlib
 import json
 import os
+from typing import TYPE_CHECKING, Any
 
 from pydantic import BaseModel, Field, computed_field
 
+if TYPE_CHECKING:
+    from dartfx.qsv.cmd import Stats
+
+# Bytes hashed at the start of a file, and just before the end of the stored stats, to detect rewrites
+CHECKPOINT_HASH_SIZE = 64 * 1024
+
+# Stats options that change the values qsv computes, with the value qsv uses when they are not given.
+# A stats cache is only reused when it was computed with the same values; the other options only
+# add statistics (everything, mode, quartiles...) or control how the run is done
+STATS_CACHE_OPTIONS = {
+    "select": "<All>",
+    "typesonly": False,
+    "infer_boolean": False,
+    "infer_dates": False,
+    "dates_whitelist": "sniff",
+    "prefer_dmy": False,
+    "round": 4,
+    "nulls": False,
+    "no_headers": False,
+}
+
+
+# Extensions of the delimited files qsv reads
+CSV_EXTENSIONS = (".csv", ".tsv", ".tab", ".ssv")
+
 
 class DataProduct(BaseModel):
     root: str
 
+    def data_files(self, extensions: tuple[str, ...] = CSV_EXTENSIONS) -> list[CsvDataFile]:
+        """
+        The delimited files under the root directory, in path order. Hidden directories and
+        files are skipped, as are the stats caches qsv writes next to the data (`*.stats.csv`).
+        """
+        files = []
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            subpath = os.path.relpath(dirpath, self.root)
+            for name in sorted(filenames):
+                lower = name.lower()
+                if name.startswith(".") or not lower.endswith(extensions) or ".stats." in lower:
+                    continue
+                files.append(CsvDataFile(product=self, name=name, subpath="" if subpath == "." else subpath))
+        return files
+
 
 class DataFile(BaseModel):
     product: DataProduct
@@ -116,6 +161,29 @@ class QsvStatsDataModel(BaseModel):
     }
 
 
+class QsvStatsCheckpoint(BaseModel):
+    """The part of a data file covered by stored statistics, used to refresh them incrementally."""
+
+    offset: int  # bytes covered (the end of the last row)
+    rows: int  # data rows covered
+    header_end: int  # the end of the header record (0 without headers)
+    head_sha256: str  # hash of the first bytes of the file, header included
+    tail_sha256: str  # hash of the bytes just before `offset`
+    options: dict[str, Any] = {}  # the Stats options the stats were computed with
+
+
+def _hash_range(path: str, start: int, end: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return hashlib.sha256(f.read(end - start)).hexdigest()
+
+
+def _read_byte(path: str, offset: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return f.read(1)
+
+
 class QsvStatsFile(BaseModel):
     """QSV statistics file associated with a data file."""
 
@@ -143,18 +211,222 @@ class QsvStatsFile(BaseModel):
             FileNotFoundError: If the stats file does not exist.
             json.JSONDecodeError: If the file contains invalid JSON.
         """
-        self._data = []
-        with open(self.jsonl_filepath, encoding="utf-8") as f:
+        self._data = self._read_jsonl(self.jsonl_filepath)
+        return self._data
+
+    @staticmethod
+    def _read_jsonl(path: str) -> list[QsvStatsDataModel]:
+        data = []
+        with open(path, encoding="utf-8") as f:
             for line_num, line in enumerate(f, 1):
                 line = line.strip()
                 if line:  # Skip empty lines
                     try:
                         json_data = json.loads(line)
-                        self._data.append(QsvStatsDataModel(**json_data))
+                        data.append(QsvStatsDataModel(**json_data))
                     except json.JSONDecodeError as e:
                         raise json.JSONDecodeError(f"Invalid JSON on line {line_num}: {e.msg}", e.doc, e.pos) from e
+        return data
+
+    @classmethod
+    def from_path(cls, path: str | os.PathLike[str]) -> QsvStatsFile:
+        """The statistics file of the data file at `path`."""
+        dirpath, name = os.path.split(os.path.abspath(path))
+        return cls(datafile=DataFile(product=DataProduct(root=dirpath), name=name))
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def args_filepath(self) -> str:
+        """The file where qsv records the options and input of the stats run that wrote the cache."""
+        return os.path.join(self.datafile.dirpath, f"{self.datafile.stem}.stats.{self.datafile.extension}.json")
+
+    def is_fresh(self, command: Stats | None = None) -> bool:
+        """
+        True if the JSONL stats cache written by qsv (`qsv stats --stats-jsonl`) can be used instead
+        of running `command` again.
+
+        The cache and its arguments file must not be older than the data file, the arguments
+        file must record the current size of the data file, and the stats options in
+        `STATS_CACHE_OPTIONS` must have the values given to `command` (or their qsv defaults).
+
+        Args:
+            command: The `Stats` command the stats would be computed with.
+                Defaults to `Stats(infer_dates=True, infer_boolean=True)`.
+        """
+        from dartfx.qsv.cmd import Stats
+
+        command = command or Stats(infer_dates=True, infer_boolean=True)
+        try:
+            data_stat = os.stat(self.datafile.filepath)
+            if min(os.path.getmtime(self.jsonl_filepath), os.path.getmtime(self.args_filepath)) < data_stat.st_mtime:
+                return False
+            with open(self.args_filepath, encoding="utf-8") as f:
+                args = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(args, dict) or args.get("filesize_bytes", data_stat.st_size) != data_stat.st_size:
+            return False
+        for option, default in STATS_CACHE_OPTIONS.items():
+            expected = command.params.get(option, default)
+            if expected is None:
+                expected = default
+            if f"flag_{option}" in args and args[f"flag_{option}"] != expected:
+                return False
+        return True
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def refreshed_filepath(self) -> str:
+        """
+        The file where `refresh()` stores its statistics. It is kept apart from qsv's own cache
+        (`jsonl_filepath`), whose arguments file would not describe merged statistics.
+        """
+        return os.path.join(
+            self.datafile.dirpath, f"{self.datafile.stem}.stats.{self.datafile.extension}.refresh.jsonl"
+        )
+
+    @computed_field  # type: ignore[prop-decorator]
+    @property
+    def checkpoint_filepath(self) -> str:
+        return os.path.join(
+            self.datafile.dirpath, f"{self.datafile.stem}.stats.{self.datafile.extension}.checkpoint.json"
+        )
+
+    def load_refreshed(self) -> list[QsvStatsDataModel]:
+        """
+        Load the statistics stored by `refresh()`.
+
+        Raises:
+            FileNotFoundError: If `refresh()` has not been run.
+        """
+        self._data = self._read_jsonl(self.refreshed_filepath)
         return self._data
 
+    def load_checkpoint(self) -> QsvStatsCheckpoint | None:
+        """Returns the checkpoint of the stored statistics, or None if there is none."""
+        try:
+            with open(self.checkpoint_filepath, encoding="utf-8") as f:
+                return QsvStatsCheckpoint.model_validate_json(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _save(self, data: list[QsvStatsDataModel], checkpoint: QsvStatsCheckpoint) -> list[QsvStatsDataModel]:
+        with open(self.refreshed_filepath, "w", encoding="utf-8") as f:
+            for item in data:
+                f.write(json.dumps(item.model_dump(mode="json", by_alias=True, exclude_none=True)) + "\n")
+        with open(self.checkpoint_filepath, "w", encoding="utf-8") as f:
+            f.write(checkpoint.model_dump_json())
+        self._data = data
+        return data
+
+    def _checkpoint(self, offset: int, rows: int, header_end: int, options: dict[str, Any]) -> QsvStatsCheckpoint:
+        path = self.datafile.filepath
+        return QsvStatsCheckpoint(
+            offset=offset,
+            rows=rows,
+            header_end=header_end,
+            head_sha256=_hash_range(path, 0, min(offset, CHECKPOINT_HASH_SIZE)),
+            tail_sha256=_hash_range(path, max(0, offset - CHECKPOINT_HASH_SIZE), offset),
+            options=options,
+        )
+
+    def _header_end(self, no_headers: bool) -> int:
+        from dartfx.qsv.shard import _skip_first_record
+
+        if no_headers:
+            return 0
+        with open(self.datafile.filepath, "rb") as f:
+            _skip_first_record(f)
+            return f.tell()
+
+    def _is_append_of(self, checkpoint: QsvStatsCheckpoint, options: dict[str, Any], size: int) -> bool:
+        """
+        True if the file still starts with the bytes the stored stats were computed from, and
+        these bytes end with a complete record, so that the appended bytes start a new row.
+        """
+        path = self.datafile.filepath
+        return (
+            checkpoint.options == options
+            and size >= checkpoint.offset
+            and _hash_range(path, 0, min(checkpoint.offset, CHECKPOINT_HASH_SIZE)) == checkpoint.head_sha256
+            and _hash_range(path, max(0, checkpoint.offset - CHECKPOINT_HASH_SIZE), checkpoint.offset)
+            == checkpoint.tail_sha256
+            and (checkpoint.offset == checkpoint.header_end or _read_byte(path, checkpoint.offset - 1) == b"\n")
+        )
+
+    def refresh(self, command: Stats | None = None, incremental: bool = True) -> list[QsvStatsDataModel]:
+        """
+        Compute the statistics of the data file and store them, with a checkpoint of the bytes
+        and rows they cover.
+
+        With `incremental`, a file that only had rows appended since the last refresh is not
+        scanned again. Stats and the row count are computed for the appended tail only, read
+        from the checkpoint's offset, and merged into the stored ones (see
+        `dartfx.qsv.stats.StatsAccumulator`). Medians, quartiles, modes and the other fields
+        that cannot be merged are then left empty. A full scan is done when there are no stored
+        stats or when they were computed with other options. It is also done when the start of
+        the file (header included) or the bytes before the checkpoint have changed, or when
+        the file shrank. The stats are stored in `refreshed_filepath`, qsv's own stats cache
+        is left as it is.
+
+        Args:
+            command: The `Stats` command to run. Defaults to `Stats(infer_dates=True, infer_boolean=True)`.
+            incremental: Refresh from the stored stats when possible.
+
+        Returns:
+            list[QsvStatsDataModel]: The statistics of the whole file.
+        """
+        from dartfx.qsv.cmd import Count, Stats
+        from dartfx.qsv.shard import _read_range
+        from dartfx.qsv.stats import StatsAccumulator, to_stats_model
+        from dartfx.qsv.utils import _load_stats_data
+
+        command = command or Stats(infer_dates=True, infer_boolean=True)
+        options = dict(sorted(command.params.items()))
+        no_headers = bool(command.params.get("no_headers"))
+        path = self.datafile.filepath
+        size = os.path.getsize(path)
+
+        checkpoint = self.load_checkpoint() if incremental else None
+        if (
+            checkpoint is not None
+            and os.path.exists(self.refreshed_filepath)
+            and self._is_append_of(checkpoint, options, size)
+        ):
+            if size == checkpoint.offset:
+                return self.load_refreshed()
+            # Only the appended bytes are read: once to count their rows, once (after the header) for their stats
+            tail_rows = int(Count(no_headers=True).run(stdin=_read_range(path, checkpoint.offset, size)))
+
+            def tail() -> Any:
+                yield from _read_range(path, 0, checkpoint.header_end)
+                yield from _read_range(path, checkpoint.offset, size)
+
+            accumulator = StatsAccumulator()
+            accumulator.add(self.load_refreshed(), rows=checkpoint.rows)
+            accumulator.add(_load_stats_data(command.run(stdin=tail())), rows=tail_rows)
+            rows = checkpoint.rows + tail_rows
+            return self._save(accumulator.result(), self._checkpoint(size, rows, checkpoint.header_end, options))
+
+        data = [to_stats_model(row) for row in _load_stats_data(command.run(path))]
+        rows = int(Count(no_headers=no_headers).run(path))
+        return self._save(data, self._checkpoint(size, rows, self._header_end(no_headers), options))
+
+
+class QsvProfile(BaseModel):
+    """
+    The parsed outputs of one profiling run of a data file (see `dartfx.qsv.utils.profile_once`),
+    from which any number of DDI codebooks and SQL scripts can be generated without running qsv again.
+    """
+
+    csv_path: str | None = None
+    stats_data: list[dict[str, Any]] = []  # qsv stats, one row per field
+    schema_data: dict[str, Any] = {}  # qsv schema (JSON Schema)
+    frequency_data: dict[str, Any] = {"fields": []}  # qsv frequency of the categorical columns
+    categorical_columns: list[str] = []
+    rowcount: int | None = None
+    qsv_version: str = "unknown"
+
 
 class QsvFrequencyFile(BaseModel):
     pass
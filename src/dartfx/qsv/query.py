@@ -0,0 +1,390 @@
+from __future__ import annotations
+
+import csv
+import os
+import re
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any, Literal
+
+from pydantic import BaseModel, ConfigDict
+
+from dartfx.qsv.cmd import Pipeline, QSVCommand, Search, Select, Slice, Sort, Sqlp
+from dartfx.qsv.runtime import get_runtime
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+FILTER_OPS = ("==", "!=", "<", "<=", ">", ">=", "contains", "startswith", "endswith", "regex")
+# Comparisons `qsv search` can evaluate; the others need sqlp's typed columns
+SEARCH_OPS = ("==", "!=", "contains", "startswith", "endswith", "regex")
+
+# Characters with a special meaning in both Rust and Python regular expressions
+_REGEX_META = re.compile(r"([\\.+*?()|\[\]{}^$])")
+_PLAIN_COLUMN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+class QueryOp(BaseModel):
+    """One operation recorded by a `LazyCsv`."""
+
+    model_config = ConfigDict(frozen=True)
+
+    kind: Literal["select", "filter", "sort", "slice"]
+    columns: tuple[str, ...] = ()
+    op: str | None = None
+    value: Any = None
+    ignore_case: bool = False
+    descending: bool = False
+    numeric: bool = False
+    start: int = 0
+    length: int | None = None
+
+    def __str__(self) -> str:
+        if self.kind == "select":
+            return f"select({', '.join(self.columns)})"
+        if self.kind == "filter":
+            flag = ", ignore_case" if self.ignore_case else ""
+            return f"filter({self.columns[0]} {self.op} {self.value!r}{flag})"
+        if self.kind == "sort":
+            flags = (", descending" if self.descending else "") + (", numeric" if self.numeric else "")
+            return f"sort({', '.join(self.columns)}{flags})"
+        return f"slice({self.start}, {self.length})"
+
+
+class QueryPlan(BaseModel):
+    """The plan chosen for a `LazyCsv`, as returned by `LazyCsv.plan()`."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    engine: Literal["sqlp", "pipeline"]
+    logical: list[QueryOp]
+    optimized: list[QueryOp]
+    columns_read: list[str] | None = None
+    sql: str | None = None
+    command: Any = None
+
+
+def _regex_escape(text: str) -> str:
+    return _REGEX_META.sub(r"\\\1", text)
+
+
+def _sql_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _sql_literal(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _qsv_selection(columns: tuple[str, ...] | list[str]) -> str:
+    """Build a `qsv select` expression, quoting the names that would otherwise be misread."""
+    return ",".join(name if _PLAIN_COLUMN.fullmatch(name) else '"' + name + '"' for name in columns)
+
+
+def _filter_pattern(op: QueryOp) -> str:
+    """The regular expression matching the values kept by a string filter."""
+    value = str(op.value)
+    if op.op == "regex":
+        return value
+    if op.op == "startswith":
+        return "^" + _regex_escape(value)
+    if op.op == "endswith":
+        return _regex_escape(value) + "$"
+    return _regex_escape(value)
+
+
+def _filter_sql(op: QueryOp) -> str:
+    column = _sql_identifier(op.columns[0])
+    if op.op in ("==", "!=") and op.value is None:
+        return f"{column} IS {'' if op.op == '==' else 'NOT '}NULL"
+    if op.op in ("contains", "startswith", "endswith", "regex"):
+        operator = "~*" if op.ignore_case else "~"
+        return f"CAST({column} AS VARCHAR) {operator} {_sql_literal(_filter_pattern(op))}"
+    if op.ignore_case and isinstance(op.value, str):
+        column, value = f"lower({column})", _sql_literal(op.value.lower())
+    else:
+        value = _sql_literal(op.value)
+    operator = {"==": "=", "!=": "!="}.get(op.op or "", op.op)
+    return f"{column} {operator} {value}"
+
+
+def _read_header(path: str) -> list[str] | None:
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            return next(csv.reader(f), None)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+class LazyCsv:
+    """
+    A lazy, frame-like query over one CSV file.
+
+    Operations (`select`, `filter`, `sort`, `slice`/`head`) are only recorded. When the result
+    is requested, the chain is optimised and compiled into as few passes over the data as possible:
+
+    - filters are pushed down before sorts and projections (never across a slice);
+    - projections are merged into one, applied last, and the columns actually needed are read;
+    - consecutive slices are composed.
+
+    The optimised chain is then compiled into a single `Sqlp` query if qsv has the polars
+    feature (nested sub-queries keep the semantics of filters or sorts that follow a slice),
+    or else into a minimal `Pipeline` of `select`, `search`, `sort` and `slice` processes.
+    Note that sqlp writes typed values, so numbers may be formatted differently than in the input.
+    Use `explain()` to see the plan.
+
+    Example:
+        >>> query = LazyCsv("data.csv").filter("status", "==", "active").sort("age", descending=True).head(10)
+        >>> print(query.explain())
+        >>> top10 = query.collect()
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        engine: Literal["auto", "sqlp", "pipeline"] = "auto",
+        _ops: tuple[QueryOp, ...] = (),
+    ):
+        if engine not in ("auto", "sqlp", "pipeline"):
+            raise ValueError("engine must be 'auto', 'sqlp' or 'pipeline'.")
+        self.path = os.fspath(path)
+        self.engine: Literal["auto", "sqlp", "pipeline"] = engine
+        self.ops = _ops
+
+    # --- Recording ---
+
+    def _available_columns(self) -> set[str] | None:
+        for op in reversed(self.ops):
+            if op.kind == "select":
+                return set(op.columns)
+        return None
+
+    def _check_columns(self, columns: tuple[str, ...]) -> None:
+        available = self._available_columns()
+        if available is not None:
+            missing = [name for name in columns if name not in available]
+            if missing:
+                raise ValueError(f"Columns {missing} are not in the current selection {sorted(available)}.")
+
+    def _with(self, op: QueryOp) -> LazyCsv:
+        return LazyCsv(self.path, self.engine, (*self.ops, op))
+
+    def select(self, *columns: str) -> LazyCsv:
+        """Keep (and reorder) the given columns."""
+        if not columns:
+            raise ValueError("select() needs at least one column.")
+        self._check_columns(columns)
+        return self._with(QueryOp(kind="select", columns=columns))
+
+    def filter(self, column: str, op: str, value: Any, ignore_case: bool = False) -> LazyCsv:
+        """
+        Keep the rows whose `column` satisfies `op` (one of `FILTER_OPS`) against `value`.
+        `regex` takes a Rust regular expression, as used by `qsv search`.
+        """
+        if op not in FILTER_OPS:
+            raise ValueError(f"Unknown filter operator {op!r}, expected one of {FILTER_OPS}.")
+        self._check_columns((column,))
+        return self._with(QueryOp(kind="filter", columns=(column,), op=op, value=value, ignore_case=ignore_case))
+
+    def sort(self, *columns: str, descending: bool = False, numeric: bool = False) -> LazyCsv:
+        """Sort by the given columns (stable, so earlier sorts break ties)."""
+        if not columns:
+            raise ValueError("sort() needs at least one column.")
+        self._check_columns(columns)
+        return self._with(QueryOp(kind="sort", columns=columns, descending=descending, numeric=numeric))
+
+    def slice(self, start: int = 0, length: int | None = None) -> LazyCsv:
+        """Keep `length` rows (all if None) starting at the 0-based row `start`."""
+        if start < 0 or (length is not None and length < 0):
+            raise ValueError("start and length must not be negative.")
+        return self._with(QueryOp(kind="slice", start=start, length=length))
+
+    def head(self, n: int) -> LazyCsv:
+        return self.slice(0, n)
+
+    # --- Planning ---
+
+    def optimized_ops(self) -> tuple[list[QueryOp], tuple[str, ...] | None]:
+        """
+        Returns the optimised row operations (filters, sorts and slices, in execution order)
+        and the final projection (None to keep every column).
+        """
+        projection = None
+        rows: list[QueryOp] = []
+        for op in self.ops:
+            if op.kind == "select":
+                # Projections commute with every row operation, so only the last one matters
+                projection = op.columns
+            elif op.kind == "filter":
+                # Push the filter down, before the sorts recorded since the last slice
+                position = len(rows)
+                while position > 0 and rows[position - 1].kind == "sort":
+                    position -= 1
+                rows.insert(position, op)
+            elif op.kind == "slice" and rows and rows[-1].kind == "slice":
+                previous = rows.pop()
+                start = previous.start + op.start
+                if previous.length is None:
+                    length = op.length
+                else:
+                    remaining = max(0, previous.length - op.start)
+                    length = remaining if op.length is None else min(op.length, remaining)
+                rows.append(QueryOp(kind="slice", start=start, length=length))
+            else:
+                rows.append(op)
+        return rows, projection
+
+    def _columns_read(self, rows: list[QueryOp], projection: tuple[str, ...] | None) -> list[str] | None:
+        """The columns the query needs from the file, or None if it needs all of them."""
+        if projection is None:
+            return None
+        needed = list(projection)
+        for op in rows:
+            needed.extend(name for name in op.columns if name not in needed)
+        return needed
+
+    def _resolve_engine(self) -> Literal["sqlp", "pipeline"]:
+        if self.engine != "auto":
+            return self.engine
+        return "sqlp" if get_runtime().has_feature("polars") else "pipeline"
+
+    def to_sql(self) -> str:
+        """Compile the query into one Polars SQL statement over the `_t_1` table (the input file)."""
+        rows, projection = self.optimized_ops()
+        # Start a sub-query when a filter or a sort follows a slice
+        segments: list[list[QueryOp]] = [[]]
+        for op in rows:
+            if op.kind != "slice" and any(previous.kind == "slice" for previous in segments[-1]):
+                segments.append([])
+            segments[-1].append(op)
+        source = "_t_1"
+        sql = ""
+        for i, segment in enumerate(segments):
+            last = i == len(segments) - 1
+            columns = ", ".join(_sql_identifier(name) for name in projection) if last and projection else "*"
+            parts = [f"SELECT {columns} FROM {source}"]
+            filters = [_filter_sql(op) for op in segment if op.kind == "filter"]
+            if filters:
+                parts.append("WHERE " + " AND ".join(filters))
+            keys: list[str] = []
+            seen: set[str] = set()
+            # A later (stable) sort takes precedence, earlier ones break its ties
+            for op in reversed([op for op in segment if op.kind == "sort"]):
+                for name in op.columns:
+                    if name not in seen:
+                        seen.add(name)
+                        keys.append(_sql_identifier(name) + (" DESC" if op.descending else ""))
+            if keys:
+                parts.append("ORDER BY " + ", ".join(keys))
+            for op in segment:
+                if op.kind == "slice":
+                    if op.length is not None:
+                        parts.append(f"LIMIT {op.length}")
+                    if op.start:
+                        parts.append(f"OFFSET {op.start}")
+            sql = " ".join(parts)
+            source = f"({sql}) AS _q{i + 1}"
+        return sql
+
+    def _pipeline_commands(self) -> list[QSVCommand]:
+        rows, projection = self.optimized_ops()
+        commands: list[QSVCommand] = []
+        columns_read = self._columns_read(rows, projection)
+        header = _read_header(self.path) if columns_read is not None else None
+        early_projection = None
+        if (
+            columns_read is not None
+            and header is not None
+            and len(columns_read) < len(header)
+            and any(op.kind != "slice" for op in rows)
+        ):
+            # Narrow the rows before searching or sorting them, keeping the file's column order
+            early_projection = [name for name in header if name in columns_read]
+            commands.append(Select(_qsv_selection(early_projection)))
+        for op in rows:
+            if op.kind == "filter":
+                if op.op not in SEARCH_OPS:
+                    raise ValueError(
+                        f"The {op.op!r} filter cannot be run with `qsv search`, it needs the sqlp engine "
+                        "(qsv built with the polars feature)."
+                    )
+                kwargs: dict[str, Any] = {"select": _qsv_selection(op.columns), "ignore_case": op.ignore_case}
+                if op.op in ("==", "!="):
+                    kwargs["exact"] = True
+                    kwargs["invert_match"] = op.op == "!="
+                commands.append(Search(str(op.value) if op.op in ("==", "!=") else _filter_pattern(op), **kwargs))
+            elif op.kind == "sort":
+                commands.append(Sort(select=_qsv_selection(op.columns), reverse=op.descending, numeric=op.numeric))
+            elif op.kind == "slice":
+                commands.append(Slice(start=op.start or None, len=op.length))
+        if projection is not None and list(projection) != early_projection:
+            commands.append(Select(_qsv_selection(projection)))
+        if not commands:
+            commands.append(Select("1-"))
+        return commands
+
+    def plan(self) -> QueryPlan:
+        """Optimise the query and choose how to run it, without running anything."""
+        rows, projection = self.optimized_ops()
+        engine = self._resolve_engine()
+        plan = QueryPlan(
+            engine=engine,
+            logical=list(self.ops),
+            optimized=rows + ([QueryOp(kind="select", columns=projection)] if projection else []),
+            columns_read=self._columns_read(rows, projection),
+        )
+        if engine == "sqlp":
+            plan.sql = self.to_sql()
+            plan.command = Sqlp(plan.sql)
+        else:
+            commands = self._pipeline_commands()
+            plan.command = commands[0] if len(commands) == 1 else Pipeline(*commands)
+        return plan
+
+    def explain(self) -> str:
+        """Returns a readable description of the logical plan, the optimised plan and the chosen execution."""
+        plan = self.plan()
+        lines = [
+            f"LazyCsv({self.path!r})",
+            "logical:   " + (" -> ".join(str(op) for op in plan.logical) or "(scan)"),
+            "optimized: " + (" -> ".join(str(op) for op in plan.optimized) or "(scan)"),
+            "columns:   " + (", ".join(plan.columns_read) if plan.columns_read is not None else "all"),
+            f"engine:    {plan.engine}",
+        ]
+        if plan.engine == "sqlp":
+            lines.append(f"sql:       {plan.sql}")
+        commands = plan.command.commands if isinstance(plan.command, Pipeline) else [plan.command]
+        for i, command in enumerate(commands):
+            args = command._build_args(self.path) if i == 0 else command._build_args()
+            lines.append(("run:       " if i == 0 else "         | ") + " ".join(["qsv", command.command, *args]))
+        return "\n".join(lines)
+
+    # --- Execution ---
+
+    def collect(self) -> str:
+        """Run the query and return its CSV output."""
+        command = self.plan().command
+        if isinstance(command, Pipeline):
+            return command.run(self.path, monitor_interval=None).stdout or ""
+        return command.run(self.path)
+
+    def stream(self) -> Iterator[bytes]:
+        """Run the query and yield its CSV output incrementally."""
+        return self.plan().command.stream(self.path)
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Run the query and load the result into a pandas DataFrame with the pyarrow backend."""
+        command = self.plan().command
+        if isinstance(command, Pipeline):
+            from dartfx.qsv.arrow import read_csv_buffer
+
+            return read_csv_buffer(b"".join(command.stream(self.path)))
+        return command.to_pandas(self.path)
+
+    def __repr__(self) -> str:
+        return f"LazyCsv({self.path!r}, ops=[{', '.join(str(op) for op in self.ops)}])"
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import math
+import os
+import re
+import shutil
+import subprocess
+import threading
+from typing import Any
+
+
+def _parse_version_output(output: str) -> dict[str, Any]:
+    """
+    Parse the output of `qsv --version`, e.g.
+    `qsv 20.1.0-mimalloc-apply;fetch;Luau 0.693;polars-0.51.0;python-3.12.8;to;-16-16;...`
+    into its version number, memory allocator and enabled features.
+    """
+    match = re.search(r"qsv\s+([\d\.]+)(?:-(\w+)(?=-))?-?(\S.*)?", output)
+    if not match:
+        return {"version": "unknown", "allocator": None, "features": []}
+    features = []
+    for token in (match.group(3) or "").split(";"):
+        token = token.strip()
+        # The feature list ends with the "-<jobs>-<cpus>" and memory sections
+        if not token or not (token[0].isalpha() or token[0] == "_"):
+            break
+        name = re.match(r"[A-Za-z_][A-Za-z0-9_]*", token)
+        if name:
+            features.append(name.group(0).lower())
+    return {"version": match.group(1), "allocator": match.group(2), "features": features}
+
+
+def _parse_list_output(output: str) -> list[dict[str, str]]:
+    """Parse the output of `qsv --list` into a list of command name/description objects."""
+    commands = []
+    started = False
+    for line in output.splitlines():
+        if "Installed commands" in line:
+            started = True
+            continue
+        if started and line.startswith("    "):
+            stripped = line.strip()
+            parts = stripped.split(maxsplit=1)
+            if len(parts) == 2:
+                commands.append({"name": parts[0], "description": parts[1]})
+        elif started and line.strip() == "":
+            if commands:
+                break
+    return commands
+
+
+def _parse_envlist_output(output: str) -> list[dict[str, str]]:
+    """Parse the output of `qsv --envlist` into a list of environment variable objects."""
+    env_vars = []
+    for line in output.splitlines():
+        if ":" in line:
+            parts = line.split(":", 1)
+            name = parts[0].strip()
+            value = parts[1].strip().strip('"')
+            env_vars.append({"name": name, "value": value})
+    return env_vars
+
+
+def _read_cpu_quota(directory: str) -> float | None:
+    """The CPU quota set on one cgroup directory (v2 `cpu.max` or v1 `cpu.cfs_quota_us`), if any."""
+    try:
+        with open(os.path.join(directory, "cpu.max")) as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(directory, "cpu.cfs_quota_us")) as f:
+            quota_us = int(f.read())
+        with open(os.path.join(directory, "cpu.cfs_period_us")) as f:
+            period_us = int(f.read())
+        return None if quota_us <= 0 or period_us <= 0 else quota_us / period_us
+    except (OSError, ValueError):
+        return None
+
+
+def cgroup_cpu_limit(proc_cgroup: str = "/proc/self/cgroup", root: str = "/sys/fs/cgroup") -> float | None:
+    """
+    Returns the CPU quota (in CPUs, possibly fractional) enforced on this process by its
+    cgroup or any ancestor, for cgroup v2 and v1, or None if there is no quota (or no cgroups).
+    """
+    try:
+        with open(proc_cgroup) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    candidates = []
+    for line in lines:
+        parts = line.split(":", 2)
+        if len(parts) != 3:
+            continue
+        _, controllers, path = parts
+        if controllers == "":
+            candidates.append((root, path))  # v2 unified hierarchy
+        elif "cpu" in controllers.split(","):
+            for mount in ("cpu", controllers, "cpu,cpuacct", "cpuacct,cpu"):
+                candidates.append((os.path.join(root, mount), path))
+    limits = []
+    for mount, path in candidates:
+        if not os.path.isdir(mount):
+            continue
+        directory = os.path.join(mount, path.lstrip("/"))
+        if not os.path.isdir(directory):
+            # The cgroup path is relative to another cgroup namespace, e.g. inside a container
+            directory = mount
+        while True:
+            quota = _read_cpu_quota(directory)
+            if quota is not None:
+                limits.append(quota)
+            if os.path.normpath(directory) == os.path.normpath(mount):
+                break
+            directory = os.path.dirname(directory)
+    return min(limits) if limits else None
+
+
+def available_cpus() -> int:
+    """
+    Returns the number of CPUs this process may use: the CPUs in its affinity mask, capped
+    by the cgroup CPU quota (rounded up) so that container limits are honoured.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_limit()
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+class QsvRuntime:
+    """
+    Process-wide cache of facts about the qsv binary: its resolved path, version,
+    enabled features, command list and environment settings.
+
+    The binary is resolved once per PATH value, and each `qsv --version/--list/--envlist`
+    call is made at most once. All cached values are dropped when the binary's mtime
+    (or size) changes, e.g. after a qsv upgrade.
+    """
+
+    def __init__(self, executable: str = "qsv"):
+        self.executable = executable
+        self._lock = threading.RLock()
+        self._search_path: str | None = None
+        self._path: str | None = None
+        self._signature: tuple[int, int] | None = None
+        self._outputs: dict[str, str] = {}
+
+    def _resolve(self) -> str:
+        """Resolve the binary (again if PATH changed or it moved) and drop stale cached outputs."""
+        search_path = os.environ.get("PATH", "")
+        for _attempt in range(2):
+            path = self._path
+            if path is None or search_path != self._search_path:
+                path = shutil.which(self.executable)
+                if path is None:
+                    raise RuntimeError(
+                        f"The '{self.executable}' command-line tool is not installed or not found in PATH."
+                    )
+                self._search_path = search_path
+                if path != self._path:
+                    self._path = path
+                    self._outputs.clear()
+            try:
+                st = os.stat(path)
+            except OSError:
+                self._path = None
+                continue
+            signature = (st.st_mtime_ns, st.st_size)
+            if signature != self._signature:
+                self._signature = signature
+                self._outputs.clear()
+            return path
+        raise RuntimeError(f"The '{self.executable}' command-line tool could not be accessed.")
+
+    @property
+    def path(self) -> str:
+        """Absolute path of the qsv binary. Raises a RuntimeError if qsv is not found."""
+        with self._lock:
+            return self._resolve()
+
+    def _output(self, flag: str) -> str:
+        with self._lock:
+            path = self._resolve()
+            if flag not in self._outputs:
+                result = subprocess.run([path, flag], capture_output=True, text=True, check=True)
+                self._outputs[flag] = result.stdout
+            return self._outputs[flag]
+
+    @property
+    def version_output(self) -> str:
+        """The full output of `qsv --version`."""
+        return self._output("--version")
+
+    @property
+    def version(self) -> str:
+        """The qsv version number, e.g. '19.1.0' ('unknown' if it cannot be parsed)."""
+        return _parse_version_output(self.version_output)["version"]
+
+    @property
+    def allocator(self) -> str | None:
+        """The memory allocator qsv was built with, e.g. 'mimalloc'."""
+        return _parse_version_output(self.version_output)["allocator"]
+
+    @property
+    def features(self) -> frozenset[str]:
+        """Lower-cased names of the optional features qsv was built with, e.g. 'polars', 'luau'."""
+        return frozenset(_parse_version_output(self.version_output)["features"])
+
+    def has_feature(self, name: str) -> bool:
+        return name.lower() in self.features
+
+    @property
+    def commands(self) -> list[dict[str, str]]:
+        """The installed commands, as name/description objects, from `qsv --list`."""
+        return _parse_list_output(self._output("--list"))
+
+    @property
+    def env(self) -> list[dict[str, str]]:
+        """The qsv-related environment variables, as name/value objects, from `qsv --envlist`."""
+        return _parse_envlist_output(self._output("--envlist"))
+
+    def invalidate(self) -> None:
+        """Forget everything, so the next access resolves the binary and re-runs qsv."""
+        with self._lock:
+            self._search_path = None
+            self._path = None
+            self._signature = None
+            self._outputs.clear()
+
+
+_runtime: QsvRuntime | None = None
+_runtime_lock = threading.Lock()
+
+
+def get_runtime() -> QsvRuntime:
+    """Returns the process-wide `QsvRuntime`."""
+    global _runtime
+    if _runtime is None:
+        with _runtime_lock:
+            if _runtime is None:
+                _runtime = QsvRuntime()
+    return _runtime
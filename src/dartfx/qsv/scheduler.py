@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import threading
+import uuid
+from collections.abc import Iterator
+
+from pydantic import BaseModel
+
+from dartfx.qsv.runtime import available_cpus
+
+try:  # POSIX only, used to share the budget between processes
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
+
+
+class CpuReservation(BaseModel):
+    """CPUs granted to one qsv invocation by a `CpuBudget`."""
+
+    token: str
+    jobs: int
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class CpuBudget:
+    """
+    A CPU budget shared by concurrent qsv invocations, so that parallel commands do not
+    each start one thread per core and oversubscribe the machine.
+
+    Each invocation reserves a number of CPUs for its lifetime and is told how many
+    `--jobs` to use. The grant is a fair share of the budget given the invocations already
+    running (`total // (running + 1)`), capped by the CPUs still free and by
+    `max_jobs_per_invocation`; it grows again as invocations finish. When fewer than
+    `min_jobs` CPUs are free, `acquire()` waits for a release (or, with `block=False`,
+    grants `min_jobs` anyway).
+
+    By default the budget covers this process only. With `lock_file`, reservations are kept
+    in a JSON state file guarded by an flock, so several processes share one budget;
+    reservations of processes that died are discarded.
+
+    `total` defaults to `available_cpus()`, which honours the CPU affinity mask and cgroup quotas.
+    """
+
+    def __init__(
+        self,
+        total: int | None = None,
+        lock_file: str | os.PathLike[str] | None = None,
+        min_jobs: int = 1,
+        max_jobs_per_invocation: int | None = None,
+        poll_interval: float = 0.05,
+    ):
+        if total is not None and total < 1:
+            raise ValueError("total must be a positive integer.")
+        if min_jobs < 1:
+            raise ValueError("min_jobs must be a positive integer.")
+        self._total = total
+        self.lock_file = os.fspath(lock_file) if lock_file is not None else None
+        self.min_jobs = min_jobs
+        self.max_jobs_per_invocation = max_jobs_per_invocation
+        self.poll_interval = poll_interval
+        self._condition = threading.Condition()
+        self._reservations: dict[str, int] = {}
+
+    @property
+    def total(self) -> int:
+        return self._total or available_cpus()
+
+    @contextlib.contextmanager
+    def _state(self) -> Iterator[dict[str, int]]:
+        """
+        Yields the reservations, keyed by "<pid>:<token>" in cross-process mode.
+        Must be called with the condition held; changes are written back on exit.
+        """
+        if self.lock_file is None or fcntl is None:
+            yield self._reservations
+            return
+        with open(self.lock_file, "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = {key: int(jobs) for key, jobs in json.loads(f.read() or "{}").items()}
+                except (ValueError, AttributeError):
+                    state = {}
+                alive = {pid: _pid_alive(int(pid)) for pid in {key.split(":", 1)[0] for key in state}}
+                state = {key: jobs for key, jobs in state.items() if alive[key.split(":", 1)[0]]}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _key(self, token: str) -> str:
+        return f"{os.getpid()}:{token}" if self.lock_file is not None else token
+
+    def in_use(self) -> int:
+        """Number of CPUs currently reserved."""
+        with self._condition, self._state() as state:
+            return sum(state.values())
+
+    def _grant(self, state: dict[str, int], want: int | None, fixed: bool) -> int | None:
+        total = self.total
+        free = total - sum(state.values())
+        if fixed:
+            assert want is not None
+            return want if free >= min(want, total) else None
+        share = max(self.min_jobs, total // (len(state) + 1))
+        if self.max_jobs_per_invocation is not None:
+            share = min(share, self.max_jobs_per_invocation)
+        if want is not None:
+            share = min(share, want)
+        if free < self.min_jobs:
+            return None
+        return max(self.min_jobs, min(share, free))
+
+    def acquire(self, want: int | None = None, block: bool = True, fixed: bool = False) -> CpuReservation:
+        """
+        Reserve CPUs for one invocation.
+
+        Args:
+            want: The most CPUs the invocation can use (None for as many as its fair share).
+            block: Wait until CPUs are free. If False, over-commit `min_jobs` CPUs instead.
+            fixed: Reserve exactly `want` CPUs, e.g. for a command given an explicit `--jobs`.
+        """
+        token = uuid.uuid4().hex
+        key = self._key(token)
+        with self._condition:
+            while True:
+                with self._state() as state:
+                    jobs = self._grant(state, want, fixed)
+                    if jobs is None and not block:
+                        jobs = want if fixed and want is not None else self.min_jobs
+                    if jobs is not None:
+                        state[key] = jobs
+                        return CpuReservation(token=token, jobs=jobs)
+                # Releases by other processes are not signalled, so poll the state file
+                self._condition.wait(self.poll_interval if self.lock_file is not None else None)
+
+    def release(self, reservation: CpuReservation) -> None:
+        with self._condition:
+            with self._state() as state:
+                state.pop(self._key(reservation.token), None)
+            self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def reserve(self, want: int | None = None, block: bool = True, fixed: bool = False) -> Iterator[int]:
+        """Context manager reserving CPUs for the duration of the block, yielding the number granted."""
+        reservation = self.acquire(want, block, fixed)
+        try:
+            yield reservation.jobs
+        finally:
+            self.release(reservation)
+
+
+def enable_cpu_budget(budget: CpuBudget | None = None, use_env: bool = False) -> CpuBudget:
+    """
+    Make every qsv invocation of this process that accepts `--jobs` reserve CPUs from a
+    `CpuBudget` (a default, process-wide one if not given).
+
+    The granted count is passed as `--jobs`, or as the `QSV_MAX_JOBS` environment variable
+    with `use_env=True`. Commands given an explicit `jobs` keep it, and reserve that many CPUs.
+    """
+    from dartfx.qsv import cmd as qsv_cmd
+
+    budget = budget or CpuBudget()
+    qsv_cmd._cpu_budget = budget
+    qsv_cmd._cpu_budget_env = use_env
+    return budget
+
+
+def disable_cpu_budget() -> None:
+    """Stop coordinating `--jobs` between qsv invocations."""
+    from dartfx.qsv import cmd as qsv_cmd
+
+    qsv_cmd._cpu_budget = None
@@ -0,0 +1,304 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any
+
+# The server's dependencies are imported when it runs, so that `ProfileClient` stays cheap to import
+if TYPE_CHECKING:
+    from dartfx.qsv.cache import ResultCache
+
+SOCKET_ENV_VAR = "DARTFX_QSV_SOCKET"
+
+# Parameters accepted by each operation
+OPERATION_PARAMS = {
+    "ping": frozenset(),
+    "metrics": frozenset(),
+    "shutdown": frozenset(),
+    "stats": frozenset({"csv_path"}),
+    "toddic": frozenset(
+        {
+            "csv_path",
+            "stats_data",
+            "schema_data",
+            "frequency_data",
+            "version",
+            "categorical_threshold",
+            "categorical_columns",
+            "speculative_frequency",
+        }
+    ),
+    "tosql": frozenset(
+        {
+            "csv_path",
+            "schema_data",
+            "stats_data",
+            "frequency_data",
+            "flavor",
+            "table_name",
+            "schema_name",
+            "primary_key",
+        }
+    ),
+}
+# The rows of a CSV file (tosql --insert-data) are not served: they are streamed by the client
+# with `write_sql`, as a response is held whole in memory and kept in the response cache
+
+# Parameters naming input files, whose fingerprints are part of the response cache key
+FILE_PARAMS = ("csv_path", "stats_data", "schema_data", "frequency_data")
+
+
+def default_socket_path() -> str:
+    """The socket used when none is given: `$DARTFX_QSV_SOCKET`, else one in the user's runtime directory."""
+    path = os.environ.get(SOCKET_ENV_VAR)
+    if path:
+        return path
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "dartfx-qsv.sock")
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"dartfx-qsv-{uid}.sock")
+
+
+class ServerError(RuntimeError):
+    """Raised by `ProfileClient` when the server could not handle a request."""
+
+    def __init__(self, message: str, error_type: str | None = None):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+def _file_fingerprint(path: str) -> list[int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+class ProfileServer:
+    """
+    A long-lived process serving `stats`, `toddic` and `tosql` requests over a Unix socket.
+
+    The server keeps everything a CLI invocation would otherwise rebuild: the resolved qsv
+    runtime, a `ResultCache` through which every qsv run is routed, and an in-memory LRU of
+    responses (parsed stats, DDI XML, SQL scripts). Responses are keyed by the operation,
+    its parameters and the (device, inode, size, mtime) of the files they name, so an edited
+    file is profiled again. Identical requests that arrive while one is being computed wait
+    for it instead of running qsv again.
+
+    The protocol is one JSON object per connection, `{"op": ..., "params": {...}}`, answered
+    by `{"ok": true, "result": ...}` or `{"ok": false, "error": ..., "type": ...}`.
+    File paths must be absolute, since the server does not share the client's working directory.
+
+    Example:
+        >>> server = ProfileServer("/tmp/qsv.sock")
+        >>> server.warm()
+        >>> server.serve_forever()
+    """
+
+    def __init__(
+        self,
+        socket_path: str | os.PathLike[str] | None = None,
+        cache: ResultCache | None = None,
+        max_responses: int = 256,
+    ):
+        self.socket_path = os.fspath(socket_path) if socket_path is not None else default_socket_path()
+        self.cache = cache
+        self.max_responses = max_responses
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._responses: collections.OrderedDict[str, Any] = collections.OrderedDict()
+        self._inflight: dict[str, Future[Any]] = {}
+        self._server: socketserver.ThreadingUnixStreamServer | None = None
+
+    def warm(self) -> None:
+        """Resolve the qsv runtime and route qsv runs through the result cache, ahead of the first request."""
+        from dartfx.qsv.cache import enable_result_cache
+        from dartfx.qsv.runtime import get_runtime
+
+        self.cache = enable_result_cache(self.cache)
+        get_runtime().version  # noqa: B018 - resolves and caches the binary and its version
+
+    # --- Request handling ---
+
+    def _key(self, op: str, params: dict[str, Any]) -> str:
+        files = {
+            name: _file_fingerprint(params[name])
+            for name in FILE_PARAMS
+            if isinstance(params.get(name), str) and os.path.isabs(params[name])
+        }
+        return json.dumps({"op": op, "params": params, "files": files}, sort_keys=True, default=str)
+
+    def _single_flight(self, key: str, compute: Any) -> Any:
+        """Returns the cached response for `key`, or computes it once for all concurrent callers."""
+        with self._lock:
+            if key in self._responses:
+                self._responses.move_to_end(key)
+                self.hits += 1
+                return self._responses[key]
+            future = self._inflight.get(key)
+            leader = future is None
+            if future is None:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self.hits += 1
+            return future.result()
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            with self._lock:
+                self.misses += 1
+                self._responses[key] = result
+                while len(self._responses) > self.max_responses:
+                    self._responses.popitem(last=False)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    def _stats(self, csv_path: str) -> list[dict[str, Any]]:
+        params = {"csv_path": csv_path}
+        return self._single_flight(self._key("stats", params), lambda: self._compute("stats", params))
+
+    def _compute(self, op: str, params: dict[str, Any]) -> Any:
+        from dartfx.qsv import utils
+
+        csv_path = params.get("csv_path")
+        if op == "stats":
+            if not csv_path:
+                raise ValueError("The stats operation needs a csv_path.")
+            return utils._run_stats(csv_path)
+        # Share the parsed stats between toddic and tosql requests for the same file
+        if csv_path and params.get("stats_data") is None:
+            try:
+                params = {**params, "stats_data": self._stats(csv_path)}
+            except Exception:
+                if op == "toddic":
+                    raise
+                # generate_sql works without stats
+        if op == "toddic":
+            return utils.generate_ddi_codebook(**params)
+        return utils.generate_sql(**params)
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Handle one decoded request and return the response object."""
+        try:
+            op = request.get("op")
+            params = request.get("params") or {}
+            if op not in OPERATION_PARAMS:
+                raise ValueError(f"Unknown operation {op!r}, expected one of {sorted(OPERATION_PARAMS)}.")
+            unknown = set(params) - OPERATION_PARAMS[op]
+            if unknown:
+                raise ValueError(f"Unknown parameters for {op}: {sorted(unknown)}.")
+            # The data parameters may also hold JSON content, so only existing relative paths are rejected
+            for name in FILE_PARAMS:
+                value = params.get(name)
+                if (
+                    isinstance(value, str)
+                    and not os.path.isabs(value)
+                    and (name == "csv_path" or os.path.exists(value))
+                ):
+                    raise ValueError(f"{name} must be an absolute path.")
+            if op == "ping":
+                result: Any = {"pid": os.getpid(), "hits": self.hits, "misses": self.misses}
+            elif op == "metrics":
+                from dartfx.qsv.metrics import get_metrics_registry
+
+                registry = get_metrics_registry()
+                result = registry.to_dict() if registry is not None else {}
+            elif op == "shutdown":
+                threading.Thread(target=self.shutdown, daemon=True).start()
+                result = None
+            else:
+                result = self._single_flight(self._key(op, params), lambda: self._compute(op, params))
+            return {"ok": True, "result": result}
+        except Exception as e:
+            return {"ok": False, "error": str(e), "type": type(e).__name__}
+
+    # --- Socket server ---
+
+    def serve_forever(self) -> None:
+        """Listen on the socket until `shutdown()` is called (or a client sends the shutdown operation)."""
+        server = self
+
+        class _Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                line = self.rfile.readline()
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {"ok": False, "error": f"Invalid request: {e}", "type": "ValueError"}
+                else:
+                    response = server.handle(request)
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+
+        # A socket left behind by a server that died is replaced, a live one is not
+        if os.path.exists(self.socket_path):
+            if ProfileClient(self.socket_path, timeout=1.0).is_available():
+                raise RuntimeError(f"A server is already listening on {self.socket_path}.")
+            os.remove(self.socket_path)
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, _Handler)
+        self._server.daemon_threads = True
+        try:
+            os.chmod(self.socket_path, 0o600)
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self.socket_path)
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+
+
+class ProfileClient:
+    """
+    Thin client of a `ProfileServer`.
+
+    Example:
+        >>> client = ProfileClient()
+        >>> xml = client.request("toddic", csv_path="/data/survey.csv", version="2.5")
+    """
+
+    def __init__(self, socket_path: str | os.PathLike[str] | None = None, timeout: float | None = None):
+        self.socket_path = os.fspath(socket_path) if socket_path is not None else default_socket_path()
+        self.timeout = timeout
+
+    def request(self, op: str, **params: Any) -> Any:
+        """Send one request and return its result. Raises `ServerError` if the server reports an error."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            sock.sendall(json.dumps({"op": op, "params": params}).encode("utf-8") + b"\n")
+            sock.shutdown(socket.SHUT_WR)
+            chunks = []
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+        if not chunks:
+            raise ServerError("The server closed the connection without answering.")
+        response = json.loads(b"".join(chunks))
+        if not response.get("ok"):
+            raise ServerError(response.get("error", "Unknown error"), response.get("type"))
+        return response.get("result")
+
+    def is_available(self) -> bool:
+        """True if a server answers on the socket."""
+        try:
+            self.request("ping")
+        except (OSError, ValueError, ServerError):
+            return False
+        return True
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import IO, Any
+
+from pydantic import BaseModel
+
+from dartfx.qsv.cmd import DEFAULT_CHUNK_SIZE, QSVCommand, _decode_text
+from dartfx.qsv.index import CsvIndex, IndexManager
+from dartfx.qsv.runtime import available_cpus
+
+# Commands that transform each row independently of the others, so that running them over
+# consecutive row ranges and concatenating the outputs gives the same result as one run
+SHARDABLE_COMMANDS = frozenset({"apply", "datefmt", "replace", "search", "searchset", "select"})
+
+# Options whose output depends on row numbers or on the whole file
+UNSHARDABLE_PARAMS = frozenset({"count", "flag", "json", "quick", "unmatched_output"})
+
+# Below this many data rows per shard, splitting is not worth the extra processes
+DEFAULT_MIN_SHARD_ROWS = 10_000
+
+
+class Shard(BaseModel):
+    """A range of data rows of a CSV file, and the bytes holding them."""
+
+    index: int
+    start_row: int
+    end_row: int
+    start_byte: int
+    end_byte: int
+
+    @property
+    def rows(self) -> int:
+        return self.end_row - self.start_row
+
+
+def _skip_first_record(f: IO[bytes]) -> None:
+    """Moves past the first CSV record of `f` (line breaks inside quotes are skipped)."""
+    quotes = 0
+    while line := f.readline():
+        quotes += line.count(b'"')
+        if quotes % 2 == 0:
+            return
+
+
+def _read_range(path: str, start: int, end: int, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+class ShardedExecutor:
+    """
+    Runs a row-wise qsv command over one large CSV file in parallel.
+
+    The file's qsv index (`<path>.idx`, built if missing or stale) gives the byte offset of
+    every row, so the rows are split into `shards` contiguous ranges without scanning the
+    file. Each range is fed, after the header record, to its own qsv process whose output is
+    spooled to a temporary file, and the outputs are concatenated in row order with the output
+    header kept only once. Memory use therefore does not grow with the size of the output.
+
+    Only commands in `SHARDABLE_COMMANDS` are accepted, without the options that number rows
+    or summarise the whole file (`UNSHARDABLE_PARAMS`). Commands whose output depends on other
+    rows, such as `pseudo` (consecutive ids per distinct value) or `tojsonl` (types inferred
+    over the whole file), cannot be sharded.
+
+    Example:
+        >>> ShardedExecutor(Search("^FR", select="country")).run("big.csv", sink="france.csv")
+    """
+
+    def __init__(
+        self,
+        command: QSVCommand,
+        shards: int | None = None,
+        min_shard_rows: int = DEFAULT_MIN_SHARD_ROWS,
+        index_manager: IndexManager | None = None,
+    ):
+        """
+        Args:
+            command: The row-wise command to run.
+            shards: Number of row ranges run in parallel. Defaults to `available_cpus()`.
+            min_shard_rows: Fewer shards are used when they would hold fewer rows than this.
+            index_manager: Used to build the index when missing. Defaults to one without a size threshold.
+        """
+        if command.command not in SHARDABLE_COMMANDS:
+            raise ValueError(f"qsv {command.command} cannot be sharded, expected one of {sorted(SHARDABLE_COMMANDS)}.")
+        options = sorted(key for key, value in command.params.items() if key in UNSHARDABLE_PARAMS and value)
+        if options:
+            raise ValueError(f"qsv {command.command} cannot be sharded with the {options} options.")
+        if shards is not None and shards < 1:
+            raise ValueError("shards must be a positive integer.")
+        self.command = command
+        self.shards = shards
+        self.min_shard_rows = max(1, min_shard_rows)
+        self.index_manager = index_manager or IndexManager(min_size=0)
+
+    @property
+    def has_headers(self) -> bool:
+        return not self.command.params.get("no_headers")
+
+    def plan(self, path: str | os.PathLike[str]) -> list[Shard]:
+        """Index the file if needed and split its rows into shards."""
+        path = os.fspath(path)
+        decision = self.index_manager.ensure(path)
+        if decision.action in ("failed", "skipped"):
+            raise RuntimeError(f"Cannot index {path}: {decision.reason}")
+        with CsvIndex(path, has_headers=self.has_headers) as index:
+            rows = index.row_count
+            shards = min(self.shards or available_cpus(), max(1, rows // self.min_shard_rows))
+            bounds = [rows * i // shards for i in range(shards + 1)]
+            ranges = [index.byte_range(bounds[i], bounds[i + 1] - bounds[i]) for i in range(shards)]
+        return [
+            Shard(index=i, start_row=bounds[i], end_row=bounds[i + 1], start_byte=start, end_byte=end)
+            for i, (start, end) in enumerate(ranges)
+        ]
+
+    def _run_shard(self, path: str, shard: Shard, header: bytes) -> IO[bytes]:
+        """Run the command over one shard and return its output, spooled to a temporary file."""
+
+        def chunks() -> Iterator[bytes]:
+            if header:
+                yield header
+            yield from _read_range(path, shard.start_byte, shard.end_byte)
+
+        spool = tempfile.TemporaryFile()
+        try:
+            self.command.run(sink=spool, stdin=chunks())
+            spool.seek(0)
+            if self.has_headers and shard.index > 0:
+                # Keep the output header of the first shard only
+                _skip_first_record(spool)
+        except BaseException:
+            spool.close()
+            raise
+        return spool
+
+    def stream(self, path: str | os.PathLike[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """Run every shard in parallel and yield their outputs in row order, `chunk_size` bytes at a time."""
+        path = os.fspath(path)
+        shards = self.plan(path)
+        header = b""
+        if self.has_headers and shards:
+            with open(path, "rb") as f:
+                header = f.read(shards[0].start_byte)
+        executor = ThreadPoolExecutor(max_workers=len(shards), thread_name_prefix="qsv-shard")
+        futures: list[Future[IO[bytes]]] = []
+        try:
+            futures = [executor.submit(self._run_shard, path, s, header) for s in shards]
+            for future in futures:
+                with future.result() as spool:
+                    while chunk := spool.read(chunk_size):
+                        yield chunk
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Spools of the shards not consumed (early close or a failed shard)
+            for future in futures:
+                if future.done() and not future.cancelled() and future.exception() is None:
+                    future.result().close()
+
+    def run(self, path: str | os.PathLike[str], sink: Any = None) -> Any:
+        """
+        Run the command over the whole file.
+
+        Args:
+            path: The CSV file.
+            sink: None to return the decoded text, `bytes` for the raw output, a path to write
+                the output to that file (the path is returned), or a binary file object.
+        """
+        if sink is None or sink is bytes:
+            data = b"".join(self.stream(path))
+            return data if sink is bytes else _decode_text(data)
+        if isinstance(sink, (str, os.PathLike)):
+            with open(sink, "wb") as f:
+                self._write(path, f)
+            return os.fspath(sink)
+        self._write(path, sink)
+        return None
+
+    def _write(self, path: str | os.PathLike[str], f: IO[bytes]) -> None:
+        for output in self.stream(path):
+            f.write(output)
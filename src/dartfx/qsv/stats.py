@@ -0,0 +1,356 @@
+from __future__ import annotations
+
+import math
+from collections.abc import Iterable
+from typing import Any
+
+from dartfx.qsv.model import QsvStatsDataModel
+
+NUMERIC_TYPES = frozenset({"Integer", "Float"})
+
+# Statistics that cannot be derived exactly from per-partition summaries. They are left
+# empty in merged results, except `cardinality` (required by the model), which is set to
+# the largest partition cardinality: a lower bound of the true value.
+NON_MERGEABLE_FIELDS = frozenset(
+    {
+        "sort_order",
+        "sortiness",
+        "mad",
+        "lower_outer_fence",
+        "lower_inner_fence",
+        "q1",
+        "q2_median",
+        "q3",
+        "iqr",
+        "upper_inner_fence",
+        "upper_outer_fence",
+        "skewness",
+        "cardinality",
+        "uniqueness_ratio",
+        "mode",
+        "mode_count",
+        "mode_occurrences",
+        "antimode",
+        "antimode_count",
+        "antimode_occurrences",
+        "percentiles",
+    }
+)
+
+
+def to_stats_model(row: QsvStatsDataModel | dict[str, Any]) -> QsvStatsDataModel:
+    """Build a `QsvStatsDataModel` from a parsed qsv stats row, where missing values are empty strings."""
+    if isinstance(row, QsvStatsDataModel):
+        return row
+    return QsvStatsDataModel(**{key: value for key, value in row.items() if value not in ("", None)})
+
+
+def _merge_types(a: str, b: str) -> str:
+    if a == b or b == "NULL":
+        return a
+    if a == "NULL":
+        return b
+    if {a, b} == NUMERIC_TYPES:
+        return "Float"
+    return "String"
+
+
+def _float(value: str | None) -> float | None:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _Moments:
+    """Count, mean and sum of squared deviations of a sample, merged with Chan et al.'s parallel update."""
+
+    def __init__(self, n: int = 0, mean: float = 0.0, m2: float = 0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    @classmethod
+    def from_variance(cls, n: int, mean: float | None, variance: float | None) -> _Moments | None:
+        if n == 0:
+            return cls()
+        if mean is None or variance is None:
+            return None
+        return cls(n, mean, variance * n)  # qsv reports the population variance
+
+    def merge(self, other: _Moments) -> _Moments:
+        n = self.n + other.n
+        if n == 0:
+            return _Moments()
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.n / n
+        m2 = self.m2 + other.m2 + delta * delta * self.n * other.n / n
+        return _Moments(n, mean, m2)
+
+    @property
+    def variance(self) -> float | None:
+        return self.m2 / self.n if self.n else None
+
+
+class _FieldAccumulator:
+    """Mergeable state of the statistics of one column."""
+
+    def __init__(self, stats: QsvStatsDataModel, rows: int):
+        self.field = stats.field
+        self.type = stats.type
+        self.rows = rows
+        self.nullcount = stats.nullcount
+        self.cardinality = stats.cardinality
+        self.is_ascii = stats.is_ascii
+        self.sum = stats.sum
+        self.min = stats.min
+        self.max = stats.max
+        self.n_negative = stats.n_negative
+        self.n_zero = stats.n_zero
+        self.n_positive = stats.n_positive
+        self.max_precision = stats.max_precision
+        self.min_length = stats.min_length
+        self.max_length = stats.max_length
+        self.sum_length = stats.sum_length
+        self.cv_scale = self._cv_scale(stats.cv, stats.stddev, stats.mean)
+        self.cv_length_scale = self._cv_scale(stats.cv_length, stats.stddev_length, stats.avg_length)
+
+        # Numeric moments are over the non-null values
+        n_values = rows - stats.nullcount
+        if None not in (stats.n_negative, stats.n_zero, stats.n_positive):
+            n_values = (stats.n_negative or 0) + (stats.n_zero or 0) + (stats.n_positive or 0)
+        if stats.type == "NULL":
+            # An entirely empty column contributes no values
+            n_values = 0
+            self.sum = 0.0
+            self.n_negative = self.n_zero = self.n_positive = 0
+            self.moments: _Moments | None = _Moments()
+        elif stats.type in NUMERIC_TYPES:
+            self.moments = _Moments.from_variance(n_values, stats.mean, stats.variance)
+        else:
+            self.moments = None
+        self.log_sum = (
+            n_values * math.log(stats.geometric_mean)
+            if stats.geometric_mean is not None and stats.geometric_mean > 0
+            else None
+        )
+        self.reciprocal_sum = (
+            n_values / stats.harmonic_mean if stats.harmonic_mean is not None and stats.harmonic_mean != 0 else None
+        )
+        if n_values == 0:
+            self.log_sum = self.reciprocal_sum = 0.0
+        # Lengths are averaged over every row
+        self.length_moments = _Moments.from_variance(rows, stats.avg_length, stats.variance_length)
+
+    @staticmethod
+    def _cv_scale(cv: float | None, stddev: float | None, mean: float | None) -> float | None:
+        """qsv reports the coefficient of variation as a percentage; recover the factor from its own output."""
+        if cv is None or not stddev or not mean:
+            return None
+        return round(cv / (stddev / mean), 6)
+
+    def _extreme(self, a: str | None, b: str | None, pick: Any) -> str | None:
+        if a is None or b is None:
+            return a if b is None else b
+        if self.type in NUMERIC_TYPES:
+            fa, fb = _float(a), _float(b)
+            if fa is not None and fb is not None:
+                return a if pick(fa, fb) == fa else b
+        return pick(a, b)
+
+    def merge(self, other: _FieldAccumulator) -> None:
+        self.type = _merge_types(self.type, other.type)
+        self.rows += other.rows
+        self.nullcount += other.nullcount
+        self.cardinality = max(self.cardinality, other.cardinality)
+        self.is_ascii = None if None in (self.is_ascii, other.is_ascii) else bool(self.is_ascii and other.is_ascii)
+        self.sum = None if None in (self.sum, other.sum) else (self.sum or 0) + (other.sum or 0)
+        self.min = self._extreme(self.min, other.min, min)
+        self.max = self._extreme(self.max, other.max, max)
+        for name in ("n_negative", "n_zero", "n_positive", "sum_length"):
+            a, b = getattr(self, name), getattr(other, name)
+            setattr(self, name, None if None in (a, b) else a + b)
+        for name, pick in (("max_precision", max), ("min_length", min), ("max_length", max)):
+            a, b = getattr(self, name), getattr(other, name)
+            setattr(self, name, a if b is None else b if a is None else pick(a, b))
+        self.cv_scale = self.cv_scale or other.cv_scale
+        self.cv_length_scale = self.cv_length_scale or other.cv_length_scale
+        self.moments = (
+            self.moments.merge(other.moments)
+            if self.type in (*NUMERIC_TYPES, "NULL") and self.moments is not None and other.moments is not None
+            else None
+        )
+        self.log_sum = None if None in (self.log_sum, other.log_sum) else (self.log_sum or 0) + (other.log_sum or 0)
+        self.reciprocal_sum = (
+            None
+            if None in (self.reciprocal_sum, other.reciprocal_sum)
+            else (self.reciprocal_sum or 0) + (other.reciprocal_sum or 0)
+        )
+        self.length_moments = (
+            self.length_moments.merge(other.length_moments)
+            if self.length_moments is not None and other.length_moments is not None
+            else None
+        )
+
+    def to_model(self) -> QsvStatsDataModel:
+        values: dict[str, Any] = {
+            "field": self.field,
+            "type": self.type,
+            "is_ascii": self.is_ascii,
+            "min": self.min,
+            "max": self.max,
+            "min_length": self.min_length,
+            "max_length": self.max_length,
+            "sum_length": self.sum_length,
+            "nullcount": self.nullcount,
+            "cardinality": self.cardinality,
+            "sparsity": self.nullcount / self.rows if self.rows else None,
+            "max_precision": self.max_precision,
+        }
+        if self.length_moments is not None and self.length_moments.n:
+            variance = self.length_moments.variance or 0.0
+            values.update(
+                avg_length=self.length_moments.mean,
+                variance_length=variance,
+                stddev_length=math.sqrt(variance),
+            )
+            if self.cv_length_scale and self.length_moments.mean:
+                values["cv_length"] = math.sqrt(variance) / self.length_moments.mean * self.cv_length_scale
+        if self.type in NUMERIC_TYPES:
+            values.update(sum=self.sum, n_negative=self.n_negative, n_zero=self.n_zero, n_positive=self.n_positive)
+            low, high = _float(self.min), _float(self.max)
+            if low is not None and high is not None:
+                values["range"] = high - low
+            moments = self.moments
+            if moments is not None and moments.n:
+                variance = moments.variance or 0.0
+                stddev = math.sqrt(variance)
+                values.update(mean=moments.mean, variance=variance, stddev=stddev, sem=stddev / math.sqrt(moments.n))
+                if self.cv_scale and moments.mean:
+                    values["cv"] = stddev / moments.mean * self.cv_scale
+                if self.log_sum is not None:
+                    values["geometric_mean"] = math.exp(self.log_sum / moments.n)
+                if self.reciprocal_sum:
+                    values["harmonic_mean"] = moments.n / self.reciprocal_sum
+        return QsvStatsDataModel(**values)
+
+
+class StatsAccumulator:
+    """
+    Combines the `qsv stats` outputs of several partitions of a dataset (files or chunks
+    with the same columns) into the statistics of their union, without re-reading the data.
+
+    Counts, sums, min/max, lengths, `n_negative`/`n_zero`/`n_positive`, the mean and the
+    variance (merged with the parallel form of Welford's algorithm), and the geometric and
+    harmonic means are exact. Order statistics, modes and the like (`NON_MERGEABLE_FIELDS`)
+    cannot be merged: they are left empty, and `cardinality` is a lower bound. The fields
+    that are not exact are listed in `inexact_fields` (nothing, until a second partition is added).
+
+    The number of rows of each partition is needed; when not given, it is inferred from
+    the `n_negative`/`n_zero`/`n_positive` counts of a numeric column (see `infer_rows`).
+    Pass `rows` for partitions without numeric columns.
+
+    Example:
+        >>> acc = StatsAccumulator()
+        >>> for partition in monthly_files:
+        ...     acc.add(utils._load_stats_data(Stats().run(partition)))
+        >>> merged = acc.result()
+    """
+
+    def __init__(self):
+        self.fields: dict[str, _FieldAccumulator] = {}
+        self.rows = 0
+        self.partitions = 0
+        self._single: list[QsvStatsDataModel] = []
+
+    @staticmethod
+    def infer_rows(stats: list[QsvStatsDataModel]) -> int | None:
+        """
+        Infer the number of rows a partition's stats cover, or None if they do not tell.
+
+        The exact counts of a numeric column (`n_negative + n_zero + n_positive + nullcount`)
+        are used first. qsv rounds `sparsity` to 4 decimals, so `nullcount / sparsity` is only
+        used as a last resort, when the rounded sparsities of the columns leave a single
+        possible row count.
+        """
+        for field in stats:
+            if None not in (field.n_negative, field.n_zero, field.n_positive):
+                return (field.n_negative or 0) + (field.n_zero or 0) + (field.n_positive or 0) + field.nullcount
+        if stats and all(field.type == "NULL" for field in stats):
+            return stats[0].nullcount
+        low, high = 1, math.inf
+        for field in stats:
+            if field.sparsity and field.nullcount:
+                # Row counts n for which round(nullcount / n, 4) == sparsity
+                low = max(low, math.ceil(field.nullcount / (field.sparsity + 0.00005)))
+                if field.sparsity > 0.00005:
+                    high = min(high, math.floor(field.nullcount / (field.sparsity - 0.00005)))
+        if low == high:
+            return low
+        return None
+
+    def add(self, stats: Iterable[QsvStatsDataModel | dict[str, Any]], rows: int | None = None) -> None:
+        """Add the stats of one partition (as parsed qsv stats rows or models)."""
+        models = [to_stats_model(row) for row in stats]
+        if rows is None:
+            rows = self.infer_rows(models)
+            if rows is None:
+                raise ValueError("The number of rows of the partition cannot be inferred from its stats, pass rows.")
+        names = [model.field for model in models]
+        if self.partitions and names != list(self.fields):
+            raise ValueError(f"The partition's columns {names} differ from {list(self.fields)}.")
+        for model in models:
+            accumulator = _FieldAccumulator(model, rows)
+            if model.field in self.fields:
+                self.fields[model.field].merge(accumulator)
+            else:
+                self.fields[model.field] = accumulator
+        self._single = models if not self.partitions else []
+        self.rows += rows
+        self.partitions += 1
+
+    def merge(self, other: StatsAccumulator) -> StatsAccumulator:
+        """Merge the partitions of another accumulator into this one (e.g. built by another worker)."""
+        if not other.partitions:
+            return self
+        if not self.partitions:
+            self.fields, self.rows, self.partitions, self._single = (
+                other.fields,
+                other.rows,
+                other.partitions,
+                other._single,
+            )
+            return self
+        if list(other.fields) != list(self.fields):
+            raise ValueError(f"The columns {list(other.fields)} differ from {list(self.fields)}.")
+        for name, accumulator in other.fields.items():
+            self.fields[name].merge(accumulator)
+        self.rows += other.rows
+        self.partitions += other.partitions
+        self._single = []
+        return self
+
+    @property
+    def inexact_fields(self) -> frozenset[str]:
+        """The statistics of `result()` that are missing or approximate."""
+        return NON_MERGEABLE_FIELDS if self.partitions > 1 else frozenset()
+
+    def result(self) -> list[QsvStatsDataModel]:
+        """The merged statistics, one model per column. With a single partition, its stats are returned as is."""
+        if self.partitions == 1:
+            return list(self._single)
+        return [accumulator.to_model() for accumulator in self.fields.values()]
+
+
+def merge_stats(
+    partitions: Iterable[Iterable[QsvStatsDataModel | dict[str, Any]]], rows: Iterable[int | None] | None = None
+) -> list[QsvStatsDataModel]:
+    """Merge the qsv stats of several partitions. See `StatsAccumulator`."""
+    accumulator = StatsAccumulator()
+    partitions = list(partitions)
+    row_counts = list(rows) if rows is not None else [None] * len(partitions)
+    if len(row_counts) != len(partitions):
+        raise ValueError("rows must have one entry per partition.")
+    for stats, count in zip(partitions, row_counts, strict=True):
+        accumulator.add(stats, count)
+    return accumulator.result()
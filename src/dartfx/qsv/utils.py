@@ -4,12 +4,15 @@ import csv
 import io
 import json
 import os
+import re
 import uuid
 import xml.etree.ElementTree as ET
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Any
+from typing import IO, Any
 
-from dartfx.qsv.model import QsvStatsDataModel
+from dartfx.qsv.model import QsvProfile, QsvStatsDataModel
 
 
 def _load_json_data(data: Any) -> Any:
@@ -73,57 +76,199 @@ def _load_stats_data(data: Any) -> list[dict[str, Any]]:
     raise ValueError("Invalid stats data source.")
 
 
-def generate_ddi_codebook(
+def _qsv_version() -> str:
+    try:
+        from dartfx.qsv.cmd import QSV
+
+        return QSV.version_number()
+    except Exception:
+        return "unknown"
+
+
+def _count_rows(csv_path: str | os.PathLike[str]) -> int | None:
+    """Returns the number of rows of a CSV file, or None if it cannot be counted."""
+    try:
+        from dartfx.qsv.index import CsvIndex, is_index_fresh
+
+        # A fresh index holds the row count, no need to run qsv
+        if is_index_fresh(str(csv_path)):
+            with CsvIndex(csv_path) as index:
+                return index.row_count
+        from dartfx.qsv.cmd import Count
+
+        return int(Count().run(str(csv_path)).strip())
+    except Exception:
+        return None
+
+
+def _stats_cache_is_fresh(csv_path: str | os.PathLike[str]) -> bool:
+    """True if qsv's stats cache of `csv_path` can be reused for the generators' stats options."""
+    from dartfx.qsv.model import QsvStatsFile
+
+    return QsvStatsFile.from_path(csv_path).is_fresh()
+
+
+def _run_stats(csv_path: str | os.PathLike[str]) -> list[dict[str, Any]]:
+    """
+    The stats of `csv_path`, read from qsv's stats cache when it is fresh. Otherwise stats are
+    computed, and qsv is asked to write the cache so that schema (which reuses it) and the next
+    runs do not scan the file again.
+    """
+    from dartfx.qsv.cmd import Stats
+    from dartfx.qsv.model import QsvStatsFile
+
+    stats_file = QsvStatsFile.from_path(csv_path)
+    if stats_file.is_fresh():
+        try:
+            return _load_stats_data(stats_file.jsonl_filepath)
+        except (OSError, ValueError):
+            pass
+    stats_csv = Stats(infer_dates=True, infer_boolean=True, stats_jsonl=True, cache_threshold=1).run(str(csv_path))
+    return _load_stats_data(stats_csv)
+
+
+def _run_frequency(csv_path: str | os.PathLike[str], columns: tuple[str, ...]) -> Any:
+    from dartfx.qsv.cmd import Frequency
+
+    freq_json = Frequency(select=",".join(columns), limit=0, unq_limit=1, json=True).run(str(csv_path))
+    return _load_json_data(freq_json)
+
+
+def _combine_frequency(parts: list[Any], columns: list[str]) -> Any:
+    """Merge the outputs of several frequency runs, keeping the given columns in their order."""
+    if len(parts) == 1 and [f.get("field") for f in parts[0].get("fields", [])] == columns:
+        return parts[0]
+    fields = {f.get("field"): f for part in parts for f in part.get("fields", [])}
+    combined = {key: value for key, value in parts[0].items() if key != "fields"}
+    combined["fields"] = [fields[col] for col in columns if col in fields]
+    if "fieldcount" in combined:
+        combined["fieldcount"] = len(combined["fields"])
+    return combined
+
+
+def _low_cardinality_candidates(
+    csv_path: str | os.PathLike[str], threshold: int, sample_rows: int = 10_000
+) -> list[str]:
+    """
+    Guess the categorical columns of a CSV file from its first rows: columns with more than
+    `threshold` distinct values there cannot be categorical, the others probably are.
+    """
+    try:
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            header = next(reader, [])
+            distinct: list[set[str]] = [set() for _ in header]
+            for i, row in enumerate(reader):
+                if i >= sample_rows:
+                    break
+                for values, value in zip(distinct, row, strict=False):
+                    if len(values) <= threshold:
+                        values.add(value)
+    except (OSError, UnicodeDecodeError, csv.Error):
+        return []
+    return [name for name, values in zip(header, distinct, strict=True) if len(values) <= threshold]
+
+
+def profile_once(
     csv_path: str | os.PathLike[str] | None = None,
     stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None = None,
     schema_data: dict[str, Any] | str | os.PathLike[str] | None = None,
     frequency_data: dict[str, Any] | str | os.PathLike[str] | None = None,
-    version: str = "2.6",
-    output_xml_path: str | os.PathLike[str] | None = None,
     categorical_threshold: int = 20,
     categorical_columns: list[str] | None = None,
-) -> str:
+    speculative_frequency: bool = False,
+) -> QsvProfile:
     """
-    Aggregates the outputs of QSV stats, frequency, and schema, and creates a
-    DDI-Codebook 2.5 or 2.6 XML document. Frequencies are optional.
+    Runs the QSV commands needed to document a CSV file once, and returns their parsed outputs.
 
-    Args:
-        csv_path: Optional path to the source CSV file. If provided and other data is missing,
-            the corresponding QSV commands are run automatically.
-        stats_data: Pre-computed stats data (Pydantic models list, dict list, file path, or string).
-        schema_data: Pre-computed schema data (dict, file path, or string).
-        frequency_data: Pre-computed frequency data (dict, file path, or string).
-        version: DDI-Codebook version ("2.5" or "2.6"). Default is "2.6".
+    The result can be passed as `profile` to `generate_ddi_codebook`, `write_ddi_codebook` and
+    `generate_sql`, so that any number of DDI versions and SQL flavors are generated from a
+    single profiling pass. The commands run concurrently as described in `generate_ddi_codebook`.
 
-        output_xml_path: Optional file path to write the generated XML.
-        categorical_threshold: Threshold cardinality below which numeric/string columns
-            without explicit schema enums are considered categorical (default 20).
-        categorical_columns: Explicit list of categorical column names. If provided, overrides auto-detection.
+    Args:
+        csv_path, stats_data, schema_data, frequency_data, categorical_threshold,
+            categorical_columns, speculative_frequency: See `generate_ddi_codebook`.
 
     Returns:
-        str: Pretty-printed XML string conforming to the DDI-Codebook schema.
+        QsvProfile: The stats, schema, frequency, categorical columns, row count and QSV version.
     """
-    if version not in ("2.5", "2.6"):
-        raise ValueError("Only DDI-Codebook versions '2.5' and '2.6' are supported.")
+    with ThreadPoolExecutor(max_workers=5, thread_name_prefix="qsv-profile") as executor:
+        return _profile(
+            executor,
+            csv_path,
+            stats_data,
+            schema_data,
+            frequency_data,
+            categorical_threshold,
+            categorical_columns,
+            speculative_frequency,
+        )
 
-    # 1. Gather stats and schema (either pre-supplied or executed dynamically)
-    if stats_data is None:
-        if not csv_path:
-            raise ValueError("Must provide either stats_data or csv_path to run QSV stats.")
-        from dartfx.qsv.cmd import Stats
 
-        stats_csv = Stats(infer_dates=True, infer_boolean=True).run(str(csv_path))
-        parsed_stats = _load_stats_data(stats_csv)
+def _sql_profile(
+    csv_path: str | os.PathLike[str],
+    stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None = None,
+    schema_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+) -> QsvProfile:
+    """A profile with only what `generate_sql` uses (stats and schema): no frequency or row count is run."""
+    return profile_once(csv_path, stats_data, schema_data, {"fields": [], "rowcount": None}, categorical_columns=[])
+
+
+def _profile(
+    executor: ThreadPoolExecutor,
+    csv_path: str | os.PathLike[str] | None,
+    stats_data: Any,
+    schema_data: Any,
+    frequency_data: Any,
+    categorical_threshold: int,
+    categorical_columns: list[str] | None,
+    speculative_frequency: bool,
+) -> QsvProfile:
+    # 1. Gather stats and schema (either pre-supplied or executed dynamically), and start the
+    # independent commands right away
+    if stats_data is None and not csv_path:
+        raise ValueError("Must provide either stats_data or csv_path to run QSV stats.")
+    if schema_data is None and not csv_path:
+        raise ValueError("Must provide either schema_data or csv_path to run QSV schema.")
+    version_future = executor.submit(_qsv_version)
+    if frequency_data is not None:
+        parsed_frequency = _load_json_data(frequency_data)
+    count_future = None
+    if csv_path and not (
+        frequency_data is not None and isinstance(parsed_frequency, dict) and "rowcount" in parsed_frequency
+    ):
+        count_future = executor.submit(_count_rows, csv_path)
+    frequency_futures: dict[tuple[str, ...], Future[Any]] = {}
+    if csv_path and frequency_data is None:
+        if categorical_columns is not None:
+            # Explicit columns: nothing to wait for
+            explicit = tuple(dict.fromkeys(categorical_columns))
+            if explicit:
+                frequency_futures[explicit] = executor.submit(_run_frequency, csv_path, explicit)
+        elif speculative_frequency:
+            candidates = tuple(_low_cardinality_candidates(csv_path, categorical_threshold))
+            if candidates:
+                frequency_futures[candidates] = executor.submit(_run_frequency, csv_path, candidates)
+
+    # Schema is computed from stats, so it only runs alongside them when the stats cache it
+    # reuses is already there. Otherwise it waits for the stats run that writes the cache
+    schema_future = None
+    stats_cached = stats_data is None and _stats_cache_is_fresh(str(csv_path))
+    if schema_data is None and (stats_data is not None or stats_cached):
+        from dartfx.qsv.cmd import Schema
+
+        schema_future = executor.submit(Schema(stdout=True).run, str(csv_path))
+    if stats_data is None:
+        parsed_stats = _run_stats(str(csv_path))
     else:
         parsed_stats = _load_stats_data(stats_data)
-
-    if schema_data is None:
-        if not csv_path:
-            raise ValueError("Must provide either schema_data or csv_path to run QSV schema.")
+    if schema_data is None and schema_future is None:
         from dartfx.qsv.cmd import Schema
 
-        schema_json = Schema(stdout=True).run(str(csv_path))
-        parsed_schema = _load_json_data(schema_json)
+        schema_future = executor.submit(Schema(stdout=True).run, str(csv_path))
+
+    if schema_future is not None:
+        parsed_schema = _load_json_data(schema_future.result())
     else:
         parsed_schema = _load_json_data(schema_data)
 
@@ -174,18 +319,180 @@ def generate_ddi_codebook(
     # 3. Gather frequency (either pre-supplied, executed dynamically, or fallback to empty)
     if frequency_data is None:
         if csv_path and detected_categorical:
-            from dartfx.qsv.cmd import Frequency
-
-            freq_json = Frequency(select=",".join(detected_categorical), limit=0, unq_limit=1, json=True).run(
-                str(csv_path)
+            started = {column for columns in frequency_futures for column in columns}
+            missing = tuple(col for col in detected_categorical if col not in started)
+            if missing:
+                frequency_futures[missing] = executor.submit(_run_frequency, csv_path, missing)
+            parsed_frequency = _combine_frequency(
+                [future.result() for future in frequency_futures.values()], detected_categorical
             )
-            parsed_frequency = _load_json_data(freq_json)
         else:
             parsed_frequency = {"fields": []}
-    else:
-        parsed_frequency = _load_json_data(frequency_data)
 
-    # 4. XML construction
+    rowcount = None
+    if isinstance(parsed_frequency, dict) and "rowcount" in parsed_frequency:
+        rowcount = parsed_frequency["rowcount"]
+    elif count_future is not None:
+        rowcount = count_future.result()
+
+    return QsvProfile(
+        csv_path=os.fspath(csv_path) if csv_path else None,
+        stats_data=parsed_stats,
+        schema_data=parsed_schema,
+        frequency_data=parsed_frequency if isinstance(parsed_frequency, dict) else {"fields": []},
+        categorical_columns=detected_categorical,
+        rowcount=rowcount,
+        qsv_version=version_future.result(),
+    )
+
+
+def _check_ddi_version(version: str) -> None:
+    if version not in ("2.5", "2.6"):
+        raise ValueError("Only DDI-Codebook versions '2.5' and '2.6' are supported.")
+
+
+def generate_ddi_codebook(
+    csv_path: str | os.PathLike[str] | None = None,
+    stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None = None,
+    schema_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+    frequency_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+    version: str = "2.6",
+    output_xml_path: str | os.PathLike[str] | None = None,
+    categorical_threshold: int = 20,
+    categorical_columns: list[str] | None = None,
+    speculative_frequency: bool = False,
+    profile: QsvProfile | None = None,
+) -> str:
+    """
+    Aggregates the outputs of QSV stats, frequency, and schema, and creates a
+    DDI-Codebook 2.5 or 2.6 XML document. Frequencies are optional.
+
+    The QSV commands that are needed run concurrently: the row count and the QSV version
+    alongside stats, and frequency as soon as the categorical columns are known (immediately
+    when they are given explicitly). Stats are read from qsv's stats cache
+    (`<stem>.stats.csv.data.jsonl`) when it is fresh, see `QsvStatsFile.is_fresh`; otherwise
+    they are computed with `--stats-jsonl` so that the cache is written, and schema runs after
+    them to reuse it.
+
+    Args:
+        csv_path: Optional path to the source CSV file. If provided and other data is missing,
+            the corresponding QSV commands are run automatically.
+        stats_data: Pre-computed stats data (Pydantic models list, dict list, file path, or string).
+        schema_data: Pre-computed schema data (dict, file path, or string).
+        frequency_data: Pre-computed frequency data (dict, file path, or string).
+        version: DDI-Codebook version ("2.5" or "2.6"). Default is "2.6".
+
+        output_xml_path: Optional file path to write the generated XML.
+        categorical_threshold: Threshold cardinality below which numeric/string columns
+            without explicit schema enums are considered categorical (default 20).
+        categorical_columns: Explicit list of categorical column names. If provided, overrides auto-detection.
+        speculative_frequency: Start frequency alongside stats on the likely categorical columns
+            (those with few distinct values in the first rows of the file). Columns that turn out
+            to be categorical but were not guessed get a second frequency run; the frequencies of
+            guessed columns that are not categorical are discarded.
+        profile: The result of `profile_once`. When given, no QSV command is run and the data
+            arguments above (from `csv_path` to `speculative_frequency`, except `version` and
+            `output_xml_path`) are ignored.
+
+    Returns:
+        str: Pretty-printed XML string conforming to the DDI-Codebook schema.
+    """
+    _check_ddi_version(version)
+    if profile is None:
+        profile = profile_once(
+            csv_path,
+            stats_data,
+            schema_data,
+            frequency_data,
+            categorical_threshold,
+            categorical_columns,
+            speculative_frequency,
+        )
+    buffer = io.StringIO()
+    _write_ddi_codebook(buffer, [profile], version)
+    xml_str = buffer.getvalue()
+
+    if output_xml_path:
+        with open(output_xml_path, "w", encoding="utf-8") as f:
+            f.write(xml_str)
+
+    return xml_str
+
+
+def write_ddi_codebook(
+    output: str | os.PathLike[str] | IO[str],
+    csv_path: str | os.PathLike[str] | None = None,
+    stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None = None,
+    schema_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+    frequency_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+    version: str = "2.6",
+    categorical_threshold: int = 20,
+    categorical_columns: list[str] | None = None,
+    speculative_frequency: bool = False,
+    profile: QsvProfile | None = None,
+) -> None:
+    """
+    Same as `generate_ddi_codebook`, but writes the XML document incrementally instead of returning it.
+
+    The document header is written first, then each `<var>` element is built, serialized and
+    written in turn, so the memory used for the XML is bounded by one variable rather than the
+    whole codebook. The output is identical to the string returned by `generate_ddi_codebook`.
+
+    Args:
+        output: A file path, or a text file object such as `sys.stdout`. A file left
+            incomplete by an error is removed.
+        csv_path, stats_data, schema_data, frequency_data, version, categorical_threshold,
+            categorical_columns, speculative_frequency, profile: See `generate_ddi_codebook`.
+    """
+    _check_ddi_version(version)
+    if profile is None:
+        profile = profile_once(
+            csv_path,
+            stats_data,
+            schema_data,
+            frequency_data,
+            categorical_threshold,
+            categorical_columns,
+            speculative_frequency,
+        )
+    if not isinstance(output, (str, os.PathLike)):
+        _write_ddi_codebook(output, [profile], version)
+        return
+    try:
+        with open(output, "w", encoding="utf-8") as f:
+            _write_ddi_codebook(f, [profile], version)
+    except BaseException:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+
+
+def _ddi_file_name(profile: QsvProfile) -> str:
+    if profile.csv_path:
+        return os.path.basename(profile.csv_path)
+    if isinstance(profile.frequency_data.get("input"), str):
+        return os.path.basename(profile.frequency_data["input"])
+    return "dataset.csv"
+
+
+def _ddi_columns(profile: QsvProfile) -> list[str]:
+    properties = profile.schema_data.get("properties", {})
+    return list(properties.keys()) if properties else [row["field"] for row in profile.stats_data]
+
+
+def _write_ddi_codebook(
+    out: IO[str],
+    profiles: list[QsvProfile],
+    version: str,
+    title: str | None = None,
+    file_names: list[str] | None = None,
+) -> None:
+    """
+    Writes a codebook describing the profiled files: one `<fileDscr>` per file (IDs F1, F2...)
+    and their variables, numbered across files (V1, V2...) and linked to their file.
+    The file names default to the base names of the profiled files, and the title to the first name.
+    """
+    # XML construction
     version_underscore = "2_5" if version == "2.5" else "2_6"
     ns = f"ddi:codebook:{version_underscore}"
 
@@ -202,28 +509,22 @@ def generate_ddi_codebook(
     }
     root = ET.Element(f"{{{ns}}}codeBook", root_attrs)
 
-    # Extract filename
-    filename = "dataset.csv"
-    if csv_path:
-        filename = os.path.basename(csv_path)
-    elif isinstance(parsed_frequency, dict) and isinstance(parsed_frequency.get("input"), str):
-        filename = os.path.basename(parsed_frequency["input"])
+    # File names and variables of each file
+    files = [(f"F{i}", profile, _ddi_columns(profile)) for i, profile in enumerate(profiles, start=1)]
+    if file_names is None:
+        file_names = [_ddi_file_name(profile) for profile in profiles]
+    if title is None:
+        title = file_names[0] if file_names else "dataset.csv"
 
     # QSV version for metadata
-    qsv_version = "unknown"
-    try:
-        from dartfx.qsv.cmd import QSV
-
-        qsv_version = QSV.version_number()
-    except Exception:
-        pass
+    qsv_version = profiles[0].qsv_version if profiles else "unknown"
 
     # <docDscr>
     docDscr = ET.SubElement(root, f"{{{ns}}}docDscr")
     citation = ET.SubElement(docDscr, f"{{{ns}}}citation")
     titlStmt = ET.SubElement(citation, f"{{{ns}}}titlStmt")
     titl = ET.SubElement(titlStmt, f"{{{ns}}}titl")
-    titl.text = f"{filename}"
+    titl.text = title
     prodStmt = ET.SubElement(citation, f"{{{ns}}}prodStmt")
     current_date = datetime.now().strftime("%Y-%m-%d")
     prodDate = ET.SubElement(prodStmt, f"{{{ns}}}prodDate", {"date": current_date})
@@ -242,190 +543,343 @@ def generate_ddi_codebook(
     citation_stdy = ET.SubElement(stdyDscr, f"{{{ns}}}citation")
     titlStmt_stdy = ET.SubElement(citation_stdy, f"{{{ns}}}titlStmt")
     titl_stdy = ET.SubElement(titlStmt_stdy, f"{{{ns}}}titl")
-    titl_stdy.text = f"{filename}"
-
-    # Row/Var dimensions
-    rowcount = None
-    if isinstance(parsed_frequency, dict) and "rowcount" in parsed_frequency:
-        rowcount = parsed_frequency["rowcount"]
-    elif csv_path:
-        try:
-            from dartfx.qsv.cmd import Count
-
-            res = Count().run(str(csv_path))
-            rowcount = int(res.strip())
-        except Exception:
-            pass
-
-    fieldcount = None
-    if properties:
-        fieldcount = len(properties)
-    elif parsed_stats:
-        fieldcount = len(parsed_stats)
-    elif isinstance(parsed_frequency, dict) and "fieldcount" in parsed_frequency:
-        fieldcount = parsed_frequency["fieldcount"]
-
-    # <fileDscr>
-    file_id = "F1"
-    fileDscr = ET.SubElement(root, f"{{{ns}}}fileDscr", {"ID": file_id})
-    fileTxt = ET.SubElement(fileDscr, f"{{{ns}}}fileTxt")
-    fileName = ET.SubElement(fileTxt, f"{{{ns}}}fileName")
-    fileName.text = filename
-
-    if rowcount is not None or fieldcount is not None:
-        dimensns = ET.SubElement(fileTxt, f"{{{ns}}}dimensns")
-        if rowcount is not None:
-            caseQnty = ET.SubElement(dimensns, f"{{{ns}}}caseQnty")
-            caseQnty.text = str(rowcount)
-        if fieldcount is not None:
-            varQnty = ET.SubElement(dimensns, f"{{{ns}}}varQnty")
-            varQnty.text = str(fieldcount)
-
-    fileType = ET.SubElement(fileTxt, f"{{{ns}}}fileType")
-    fileType.text = "Comma-delimited CSV file"
+    titl_stdy.text = title
+
+    for (file_id, profile, _), filename in zip(files, file_names, strict=True):
+        parsed_stats = profile.stats_data
+        parsed_frequency = profile.frequency_data
+        properties = profile.schema_data.get("properties", {})
+
+        # Row/Var dimensions
+        rowcount = profile.rowcount
+        fieldcount = None
+        if properties:
+            fieldcount = len(properties)
+        elif parsed_stats:
+            fieldcount = len(parsed_stats)
+        elif isinstance(parsed_frequency, dict) and "fieldcount" in parsed_frequency:
+            fieldcount = parsed_frequency["fieldcount"]
+
+        # <fileDscr>
+        fileDscr = ET.SubElement(root, f"{{{ns}}}fileDscr", {"ID": file_id})
+        fileTxt = ET.SubElement(fileDscr, f"{{{ns}}}fileTxt")
+        fileName = ET.SubElement(fileTxt, f"{{{ns}}}fileName")
+        fileName.text = filename
+
+        if rowcount is not None or fieldcount is not None:
+            dimensns = ET.SubElement(fileTxt, f"{{{ns}}}dimensns")
+            if rowcount is not None:
+                caseQnty = ET.SubElement(dimensns, f"{{{ns}}}caseQnty")
+                caseQnty.text = str(rowcount)
+            if fieldcount is not None:
+                varQnty = ET.SubElement(dimensns, f"{{{ns}}}varQnty")
+                varQnty.text = str(fieldcount)
+
+        fileType = ET.SubElement(fileTxt, f"{{{ns}}}fileType")
+        fileType.text = "Comma-delimited CSV file"
 
     # <dataDscr>
     dataDscr = ET.SubElement(root, f"{{{ns}}}dataDscr")
 
-    # Order of columns
-    columns = list(properties.keys()) if properties else [row["field"] for row in parsed_stats]
-
-    # Map frequencies by field
-    freq_fields = parsed_frequency.get("fields", []) if isinstance(parsed_frequency, dict) else []
-    freq_dict = {f["field"]: f for f in freq_fields if "field" in f}
-
-    for idx, col in enumerate(columns, start=1):
-        prop = properties.get(col, {})
-        stats_row = stats_dict.get(col, {})
-
-        is_cat = col in detected_categorical
-
-        qsv_type = stats_row.get("type") or prop.get("type", ["String"])
-        if isinstance(qsv_type, list):
-            qsv_type = qsv_type[0] if qsv_type else "String"
-        qsv_type_str = str(qsv_type).lower()
-
-        is_numeric = qsv_type_str in ("integer", "float", "number")
-        is_contin_type = qsv_type_str in ("float", "number")
-        intrvl_val = "contin" if (is_contin_type and not is_cat) else "discrete"
-
-        if is_cat:
-            rep_type = "coded"
-        elif "date" in qsv_type_str or "time" in qsv_type_str:
-            rep_type = "datetime"
-        elif "boolean" in qsv_type_str:
-            rep_type = "boolean"
-        elif is_numeric:
-            rep_type = "numeric"
-        else:
-            rep_type = "text"
-
-        var_attrs = {
-            "ID": f"V{idx}",
-            "name": col,
-            "files": file_id,
-            "intrvl": intrvl_val,
-            "representationType": rep_type,
-        }
-
-        max_prec = stats_row.get("max_precision")
-        if max_prec is not None and max_prec != "":
-            try:
-                var_attrs["dcml"] = str(int(max_prec))
-            except ValueError:
-                pass
-
-        var_elem = ET.SubElement(dataDscr, f"{{{ns}}}var", var_attrs)
-
-        labl_elem = ET.SubElement(var_elem, f"{{{ns}}}labl")
-        labl_elem.text = col
-
-        # Add summary statistics
-        def add_sum_stat(stat_type: str, val: Any, other_type: str | None = None, var_elem=var_elem) -> None:
-
-            if val is not None and val != "":
-                attrs = {"type": stat_type}
-                if other_type:
-                    attrs["otherType"] = other_type
-                elem = ET.SubElement(var_elem, f"{{{ns}}}sumStat", attrs)
-                elem.text = str(val)
-
-        add_sum_stat("mean", stats_row.get("mean"))
-        add_sum_stat("medn", stats_row.get("q2_median"))
-        add_sum_stat("mode", stats_row.get("mode"))
-        add_sum_stat("stdev", stats_row.get("stddev"))
-        add_sum_stat("min", stats_row.get("min"))
-        add_sum_stat("max", stats_row.get("max"))
-
-        nullcount = stats_row.get("nullcount")
-        if nullcount is not None and nullcount != "":
-            try:
-                nullcount_int = int(nullcount)
-                add_sum_stat("invd", nullcount_int)
-                if rowcount is not None:
-                    if isinstance(rowcount, (int, str, float)):
-                        add_sum_stat("vald", max(0, int(rowcount) - nullcount_int))
-            except ValueError:
-                add_sum_stat("invd", nullcount)
-
-        add_sum_stat("other", stats_row.get("sum"), "sum")
-        add_sum_stat("other", stats_row.get("range"), "range")
-        add_sum_stat("other", stats_row.get("variance"), "variance")
-        add_sum_stat("other", stats_row.get("cv"), "cv")
-        add_sum_stat("other", stats_row.get("skewness"), "skewness")
-        add_sum_stat("other", stats_row.get("sparsity"), "sparsity")
-        add_sum_stat("other", stats_row.get("cardinality"), "cardinality")
-
-        # Category Frequencies
-        freq_field = freq_dict.get(col, {})
-        frequencies = freq_field.get("frequencies", [])
-        for f_item in frequencies:
-            cat_val = f_item.get("value")
-            if cat_val is None:
-                continue
-
-            catgry = ET.SubElement(var_elem, f"{{{ns}}}catgry")
-
-            catValu = ET.SubElement(catgry, f"{{{ns}}}catValu")
-            catValu.text = str(cat_val)
-
-            labl = ET.SubElement(catgry, f"{{{ns}}}labl")
-            labl.text = str(cat_val)
-
-            count = f_item.get("count")
-            if count is not None:
-                catStat_freq = ET.SubElement(catgry, f"{{{ns}}}catStat", {"type": "freq"})
-                catStat_freq.text = str(count)
-
-            pct = f_item.get("percentage")
-            if pct is not None:
-                catStat_pct = ET.SubElement(catgry, f"{{{ns}}}catStat", {"type": "percent"})
-                catStat_pct.text = str(pct)
-
-        # Add varFormat element
-        vf_attrs = {
-            "type": "numeric" if qsv_type_str in ("integer", "float", "number") else "character",
-            "schema": "other",
-            "otherSchema": "qsv",
-            "formatname": qsv_type,
-        }
-        if "date" in qsv_type_str or "time" in qsv_type_str or rep_type == "datetime":
-            vf_attrs["category"] = "date"
-        ET.SubElement(var_elem, f"{{{ns}}}varFormat", vf_attrs)
-
-    # Indent and serialize
+    # Write everything but the variables, which go where the placeholder text is. The variables
+    # are serialized one at a time, without a namespace since the default one is declared on the root
+    placeholder = f"_{uuid.uuid4()}"
+    if any(columns for _, _, columns in files):
+        dataDscr.text = placeholder
     ET.indent(root, space="    ")
-    xml_str = ET.tostring(root, encoding="utf-8", xml_declaration=True).decode("utf-8")
-
-    if output_xml_path:
-        with open(output_xml_path, "w", encoding="utf-8") as f:
-            f.write(xml_str)
+    head, _, tail = ET.tostring(root, encoding="unicode").partition(placeholder)
+    out.write("<?xml version='1.0' encoding='utf-8'?>\n")
+    out.write(head)
+
+    var_idx = 0
+    for file_id, profile, columns in files:
+        parsed_frequency = profile.frequency_data
+        detected_categorical = profile.categorical_columns
+        stats_dict = {row["field"]: row for row in profile.stats_data}
+        properties = profile.schema_data.get("properties", {})
+        rowcount = profile.rowcount
+
+        # Map frequencies by field
+        freq_fields = parsed_frequency.get("fields", []) if isinstance(parsed_frequency, dict) else []
+        freq_dict = {f["field"]: f for f in freq_fields if "field" in f}
+
+        for col in columns:
+            var_idx += 1
+            prop = properties.get(col, {})
+            stats_row = stats_dict.get(col, {})
+
+            is_cat = col in detected_categorical
+
+            qsv_type = stats_row.get("type") or prop.get("type", ["String"])
+            if isinstance(qsv_type, list):
+                qsv_type = qsv_type[0] if qsv_type else "String"
+            qsv_type_str = str(qsv_type).lower()
+
+            is_numeric = qsv_type_str in ("integer", "float", "number")
+            is_contin_type = qsv_type_str in ("float", "number")
+            intrvl_val = "contin" if (is_contin_type and not is_cat) else "discrete"
+
+            if is_cat:
+                rep_type = "coded"
+            elif "date" in qsv_type_str or "time" in qsv_type_str:
+                rep_type = "datetime"
+            elif "boolean" in qsv_type_str:
+                rep_type = "boolean"
+            elif is_numeric:
+                rep_type = "numeric"
+            else:
+                rep_type = "text"
+
+            var_attrs = {
+                "ID": f"V{var_idx}",
+                "name": col,
+                "files": file_id,
+                "intrvl": intrvl_val,
+                "representationType": rep_type,
+            }
+
+            max_prec = stats_row.get("max_precision")
+            if max_prec is not None and max_prec != "":
+                try:
+                    var_attrs["dcml"] = str(int(max_prec))
+                except ValueError:
+                    pass
+
+            var_elem = ET.Element("var", var_attrs)
+
+            labl_elem = ET.SubElement(var_elem, "labl")
+            labl_elem.text = col
+
+            # Add summary statistics
+            def add_sum_stat(stat_type: str, val: Any, other_type: str | None = None, var_elem=var_elem) -> None:
+
+                if val is not None and val != "":
+                    attrs = {"type": stat_type}
+                    if other_type:
+                        attrs["otherType"] = other_type
+                    elem = ET.SubElement(var_elem, "sumStat", attrs)
+                    elem.text = str(val)
+
+            add_sum_stat("mean", stats_row.get("mean"))
+            add_sum_stat("medn", stats_row.get("q2_median"))
+            add_sum_stat("mode", stats_row.get("mode"))
+            add_sum_stat("stdev", stats_row.get("stddev"))
+            add_sum_stat("min", stats_row.get("min"))
+            add_sum_stat("max", stats_row.get("max"))
+
+            nullcount = stats_row.get("nullcount")
+            if nullcount is not None and nullcount != "":
+                try:
+                    nullcount_int = int(nullcount)
+                    add_sum_stat("invd", nullcount_int)
+                    if rowcount is not None:
+                        if isinstance(rowcount, (int, str, float)):
+                            add_sum_stat("vald", max(0, int(rowcount) - nullcount_int))
+                except ValueError:
+                    add_sum_stat("invd", nullcount)
+
+            add_sum_stat("other", stats_row.get("sum"), "sum")
+            add_sum_stat("other", stats_row.get("range"), "range")
+            add_sum_stat("other", stats_row.get("variance"), "variance")
+            add_sum_stat("other", stats_row.get("cv"), "cv")
+            add_sum_stat("other", stats_row.get("skewness"), "skewness")
+            add_sum_stat("other", stats_row.get("sparsity"), "sparsity")
+            add_sum_stat("other", stats_row.get("cardinality"), "cardinality")
+
+            # Category Frequencies
+            freq_field = freq_dict.get(col, {})
+            frequencies = freq_field.get("frequencies", [])
+            for f_item in frequencies:
+                cat_val = f_item.get("value")
+                if cat_val is None:
+                    continue
+
+                catgry = ET.SubElement(var_elem, "catgry")
+
+                catValu = ET.SubElement(catgry, "catValu")
+                catValu.text = str(cat_val)
+
+                labl = ET.SubElement(catgry, "labl")
+                labl.text = str(cat_val)
+
+                count = f_item.get("count")
+                if count is not None:
+                    catStat_freq = ET.SubElement(catgry, "catStat", {"type": "freq"})
+                    catStat_freq.text = str(count)
+
+                pct = f_item.get("percentage")
+                if pct is not None:
+                    catStat_pct = ET.SubElement(catgry, "catStat", {"type": "percent"})
+                    catStat_pct.text = str(pct)
+
+            # Add varFormat element
+            vf_attrs = {
+                "type": "numeric" if qsv_type_str in ("integer", "float", "number") else "character",
+                "schema": "other",
+                "otherSchema": "qsv",
+                "formatname": qsv_type,
+            }
+            if "date" in qsv_type_str or "time" in qsv_type_str or rep_type == "datetime":
+                vf_attrs["category"] = "date"
+            ET.SubElement(var_elem, "varFormat", vf_attrs)
+
+            # Same layout as indenting the whole document: <var> elements are at depth 2
+            ET.indent(var_elem, space="    ", level=2)
+            out.write("\n        ")
+            out.write(ET.tostring(var_elem, encoding="unicode"))
+
+    if any(columns for _, _, columns in files):
+        out.write("\n    ")
+    out.write(tail)
+
+
+SQL_FLAVORS = (
+    "postgres",
+    "sqlite",
+    "mysql",
+    "mssql",
+    "oracle",
+    "clickhouse",
+    "duckdb",
+    "snowflake",
+    "bigquery",
+    "redshift",
+    "mariadb",
+)
+DEFAULT_INSERT_BATCH_ROWS = 500
+DEFAULT_INSERT_BATCH_BYTES = 1024 * 1024
+
+# Delimiters of the delimited files qsv reads, by extension (comma otherwise)
+_CSV_DELIMITERS = {".tsv": "\t", ".tab": "\t", ".ssv": ";"}
+# Values qsv infers as booleans (with --infer-boolean), lower-cased
+_BOOLEAN_VALUES = {"true": 1, "false": 0, "t": 1, "f": 0, "yes": 1, "no": 0, "y": 1, "n": 0, "1": 1, "0": 0}
+_NUMBER_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+
+def _csv_delimiter(csv_path: str | os.PathLike[str]) -> str:
+    return _CSV_DELIMITERS.get(os.path.splitext(csv_path)[1].lower(), ",")
+
+
+def _sql_string_literal(flavor: str) -> Callable[[str], str]:
+    """Returns the function quoting a string literal in `flavor`."""
+    if flavor in ("mysql", "mariadb"):
+        # Backslash is an escape character in the default SQL mode
+        return lambda v: "'" + v.replace("\\", "\\\\").replace("\0", "\\0").replace("'", "''") + "'"
+    if flavor == "snowflake":
+        return lambda v: "'" + v.replace("\\", "\\\\").replace("'", "''") + "'"
+    if flavor == "clickhouse":
+        return lambda v: "'" + v.replace("\\", "\\\\").replace("'", "\\'") + "'"
+    if flavor == "bigquery":
+        # Quoted strings cannot span lines
+        table = str.maketrans({"\\": "\\\\", "'": "\\'", "\n": "\\n", "\r": "\\r"})
+        return lambda v: "'" + v.translate(table) + "'"
+    if flavor == "mssql":
+        return lambda v: "N'" + v.replace("'", "''") + "'"
+    return lambda v: "'" + v.replace("'", "''") + "'"
+
+
+def _sql_value_literals(flavor: str, kinds: list[str]) -> list[Callable[[str], str]]:
+    """
+    Returns the functions writing a CSV value as a SQL literal, for columns of the given kinds
+    ("number", "boolean" or "string"). Empty values are NULL; numbers and booleans are unquoted,
+    unless the value is not a valid number or boolean, in which case it is quoted like a string.
+    """
+    string = _sql_string_literal(flavor)
+    true, false = ("1", "0") if flavor in ("sqlite", "mssql", "oracle") else ("TRUE", "FALSE")
+
+    def number(value: str) -> str:
+        if not value:
+            return "NULL"
+        return value if _NUMBER_RE.fullmatch(value) else string(value)
+
+    def boolean(value: str) -> str:
+        if not value:
+            return "NULL"
+        flag = _BOOLEAN_VALUES.get(value.lower())
+        return string(value) if flag is None else true if flag else false
+
+    def text(value: str) -> str:
+        return string(value) if value else "NULL"
+
+    literals = {"number": number, "boolean": boolean, "string": text}
+    return [literals[kind] for kind in kinds]
+
+
+def _write_sql_inserts(
+    out: IO[str],
+    csv_path: str,
+    flavor: str,
+    target: str,
+    kinds: list[str],
+    batch_rows: int,
+    batch_bytes: int,
+) -> None:
+    """
+    Writes the rows of a CSV file as multi-row INSERT statements into `target` ("table (columns)").
 
-    return xml_str
+    A statement is written as soon as it holds `batch_rows` rows or adding the next row would
+    take its rows over `batch_bytes`, so only one statement is held in memory.
+    """
+    literals = _sql_value_literals(flavor, kinds)
+    if flavor == "oracle":
+        # Oracle has no multi-row VALUES clause
+        start, separator, end = "INSERT ALL\n", "\n", "\nSELECT 1 FROM DUAL;\n"
+        row_prefix = f"    INTO {target} VALUES ("
+    else:
+        start, separator, end = f"INSERT INTO {target} VALUES\n", ",\n", ";\n"
+        row_prefix = "    ("
+
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        reader = csv.reader(f, delimiter=_csv_delimiter(csv_path))
+        header = next(reader, None)
+        if header is not None and len(header) != len(kinds):
+            raise ValueError(f"The CSV file has {len(header)} columns, the schema has {len(kinds)}.")
+        rows: list[str] = []
+        size = 0
+        for number, record in enumerate(reader, start=1):
+            if len(record) != len(kinds):
+                raise ValueError(f"Row {number} of {csv_path} has {len(record)} values, expected {len(kinds)}.")
+            row = row_prefix + ", ".join(literal(value) for literal, value in zip(literals, record, strict=True)) + ")"
+            row_size = len(row) if row.isascii() else len(row.encode("utf-8"))
+            if rows and (len(rows) >= batch_rows or size + row_size > batch_bytes):
+                out.write(start + separator.join(rows) + end)
+                rows, size = [], 0
+            rows.append(row)
+            size += row_size
+        if rows:
+            out.write(start + separator.join(rows) + end)
+
+
+def _default_table_name(csv_path: str | os.PathLike[str]) -> str:
+    """The table name used for a CSV file when none is given: "tbl_<csv-filename>"."""
+    base = os.path.splitext(os.path.basename(csv_path))[0]
+    return "tbl_" + re.sub(r"[^a-zA-Z0-9_]", "_", base)
+
+
+def _resolve_primary_key(primary_key: list[str] | str | None, fields: list[str]) -> list[str]:
+    """Returns the columns named by `primary_key` (case-insensitive), as they are spelled in `fields`."""
+    pk_fields = []
+    if isinstance(primary_key, str):
+        pk_fields = [pk_item.strip() for pk_item in primary_key.split(",") if pk_item.strip()]
+    elif isinstance(primary_key, (list, tuple)):
+        for pk_item in primary_key:
+            if isinstance(pk_item, str) and pk_item.strip():
+                pk_fields.append(pk_item.strip())
+
+    field_name_map = {f.lower(): f for f in fields}
+    resolved_pk_fields = []
+    for pk in pk_fields:
+        pk_lower = pk.lower()
+        if pk_lower not in field_name_map:
+            raise ValueError(
+                f"Primary key field '{pk}' does not exist in the CSV schema (columns: {', '.join(fields)})."
+            )
+        resolved_pk_fields.append(field_name_map[pk_lower])
+    return resolved_pk_fields
 
 
 def generate_sql(
-    csv_path: str | os.PathLike[str],
+    csv_path: str | os.PathLike[str] | None = None,
     schema_data: dict[str, Any] | str | os.PathLike[str] | None = None,
     stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None = None,
     frequency_data: dict[str, Any] | str | os.PathLike[str] | None = None,
@@ -434,11 +888,19 @@ def generate_sql(
     schema_name: str | None = None,
     output_sql_path: str | os.PathLike[str] | None = None,
     primary_key: list[str] | str | None = None,
+    profile: QsvProfile | None = None,
+    insert_data: bool = False,
+    insert_batch_rows: int = DEFAULT_INSERT_BATCH_ROWS,
+    insert_batch_bytes: int = DEFAULT_INSERT_BATCH_BYTES,
 ) -> str:
     """
     Generates a SQL script to host/load a CSV file, based on the output of
     qsv schema, and optional stats and frequency data.
 
+    With `insert_data`, the script also holds the rows of the file, as multi-row
+    `INSERT ... VALUES` statements. Use `write_sql` to write such a script to a file
+    without building it in memory.
+
     Args:
         csv_path: Path to the source CSV file. Used for defaulting table name and path in comments.
         schema_data: Pre-computed schema data (dict, file path, or JSON string).
@@ -449,53 +911,151 @@ def generate_sql(
         table_name: Custom table name. If not specified, defaults to "tbl_<csv-filename>".
         schema_name: Optional database schema name (postgres/mysql/mariadb/bigquery only).
         output_sql_path: Optional path to write the generated SQL script.
+        primary_key: Primary key column name(s), as a list or a comma-separated string.
+        profile: The result of `profile_once`. When given, its stats and schema are used and
+            no QSV command is run; `csv_path` defaults to the profiled file.
+        insert_data: Append `INSERT` statements loading the rows of the CSV file.
+        insert_batch_rows: Maximum number of rows per `INSERT` statement (at most 1000 for mssql).
+        insert_batch_bytes: Maximum size of the rows of an `INSERT` statement, in bytes. A row
+            larger than this gets a statement of its own.
 
     Returns:
         str: The generated SQL script.
     """
+    buffer = io.StringIO()
+    _write_sql(
+        buffer,
+        csv_path,
+        schema_data,
+        stats_data,
+        frequency_data,
+        flavor,
+        table_name,
+        schema_name,
+        primary_key,
+        profile,
+        insert_data,
+        insert_batch_rows,
+        insert_batch_bytes,
+    )
+    full_sql = buffer.getvalue()
+
+    if output_sql_path:
+        with open(output_sql_path, "w", encoding="utf-8") as sql_file:
+            sql_file.write(full_sql)
+
+    return full_sql
+
+
+def write_sql(
+    output: str | os.PathLike[str] | IO[str],
+    csv_path: str | os.PathLike[str] | None = None,
+    schema_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+    stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None = None,
+    frequency_data: dict[str, Any] | str | os.PathLike[str] | None = None,
+    flavor: str = "postgres",
+    table_name: str | None = None,
+    schema_name: str | None = None,
+    primary_key: list[str] | str | None = None,
+    profile: QsvProfile | None = None,
+    insert_data: bool = False,
+    insert_batch_rows: int = DEFAULT_INSERT_BATCH_ROWS,
+    insert_batch_bytes: int = DEFAULT_INSERT_BATCH_BYTES,
+) -> None:
+    """
+    Same as `generate_sql`, but writes the SQL script incrementally instead of returning it.
+
+    With `insert_data`, the CSV file is read one row at a time and each `INSERT` statement is
+    written as soon as it is full, so the memory used does not depend on the size of the file.
+
+    Args:
+        output: A file path, or a text file object such as `sys.stdout`. A file left
+            incomplete by an error is removed.
+        csv_path, schema_data, stats_data, frequency_data, flavor, table_name, schema_name,
+            primary_key, profile, insert_data, insert_batch_rows, insert_batch_bytes: See `generate_sql`.
+    """
+    args = (
+        csv_path,
+        schema_data,
+        stats_data,
+        frequency_data,
+        flavor,
+        table_name,
+        schema_name,
+        primary_key,
+        profile,
+        insert_data,
+        insert_batch_rows,
+        insert_batch_bytes,
+    )
+    if not isinstance(output, (str, os.PathLike)):
+        _write_sql(output, *args)
+        return
+    try:
+        with open(output, "w", encoding="utf-8") as f:
+            _write_sql(f, *args)
+    except BaseException:
+        if os.path.exists(output):
+            os.remove(output)
+        raise
+
+
+def _write_sql(
+    out: IO[str],
+    csv_path: str | os.PathLike[str] | None,
+    schema_data: dict[str, Any] | str | os.PathLike[str] | None,
+    stats_data: list[dict[str, Any]] | list[QsvStatsDataModel] | str | os.PathLike[str] | None,
+    frequency_data: dict[str, Any] | str | os.PathLike[str] | None,
+    flavor: str,
+    table_name: str | None,
+    schema_name: str | None,
+    primary_key: list[str] | str | None,
+    profile: QsvProfile | None,
+    insert_data: bool,
+    insert_batch_rows: int,
+    insert_batch_bytes: int,
+) -> None:
+    if insert_data and (insert_batch_rows < 1 or insert_batch_bytes < 1):
+        raise ValueError("insert_batch_rows and insert_batch_bytes must be positive integers.")
     flavor_lower = flavor.lower()
     if flavor_lower == "postgresql":
         flavor_lower = "postgres"
 
-    supported_flavors = (
-        "postgres",
-        "sqlite",
-        "mysql",
-        "mssql",
-        "oracle",
-        "clickhouse",
-        "duckdb",
-        "snowflake",
-        "bigquery",
-        "redshift",
-        "mariadb",
-    )
-    if flavor_lower not in supported_flavors:
-        raise ValueError(f"Unsupported flavor '{flavor}'. Supported: {', '.join(supported_flavors)}.")
+    if flavor_lower not in SQL_FLAVORS:
+        raise ValueError(f"Unsupported flavor '{flavor}'. Supported: {', '.join(SQL_FLAVORS)}.")
 
-    # 1. Resolve JSON Schema (reuse existing internal methods)
-    if schema_data is None:
-        from dartfx.qsv.cmd import Schema
+    # 1. Resolve Stats Data (optional but resolved if None and csv_path exists) and 2. JSON Schema.
+    # Schema is computed from stats, so it only runs alongside them when the stats cache it
+    # reuses is already there. Otherwise it waits for the stats run that writes the cache
+    if profile is not None:
+        csv_path = csv_path or profile.csv_path
+        stats_data, schema_data = profile.stats_data, profile.schema_data
+    if not csv_path:
+        raise ValueError("Must provide csv_path or a profile of a CSV file.")
 
-        schema_json = Schema(stdout=True).run(str(csv_path))
-        parsed_schema = _load_json_data(schema_json)
-    else:
-        parsed_schema = _load_json_data(schema_data)
+    from dartfx.qsv.cmd import Schema
 
-    # 2. Resolve Stats Data (optional but resolved if None and csv_path exists)
-    parsed_stats = None
-    if stats_data is None:
-        if csv_path:
-            try:
-                from dartfx.qsv.cmd import Stats
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="qsv-sql") as executor:
+        schema_future = None
+        if schema_data is None and (stats_data is not None or _stats_cache_is_fresh(str(csv_path))):
+            schema_future = executor.submit(Schema(stdout=True).run, str(csv_path))
 
-                stats_csv = Stats(infer_dates=True, infer_boolean=True).run(str(csv_path))
-                parsed_stats = _load_stats_data(stats_csv)
+        parsed_stats = None
+        if stats_data is None:
+            try:
+                parsed_stats = _run_stats(str(csv_path))
             except Exception:
                 # Fallback to no stats if running stats fails
                 pass
-    else:
-        parsed_stats = _load_stats_data(stats_data)
+        else:
+            parsed_stats = _load_stats_data(stats_data)
+
+        if schema_future is not None:
+            parsed_schema = _load_json_data(schema_future.result())
+        elif schema_data is None:
+            parsed_schema = _load_json_data(Schema(stdout=True).run(str(csv_path)))
+        else:
+            parsed_schema = _load_json_data(schema_data)
 
     # 3. Resolve Frequency Data (optional)
     if frequency_data is not None:
@@ -503,11 +1063,7 @@ def generate_sql(
 
     # 4. Resolve table name
     if not table_name:
-        base = os.path.splitext(os.path.basename(csv_path))[0]
-        import re
-
-        sanitized = re.sub(r"[^a-zA-Z0-9_]", "_", base)
-        table_name = f"tbl_{sanitized}"
+        table_name = _default_table_name(csv_path)
 
     # 5. Resolve quoting rules
     if flavor_lower in ("mysql", "mariadb", "bigquery"):
@@ -532,26 +1088,7 @@ def generate_sql(
     properties = parsed_schema.get("properties", {})
 
     # Resolve and validate primary key fields (case-insensitive)
-    resolved_pk_fields = []
-    if primary_key:
-        pk_fields = []
-        if isinstance(primary_key, str):
-            pk_fields = [pk_item.strip() for pk_item in primary_key.split(",") if pk_item.strip()]
-        elif isinstance(primary_key, (list, tuple)):
-            for pk_item in primary_key:
-                if isinstance(pk_item, str) and pk_item.strip():
-                    pk_fields.append(pk_item.strip())
-
-        actual_fields = list(properties.keys())
-        field_name_map = {f.lower(): f for f in actual_fields}
-
-        for pk in pk_fields:
-            pk_lower = pk.lower()
-            if pk_lower not in field_name_map:
-                raise ValueError(
-                    f"Primary key field '{pk}' does not exist in the CSV schema (columns: {', '.join(actual_fields)})."
-                )
-            resolved_pk_fields.append(field_name_map[pk_lower])
+    resolved_pk_fields = _resolve_primary_key(primary_key, list(properties.keys()))
 
     # Helper function to map integer types
     def get_integer_type(minimum, maximum, flv):
@@ -597,6 +1134,7 @@ def generate_sql(
 
     # 6. Map columns
     columns_defs = []
+    column_kinds = []
     for col, prop in properties.items():
         # Get types
         json_types = prop.get("type", [])
@@ -625,6 +1163,16 @@ def generate_sql(
         is_date = "date" in stats_type_str or prop.get("format") == "date"
         is_datetime = "datetime" in stats_type_str or prop.get("format") == "date-time"
 
+        # Kind of the literals of the column in INSERT statements: dates are quoted strings
+        if is_date or is_datetime:
+            column_kinds.append("string")
+        elif primary_type in ("integer", "number") or stats_type_str in ("integer", "float", "number"):
+            column_kinds.append("number")
+        elif primary_type == "boolean" or stats_type_str == "boolean":
+            column_kinds.append("boolean")
+        else:
+            column_kinds.append("string")
+
         if flavor_lower == "postgres":
             if is_date:
                 col_type = "DATE"
@@ -882,13 +1430,22 @@ def generate_sql(
                 f"FIELDS TERMINATED BY ',' ENCLOSED BY '\"' LINES TERMINATED BY '\\n' IGNORE 1 ROWS;"
             )
 
-    full_sql = "\n".join(sql_script) + "\n"
+    out.write("\n".join(sql_script) + "\n")
 
-    if output_sql_path:
-        with open(output_sql_path, "w", encoding="utf-8") as sql_file:
-            sql_file.write(full_sql)
-
-    return full_sql
+    if insert_data:
+        if flavor_lower == "mssql":
+            # A table value constructor holds at most 1000 rows
+            insert_batch_rows = min(insert_batch_rows, 1000)
+        out.write("\n")
+        _write_sql_inserts(
+            out,
+            str(csv_path),
+            flavor_lower,
+            f"{quoted_table} ({cols_str})",
+            column_kinds,
+            insert_batch_rows,
+            insert_batch_bytes,
+        )
 
 
 def _is_outdated(source_path: str | os.PathLike[str], target_path: str | os.PathLike[str]) -> bool:
@@ -0,0 +1,62 @@
+import sys
+
+import pytest
+
+import dartfx.qsv.arrow as qsv_arrow
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import Select, Sqlp, To
+
+
+def test_missing_pyarrow_has_helpful_error(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    with pytest.raises(ImportError, match="dartfx-qsv\\[arrow\\]"):
+        qsv_arrow.read_csv_buffer(b"a\n1\n")
+
+
+def test_sqlp_to_pandas_requests_uncompressed_arrow(monkeypatch):
+    calls = []
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", lambda command, args, **_: calls.append((command, args)) or "")
+    monkeypatch.setattr(qsv_arrow, "read_arrow_ipc", lambda path: f"frame from {path}")
+    result = Sqlp("select * from data").to_pandas("data.csv")
+    ((command, args),) = calls
+    assert command == "sqlp"
+    assert args[:6] == ["--format", "arrow", "--compression", "uncompressed", "--output", args[5]]
+    assert args[5].endswith(".arrow")
+    assert args[6:] == ["data.csv", "select * from data"]
+    assert result == f"frame from {args[5]}"
+
+
+def test_to_parquet_to_pandas_reads_converted_file(monkeypatch, tmp_path):
+    calls = []
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", lambda command, args, **_: calls.append((command, args)) or "")
+    monkeypatch.setattr(qsv_arrow, "read_parquet", lambda path: path)
+    assert To("parquet", str(tmp_path)).to_pandas("dir/data.csv") == str(tmp_path / "data.parquet")
+    assert To("parquet", str(tmp_path), table="t").to_pandas(stdin=b"a\n1\n") == str(tmp_path / "t.parquet")
+    assert calls[0] == ("to", ["parquet", str(tmp_path), "dir/data.csv"])
+    with pytest.raises(ValueError, match="to sqlite"):
+        To("sqlite", "db.sqlite").to_pandas("data.csv")
+
+
+def test_csv_output_loads_into_arrow_backed_frame(monkeypatch):
+    pa = pytest.importorskip("pyarrow")
+    import pandas as pd
+
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", lambda *_: [sys.executable, "-c", "print('name,age\\nann,31\\nbob,42')"])
+    df = Select("name,age").to_pandas("data.csv")
+    assert list(df.columns) == ["name", "age"]
+    assert isinstance(df["age"].dtype, pd.ArrowDtype)
+    assert df["age"].dtype.pyarrow_dtype == pa.int64()
+    assert df["age"].sum() == 73
+
+
+def test_arrow_ipc_roundtrip(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc
+
+    path = tmp_path / "result.arrow"
+    table = pa.table({"x": [1, 2, 3], "y": ["a", "b", "c"]})
+    with pa.OSFile(str(path), "wb") as sink, pyarrow.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    df = qsv_arrow.read_arrow_ipc(path)
+    assert df["x"].tolist() == [1, 2, 3]
+    assert df["y"].tolist() == ["a", "b", "c"]
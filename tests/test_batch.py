@@ -0,0 +1,155 @@
+import json
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
+
+from typer.testing import CliRunner
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.batch import BatchExecutor, ProductBatch, failure_report
+from dartfx.qsv.cli import app
+from dartfx.qsv.cmd import Count, Stats
+from dartfx.qsv.model import DataProduct
+
+ECHO_ARGS = "import sys\nif sys.argv[-1].endswith('bad.csv'): sys.exit('cannot read')\nprint(' '.join(sys.argv[1:]))"
+
+
+def _fake_qsv_argv(command: str, args: list[str]) -> list[str]:
+    return [sys.executable, "-c", ECHO_ARGS, command, *args]
+
+
+def _make_inputs(tmp_path, sizes: dict[str, int]) -> list[str]:
+    paths = []
+    for name, size in sizes.items():
+        path = tmp_path / name
+        path.write_bytes(b"x" * size)
+        paths.append(str(path))
+    return paths
+
+
+def test_batch_schedules_largest_first(monkeypatch, tmp_path):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv)
+    inputs = _make_inputs(tmp_path, {"small.csv": 10, "large.csv": 1000, "medium.csv": 100})
+    executor = BatchExecutor(Count(), max_workers=1)
+    order, workers, jobs = executor.plan(inputs)
+    assert [path.rsplit("/", 1)[-1] for path, _ in order] == ["large.csv", "medium.csv", "small.csv"]
+    assert workers == 1
+    assert jobs is None  # count has no --jobs option
+    results = list(executor.run(inputs))
+    assert [r.input for r in results] == [path for path, _ in order]
+    assert all(r.ok for r in results)
+    assert results[0].output.strip() == f"count {results[0].input}"
+
+
+def test_batch_splits_jobs_across_workers(monkeypatch, tmp_path):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv)
+    inputs = _make_inputs(tmp_path, {f"f{i}.csv": i + 1 for i in range(6)})
+    results = list(BatchExecutor(Stats(infer_dates=True), max_workers=4, cpus=8).run(inputs))
+    assert len(results) == 6
+    assert {r.jobs for r in results} == {2}
+    assert all("--jobs 2" in r.output for r in results)
+
+    # An explicit --jobs is left alone
+    results = list(BatchExecutor(Stats(jobs=1), max_workers=4, cpus=8).run(inputs))
+    assert all(r.jobs is None and "--jobs 1" in r.output for r in results)
+
+
+def test_batch_reports_failures_and_output_paths(monkeypatch, tmp_path):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv)
+    inputs = _make_inputs(tmp_path, {"good.csv": 5, "bad.csv": 5})
+    executor = BatchExecutor(Count(), output_for=lambda path: path + ".count")
+    results = {r.input.rsplit("/", 1)[-1]: r for r in executor.run(inputs)}
+    assert results["good.csv"].ok
+    assert results["good.csv"].output == str(tmp_path / "good.csv.count")
+    assert (tmp_path / "good.csv.count").read_text().startswith("count")
+    assert not results["bad.csv"].ok
+    assert results["bad.csv"].returncode == 1
+    assert results["bad.csv"].error == "cannot read"
+
+
+def _make_product(tmp_path):
+    root = tmp_path / "census"
+    (root / "2020").mkdir(parents=True)
+    (root / ".git").mkdir()
+    (root / "people.csv").write_text("id,sex\n1,1\n2,2\n")
+    (root / "2020" / "households.csv").write_text("id,size\n1,3\n")
+    (root / "2020" / "bad.csv").write_text("id\n1\n")
+    (root / "people.stats.csv").write_text("field,type\n")
+    (root / ".git" / "hidden.csv").write_text("x\n")
+    (root / "notes.txt").write_text("not data")
+    return DataProduct(root=str(root))
+
+
+def _fake_profile_qsv(monkeypatch):
+    def run(command, args, **_kwargs):
+        path = args[-1]
+        if path.endswith("bad.csv"):
+            raise subprocess.CalledProcessError(2, "qsv", stderr="bad input\n")
+        with open(path) as f:
+            header = f.readline().strip().split(",")
+        if command == "stats":
+            return "field,type,nullcount,cardinality\n" + "".join(f"{name},Integer,0,2\n" for name in header)
+        if command == "schema":
+            return json.dumps({"properties": {name: {"type": ["integer"]} for name in header}})
+        if command == "frequency":
+            return json.dumps({"rowcount": 2, "fields": []})
+        return "2"
+
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", run)
+
+
+def test_product_data_files(tmp_path):
+    product = _make_product(tmp_path)
+    files = [(f.subpath, f.name) for f in product.data_files()]
+    assert files == [("", "people.csv"), ("2020", "bad.csv"), ("2020", "households.csv")]
+
+
+def test_product_batch_writes_per_file_artifacts(monkeypatch, tmp_path):
+    _fake_profile_qsv(monkeypatch)
+    product = _make_product(tmp_path)
+    out = tmp_path / "out"
+    batch = ProductBatch(product, out, ddi_versions=["2.5"], flavors=["sqlite"], processes=False, max_workers=2)
+    results = {r.input.rsplit("/", 1)[-1]: r for r in batch.run()}
+    assert results["people.csv"].output == [str(out / "people.ddi-2.5.xml"), str(out / "people.sqlite.sql")]
+    assert (out / "2020" / "households.ddi-2.5.xml").exists()
+    assert (out / "2020" / "households.sqlite.sql").exists()
+    assert results["bad.csv"].error == "bad input"
+    report = failure_report(results.values())
+    assert (report["total"], report["failed"]) == (3, 1)
+    assert report["failures"][0]["input"].endswith("bad.csv")
+
+
+def test_product_batch_splits_cpus_between_profile_processes(tmp_path):
+    product = _make_product(tmp_path)
+    _, workers, jobs = ProductBatch(product, cpus=12).plan()
+    assert (workers, jobs) == (3, 1)  # 3 files, each profiled by up to 3 qsv processes at a time
+    _, workers, jobs = ProductBatch(product, cpus=24, max_workers=2).plan()
+    assert (workers, jobs) == (2, 4)
+    assert ProductBatch(product, cpus=2).plan()[1:] == (1, 1)
+    assert ProductBatch(product, cpus=12, processes=False).plan()[2] is None
+
+
+def test_product_batch_single_codebook(monkeypatch, tmp_path):
+    _fake_profile_qsv(monkeypatch)
+    product = _make_product(tmp_path)
+    batch = ProductBatch(product, tmp_path / "out", single_codebook=True, processes=False)
+    assert sum(not r.ok for r in batch.run()) == 1
+    assert batch.codebooks == [str(tmp_path / "out" / "census.ddi-2.6.xml")]
+    ns = {"ddi": "ddi:codebook:2_6"}
+    root = ET.parse(batch.codebooks[0]).getroot()
+    assert root.find("ddi:docDscr/ddi:citation/ddi:titlStmt/ddi:titl", ns).text == "census"
+    file_names = [e.text for e in root.findall("ddi:fileDscr/ddi:fileTxt/ddi:fileName", ns)]
+    assert file_names == ["people.csv", "2020/households.csv"]
+    variables = [(v.get("ID"), v.get("name"), v.get("files")) for v in root.findall("ddi:dataDscr/ddi:var", ns)]
+    assert variables == [("V1", "id", "F1"), ("V2", "sex", "F1"), ("V3", "id", "F2"), ("V4", "size", "F2")]
+
+
+def test_cli_batch_writes_report(tmp_path):
+    product = _make_product(tmp_path)
+    (tmp_path / "census" / "2020" / "bad.csv").unlink()
+    report = tmp_path / "report.json"
+    result = CliRunner().invoke(app, ["batch", product.root, "-o", str(tmp_path / "out"), "--report", str(report)])
+    summary = json.loads(report.read_text())
+    assert summary["total"] == 2
+    assert result.exit_code == (1 if summary["failed"] else 0)
+    assert "[2/2]" in result.output
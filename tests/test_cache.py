@@ -0,0 +1,131 @@
+import sys
+import threading
+
+import dartfx.qsv.cache as qsv_cache
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cache import ResultCache, disable_result_cache, enable_result_cache
+from dartfx.qsv.cmd import Count, Sample, Select, Stats
+
+# Logs every invocation, sleeps a little so concurrent calls overlap, and prints its arguments
+LOGGING_SCRIPT = "import sys, time\nopen(sys.argv[1], 'a').write('x')\ntime.sleep(0.2)\nprint(' '.join(sys.argv[2:]))"
+
+
+class _FakeRuntime:
+    version = "20.1.0"
+
+
+def _setup(monkeypatch, tmp_path):
+    log = tmp_path / "calls.log"
+    log.write_text("")
+
+    def fake_argv(command, args):
+        return [sys.executable, "-c", LOGGING_SCRIPT, str(log), command, *args]
+
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", fake_argv)
+    monkeypatch.setattr(qsv_cache, "get_runtime", lambda: _FakeRuntime())
+    data = tmp_path / "data.csv"
+    data.write_text("a,b\n1,2\n")
+    return log, str(data)
+
+
+def test_cache_hit_and_invalidation(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    cache = ResultCache(tmp_path / "cache")
+    first = cache.run(Select("a"), data)
+    assert first.strip() == f"select a {data}"
+    assert cache.run(Select("a"), data) == first
+    assert cache.run(Select("a"), data, sink=bytes) == first.encode()
+    assert len(log.read_text()) == 1
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    # Changing the input file invalidates the entry
+    with open(data, "a") as f:
+        f.write("3,4\n")
+    cache.run(Select("a"), data)
+    assert len(log.read_text()) == 2
+
+
+def test_cache_key_ignores_keyword_order(monkeypatch, tmp_path):
+    _, data = _setup(monkeypatch, tmp_path)
+    cache = ResultCache(tmp_path / "cache")
+    key = cache.key(Count(human_readable=True, width=True), data)
+    assert key == cache.key(Count(width=True, human_readable=True), data)
+    assert key != cache.key(Count(width=True), data)
+
+
+def test_uncacheable_commands_bypass_cache(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.key(Sample(10), data) is None
+    assert cache.key(Sample(10, seed=42), data) is not None
+    cache.run(Sample(10), data)
+    cache.run(Sample(10), data)
+    assert len(log.read_text()) == 2
+    assert cache.size() == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=250)
+    for name in ("aa1", "bb2", "cc3"):
+        cache.put(name * 20, b"x" * 100)
+    assert cache.size() <= 250
+    assert cache.get("aa1" * 20) is None
+    assert cache.get("cc3" * 20) == b"x" * 100
+
+
+def test_concurrent_identical_runs_are_coalesced(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    cache = ResultCache(tmp_path / "cache")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.run(Select("b"), data))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 4
+    assert len(set(results)) == 1
+    assert len(log.read_text()) == 1
+
+
+def test_concurrent_blake3_fingerprints_hash_once(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    cache = ResultCache(tmp_path / "cache", fingerprint="blake3")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.fingerprint(data))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == [{"blake3": "blake3"}] * 4
+    assert len(log.read_text()) == 1
+
+
+def test_enable_result_cache_routes_run(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    cache = enable_result_cache(ResultCache(tmp_path / "cache"))
+    try:
+        assert Select("a").run(data) == Select("a").run(data)
+        assert len(log.read_text()) == 1
+        assert cache.hits == 1
+    finally:
+        disable_result_cache()
+    Select("a").run(data)
+    assert len(log.read_text()) == 2
+
+
+def test_commands_writing_sidecars_bypass_cache(monkeypatch, tmp_path):
+    # Writes the stats cache sidecars next to the input, as qsv stats --stats-jsonl does
+    script = "import sys; open(sys.argv[-1][:-4] + '.stats.csv.data.jsonl', 'w').write('{}'); print('field')"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", lambda _command, args: [sys.executable, "-c", script, *args])
+    monkeypatch.setattr(qsv_cache, "get_runtime", lambda: _FakeRuntime())
+    data = tmp_path / "data.csv"
+    data.write_text("a,b\n1,2\n")
+    sidecar = tmp_path / "data.stats.csv.data.jsonl"
+    cache = ResultCache(tmp_path / "cache")
+    assert cache.key(Stats(stats_jsonl=True), str(data)) is None
+    assert cache.key(Stats(cache_threshold=1), str(data)) is None
+    for _ in range(2):
+        assert cache.run(Stats(stats_jsonl=True, cache_threshold=1), str(data)).strip() == "field"
+        assert sidecar.exists()
+        sidecar.unlink()
+    assert cache.hits == 0
@@ -3,11 +3,15 @@ from __future__ import annotations
 import os
 import re
 import shutil
+import sqlite3
+import subprocess
+import sys
 import xml.etree.ElementTree as ET
 
 import pytest
 from typer.testing import CliRunner
 
+import dartfx.qsv
 from dartfx.qsv.cli import app
 
 runner = CliRunner()
@@ -434,6 +438,37 @@ def test_cli_tosql_new_flavors_precomputed() -> None:
     assert expected_maria_load in result.stdout
 
 
+def test_cli_tosql_insert_data(tmp_path: str) -> None:
+    """Test tosql writing INSERT statements for the rows of the CSV file."""
+    out_sql = os.path.join(tmp_path, "sdc_test.sql")
+    result = runner.invoke(
+        app,
+        [
+            "tosql",
+            "tests/data/sdc/sdc_test.csv",
+            "--stats-data",
+            "tests/data/sdc/sdc_test.stats.csv.data.jsonl",
+            "--schema-data",
+            "tests/data/sdc/sdc_test.csv.schema.json",
+            "-f",
+            "sqlite",
+            "-o",
+            out_sql,
+            "--insert-data",
+            "--insert-batch-rows",
+            "1000",
+        ],
+    )
+    assert result.exit_code == 0
+    with open(out_sql, encoding="utf-8") as f:
+        script = f.read()
+    assert script.count('INSERT INTO "tbl_sdc_test"') == 5
+
+    with sqlite3.connect(":memory:") as conn:
+        conn.executescript(script)
+        assert conn.execute('SELECT count(*), sum("urbrur") FROM "tbl_sdc_test"').fetchone() == (4580, 8514)
+
+
 def test_cli_tosql_primary_key() -> None:
     """Test tosql CLI command with primary-key option."""
     csv_path = "tests/data/sdc/sdc_test.csv"
@@ -491,3 +526,59 @@ def test_cli_tosql_primary_key() -> None:
     assert result.exit_code != 0
     err_msg = "Primary key field 'non_existent_column' does not exist"
     assert err_msg in result.stderr or err_msg in result.stdout
+
+
+def test_cli_profile_writes_every_artifact(tmp_path, monkeypatch) -> None:
+    import json
+
+    import dartfx.qsv.cmd as qsv_cmd
+
+    commands = []
+
+    def run(command, _args, **_kwargs):
+        commands.append(command)
+        if command == "stats":
+            return "field,type,nullcount,cardinality\nsex,Integer,0,2\nage,Integer,0,50\n"
+        if command == "schema":
+            return json.dumps({"properties": {"sex": {"type": ["integer"]}, "age": {"type": ["integer"]}}})
+        if command == "frequency":
+            return json.dumps(
+                {"rowcount": 3, "fields": [{"field": "sex", "frequencies": [{"value": "1", "count": 2}]}]}
+            )
+        return "3"
+
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", run)
+    csv_path = tmp_path / "survey.csv"
+    csv_path.write_text("sex,age\n1,30\n2,40\n1,50\n")
+    out_dir = tmp_path / "out"
+    result = runner.invoke(
+        app, ["profile", str(csv_path), "-o", str(out_dir), "-v", "2.5,2.6", "-f", "postgres", "-f", "sqlite,duckdb"]
+    )
+    assert result.exit_code == 0, result.output
+    assert sorted(os.listdir(out_dir)) == [
+        "survey.ddi-2.5.xml",
+        "survey.ddi-2.6.xml",
+        "survey.duckdb.sql",
+        "survey.postgres.sql",
+        "survey.sqlite.sql",
+    ]
+    assert commands.count("stats") == 1
+    assert commands.count("schema") == 1
+    assert ET.parse(out_dir / "survey.ddi-2.5.xml").getroot().get("version") == "2.5"
+
+    result = runner.invoke(app, ["profile", str(csv_path), "-f", "nosql"])
+    assert result.exit_code == 1
+    assert "nosql" in result.output
+
+
+def test_cli_import_is_lightweight() -> None:
+    """The CLI (and its --socket client) must not import pydantic or the modelling code."""
+    code = (
+        "import sys, dartfx.qsv.cli, dartfx.qsv.server; "
+        "print(sorted(m for m in sys.modules if m == 'pydantic' or m.startswith('dartfx.qsv.')))"
+    )
+    # The tests may run from the source tree (pythonpath = "src") without the package being installed
+    src = os.path.dirname(os.path.dirname(os.path.dirname(dartfx.qsv.__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env)
+    assert result.stdout.strip() == "['dartfx.qsv.cli', 'dartfx.qsv.server']"
@@ -1,10 +1,29 @@
+import asyncio
+import io
 import re
 import shutil
+import subprocess
+import sys
 from unittest.mock import patch
 
 import pytest
 
-from dartfx.qsv.cmd import QSV, Apply, Count, Profile, Stats, Synthesize
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import (
+    QSV,
+    Apply,
+    Count,
+    Diff,
+    Join,
+    Pipeline,
+    PipelineError,
+    Profile,
+    Search,
+    Select,
+    Stats,
+    Synthesize,
+    Validate,
+)
 
 requires_qsv = pytest.mark.skipif(
     shutil.which("qsv") is None,
@@ -120,3 +139,242 @@ def test_new_commands():
     assert "500" in args
     assert "--seed" in args
     assert "42" in args
+
+
+def _fake_qsv_argv(script: str):
+    """Build a `_qsv_argv` replacement that runs a Python script instead of qsv."""
+
+    def fake_argv(command: str, args: list[str]) -> list[str]:
+        return [sys.executable, "-c", script, command, *args]
+
+    return fake_argv
+
+
+def test_stream_yields_output_incrementally(monkeypatch):
+    script = "import sys\nfor i in range(1000): sys.stdout.write(f'{i},row{i}\\n')"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(script))
+    data = b"".join(Select("a,b").stream("data.csv", chunk_size=512))
+    assert data.splitlines()[0] == b"0,row0"
+    assert len(data.splitlines()) == 1000
+
+
+def test_iter_lines_and_records(monkeypatch):
+    script = "import sys\nsys.stdout.write('name,note\\r\\nx,\"multi\\nline\"\\r\\ny,plain\\r\\n')"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(script))
+    assert list(Select("name,note").iter_lines("data.csv"))[0] == "name,note"
+    records = list(Select("name,note").iter_records("data.csv"))
+    assert records == [["name", "note"], ["x", "multi\nline"], ["y", "plain"]]
+
+
+def test_stream_early_stop_kills_process(monkeypatch):
+    script = "import sys, time\nwhile True:\n    sys.stdout.write('x' * 1024 + '\\n')\n    sys.stdout.flush()"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(script))
+    lines = Search("x").iter_lines("data.csv")
+    assert next(lines).startswith("x")
+    lines.close()  # must return promptly instead of waiting for an endless process
+
+
+def test_stream_failure_raises_with_stderr(monkeypatch):
+    script = "import sys\nsys.stderr.write('boom')\nsys.exit(2)"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(script))
+    with pytest.raises(subprocess.CalledProcessError) as excinfo:
+        list(Count().stream("data.csv"))
+    assert excinfo.value.returncode == 2
+    assert "boom" in excinfo.value.stderr
+
+
+def test_multi_input_build_args():
+    assert Join("id", "key")._build_args("a.csv", "b.csv")[-4:] == ["id", "a.csv", "key", "b.csv"]
+    assert Diff()._build_args("a.csv", "b.csv") == ["a.csv", "b.csv"]
+    assert Validate("schema.json")._build_args("a.csv") == ["a.csv", "schema.json"]
+
+
+def test_arun_and_astream(monkeypatch):
+    script = "import sys\nprint(' '.join(sys.argv[1:]))"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(script))
+
+    async def main():
+        semaphore = asyncio.Semaphore(2)
+        outputs = await asyncio.gather(
+            *(Join("id", "key").arun("a.csv", f"b{i}.csv", semaphore=semaphore) for i in range(4))
+        )
+        chunks = [chunk async for chunk in Select("a").astream("data.csv")]
+        return outputs, b"".join(chunks)
+
+    outputs, streamed = asyncio.run(main())
+    assert outputs[3].strip() == "join id a.csv key b3.csv"
+    assert streamed.strip() == b"select a data.csv"
+
+
+def test_arun_cancellation_kills_process(monkeypatch):
+    script = "import time\ntime.sleep(60)"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(script))
+
+    async def main():
+        task = asyncio.create_task(Stats().arun("data.csv"))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(asyncio.wait_for(main(), timeout=10))
+
+
+def test_set_async_concurrency_validates_limit():
+    with pytest.raises(ValueError, match="positive"):
+        qsv_cmd.set_async_concurrency(0)
+    qsv_cmd.set_async_concurrency(None)
+
+
+def _fake_pipeline_argv(scripts: dict[str, str]):
+    """Build a `_qsv_argv` replacement that runs a different Python script per qsv command."""
+
+    def fake_argv(command: str, args: list[str]) -> list[str]:
+        return [sys.executable, "-c", scripts[command], *args]
+
+    return fake_argv
+
+
+def test_pipeline_chains_processes(monkeypatch):
+    scripts = {
+        "select": "import sys\nfor i in range(20000): print(f'{i},row{i}')",
+        "search": "import sys\nfor line in sys.stdin:\n    if line.startswith(sys.argv[1]): sys.stdout.write(line)",
+        "count": "import sys\nprint(sum(1 for _ in sys.stdin))",
+    }
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_pipeline_argv(scripts))
+    pipeline = Select("a,b") | Search("1") | Count()
+    assert isinstance(pipeline, Pipeline)
+    assert len(pipeline) == 3
+    result = pipeline.run("data.csv")
+    assert result.ok
+    assert result.stdout.strip() == str(sum(1 for i in range(20000) if str(i).startswith("1")))
+    assert [stage.command for stage in result.stages] == ["select", "search", "count"]
+    assert result.stages[0].args[-1] == "data.csv"
+    assert result.stages[1].args == ["1"]
+    assert all(stage.returncode == 0 for stage in result.stages)
+    assert b"".join(pipeline.stream("data.csv")) == result.stdout.encode()
+
+
+def test_pipeline_reports_failing_stage(monkeypatch):
+    scripts = {
+        "select": "import sys\nfor i in range(100000): print(i)",
+        "search": "import sys\nsys.stdin.readline()\nsys.stderr.write('bad regex')\nsys.exit(3)",
+    }
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_pipeline_argv(scripts))
+    with pytest.raises(PipelineError) as excinfo:
+        (Select("a") | Search("(")).run("data.csv")
+    assert excinfo.value.returncode == 3
+    assert excinfo.value.stderr == "bad regex"
+    assert excinfo.value.result.stages[1].stderr == "bad regex"
+    result = (Select("a") | Search("(")).run("data.csv", check=False)
+    assert not result.ok
+    assert result.failed_stage() is result.stages[1]
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="pipe sampling uses Linux fcntl options")
+def test_pipeline_reports_backpressure(monkeypatch):
+    scripts = {
+        "select": "import sys\nsys.stdout.write('x' * (1024 * 1024))",
+        "search": "import sys, time\nwhile sys.stdin.buffer.read(16384): time.sleep(0.01)",
+    }
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_pipeline_argv(scripts))
+    result = (Select("a") | Search("x")).run("data.csv", monitor_interval=0.01)
+    producer = result.stages[0]
+    assert producer.pipe_capacity
+    assert producer.peak_pipe_bytes == producer.pipe_capacity
+    assert producer.backpressure is not None
+    assert producer.backpressure > 0.5
+    assert result.stages[1].backpressure is None
+
+
+def test_run_output_sinks(monkeypatch, tmp_path):
+    script = "import sys\nsys.stdout.buffer.write(b'a,b\\r\\n1,\\xc3\\xa9\\r\\n')"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(script))
+    expected = b"a,b\r\n1,\xc3\xa9\r\n"
+    assert Select("a,b").run("data.csv", sink=bytes) == expected
+    view = Select("a,b").run("data.csv", sink=memoryview)
+    assert isinstance(view, memoryview)
+    assert view.tobytes() == expected
+
+    out_path = tmp_path / "out.csv"
+    assert Select("a,b").run("data.csv", sink=out_path) == str(out_path)
+    assert out_path.read_bytes() == expected
+
+    with open(tmp_path / "appended.csv", "wb") as f:
+        f.write(b"# header\n")
+        assert Select("a,b").run("data.csv", sink=f) is None
+        f.write(b"# footer\n")
+    assert (tmp_path / "appended.csv").read_bytes() == b"# header\n" + expected + b"# footer\n"
+
+    buffer = io.BytesIO()
+    Select("a,b").run("data.csv", sink=buffer)
+    assert buffer.getvalue() == expected
+
+
+def test_run_default_sink_keeps_two_argument_call():
+    with patch("dartfx.qsv.cmd._run_qsv_command", return_value="ok") as mock_run:
+        Count().run("test.csv")
+        assert mock_run.call_args.args == ("count", ["test.csv"])
+        assert mock_run.call_args.kwargs == {}
+
+
+UPPER_STDIN = "import sys\nfor line in sys.stdin: sys.stdout.write(line.upper())"
+
+
+def test_run_with_stdin_sources(monkeypatch, tmp_path):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(UPPER_STDIN))
+    assert Select("a").run(stdin=b"a,b\nx,y\n") == "A,B\nX,Y\n"
+    assert Select("a").run(stdin=iter([b"a,b\n", "x,y\n"])) == "A,B\nX,Y\n"
+    assert Select("a").run(stdin=io.BytesIO(b"a,b\n")) == "A,B\n"
+
+    source = tmp_path / "data.csv"
+    source.write_bytes(b"skip\na,b\n")
+    with open(source, "rb") as f:
+        f.readline()
+        assert Select("a").run(stdin=f) == "A,B\n"  # handed over at the logical position
+
+    with pytest.raises(TypeError, match="not a path"):
+        Select("a").run(stdin=str(source))
+
+
+def test_stream_with_large_generator_stdin(monkeypatch):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(UPPER_STDIN))
+    chunks = (f"row{i}\n".encode() for i in range(200000))
+    lines = Search("x").iter_lines(stdin=chunks)
+    assert next(lines) == "ROW0"
+    assert sum(1 for _ in lines) == 199999
+
+
+def test_stdin_from_another_process(monkeypatch):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(UPPER_STDIN))
+    producer = subprocess.Popen([sys.executable, "-c", "print('a,b')"], stdout=subprocess.PIPE)
+    assert Select("a").run(stdin=producer.stdout, sink=bytes) == b"A,B\n"
+    producer.stdout.close()
+    assert producer.wait() == 0
+
+
+def test_stdin_source_errors_propagate(monkeypatch):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(UPPER_STDIN))
+
+    def broken_source():
+        yield b"a,b\n"
+        raise ValueError("source failed")
+
+    with pytest.raises(ValueError, match="source failed"):
+        Select("a").run(stdin=broken_source())
+
+
+def test_async_and_pipeline_stdin(monkeypatch):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", _fake_qsv_argv(UPPER_STDIN))
+
+    async def chunks():
+        for i in range(3):
+            yield f"r{i}\n".encode()
+
+    async def main():
+        return await Select("a").arun(stdin=chunks()), [c async for c in Select("a").astream(stdin=b"x\n")]
+
+    text, streamed = asyncio.run(main())
+    assert text == "R0\nR1\nR2\n"
+    assert streamed == [b"X\n"]
+    assert (Select("a") | Search("x")).run(stdin=b"abc\n").stdout == "ABC\n"
@@ -0,0 +1,191 @@
+import os
+import struct
+import sys
+import threading
+
+import pytest
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import Count, Select
+from dartfx.qsv.index import (
+    CsvIndex,
+    IndexManager,
+    StaleIndexError,
+    disable_auto_index,
+    enable_auto_index,
+    get_index_manager,
+    is_index_fresh,
+    set_index_manager,
+)
+from dartfx.qsv.utils import generate_ddi_codebook
+
+# `index --output <file> <input>` writes a fake index (and logs the call); other commands echo their arguments
+FAKE_QSV = (
+    "import sys, time\n"
+    "if sys.argv[2] == 'index':\n"
+    "    open(sys.argv[1], 'a').write('x')\n"
+    "    time.sleep(0.1)\n"
+    "    open(sys.argv[4], 'wb').write(b'\\0' * 8)\n"
+    "else:\n"
+    "    print(' '.join(sys.argv[2:]))"
+)
+
+
+def _setup(monkeypatch, tmp_path):
+    log = tmp_path / "index.log"
+    log.write_text("")
+    monkeypatch.setattr(
+        qsv_cmd, "_qsv_argv", lambda command, args: [sys.executable, "-c", FAKE_QSV, str(log), command, *args]
+    )
+    data = tmp_path / "data.csv"
+    data.write_text("a,b\n1,2\n")
+    return log, str(data)
+
+
+def _age(path: str, seconds: int = 10) -> None:
+    st = os.stat(path)
+    os.utime(path, (st.st_atime - seconds, st.st_mtime - seconds))
+
+
+def test_index_manager_decisions(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    manager = IndexManager(min_size=1024)
+    assert manager.ensure(data).action == "skipped"
+    assert not os.path.exists(data + ".idx")
+
+    manager.min_size = 1
+    assert manager.ensure(data).action == "indexed"
+    assert is_index_fresh(data)
+    assert manager.ensure(data).action == "reused"
+    assert len(log.read_text()) == 1
+
+    # A stale index is rebuilt, whatever the size threshold
+    _age(data + ".idx")
+    manager.min_size = 1024
+    decision = manager.ensure(data)
+    assert decision.action == "rebuilt"
+    assert is_index_fresh(data)
+    assert [d.action for d in manager.decisions] == ["skipped", "indexed", "reused", "rebuilt"]
+
+
+def test_index_manager_reports_failures(monkeypatch, tmp_path):
+    _, data = _setup(monkeypatch, tmp_path)
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", lambda *_: [sys.executable, "-c", "import sys; sys.exit('boom')"])
+    reported = []
+    decision = IndexManager(min_size=0, on_decision=reported.append).ensure(data)
+    assert decision.action == "failed"
+    assert decision.reason == "boom"
+    assert reported == [decision]
+    assert not os.path.exists(data + ".idx")
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_concurrent_ensure_builds_once(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    manager = IndexManager(min_size=0)
+    threads = [threading.Thread(target=manager.ensure, args=(data,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(log.read_text()) == 1
+    assert sorted(d.action for d in manager.decisions) == ["indexed", "reused", "reused", "reused"]
+
+
+def test_commands_index_their_inputs_automatically(monkeypatch, tmp_path):
+    log, data = _setup(monkeypatch, tmp_path)
+    assert get_index_manager() is None  # off until enabled
+    Count().run(data)
+    assert not os.path.exists(data + ".idx")
+    manager = enable_auto_index(IndexManager(min_size=0))
+    try:
+        # Building the arguments (e.g. for a cache key) does not index
+        Count()._build_args(data)
+        assert not os.path.exists(data + ".idx")
+        assert Count().run(data).strip() == f"count {data}"
+        assert os.path.exists(data + ".idx")
+        Select("a").run(data)  # does not use an index
+        assert [d.action for d in manager.decisions] == ["indexed"]
+    finally:
+        disable_auto_index()
+
+
+def test_async_runs_index_off_the_event_loop(monkeypatch, tmp_path):
+    import asyncio
+
+    _, data = _setup(monkeypatch, tmp_path)
+    threads = []
+    enable_auto_index(IndexManager(min_size=0, on_decision=lambda _d: threads.append(threading.get_ident())))
+
+    async def main():
+        loop_thread = threading.get_ident()
+        output = await Count().arun(data)
+        chunks = [chunk async for chunk in Count().astream(data)]
+        return loop_thread, output, chunks
+
+    try:
+        loop_thread, output, chunks = asyncio.run(main())
+    finally:
+        set_index_manager(None)
+    assert output.strip() == f"count {data}"
+    assert b"".join(chunks).strip() == f"count {data}".encode()
+    assert len(threads) == 2
+    assert loop_thread not in threads
+
+
+def _write_index(csv_path, records):
+    offsets, position = [], 0
+    for record in records:
+        offsets.append(position)
+        position += len(record)
+    with open(csv_path, "wb") as f:
+        f.write(b"".join(records))
+    with open(csv_path + ".idx", "wb") as f:
+        f.write(b"".join(struct.pack(">Q", o) for o in offsets) + struct.pack(">Q", len(records)))
+    st = os.stat(csv_path)
+    os.utime(csv_path + ".idx", ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+
+
+def test_csv_index_random_access(tmp_path):
+    path = str(tmp_path / "data.csv")
+    _write_index(path, [b"id,name\n", b"1,ann\n", b'2,"b\nob"\n', b"3,cy\n"])
+    with CsvIndex(path) as index:
+        assert len(index) == 3
+        assert bytes(index.header()) == b"id,name\n"
+        assert index.offset(1) == len(b"id,name\n1,ann\n")
+        assert [bytes(row) for row in index.get_rows(1, 5)] == [b'2,"b\nob"\n', b"3,cy\n"]
+        assert index.get_rows(3, 1) == []
+        assert index.byte_range(0, 3) == (8, os.path.getsize(path))
+        with pytest.raises(IndexError):
+            index.offset(3)
+        views = index.get_rows(0, 1)
+        del views
+    with CsvIndex(path, has_headers=False) as index:
+        assert index.row_count == 4
+
+
+def test_csv_index_rejects_stale_and_corrupt_indexes(tmp_path):
+    path = str(tmp_path / "data.csv")
+    _write_index(path, [b"a\n", b"1\n"])
+    os.utime(path + ".idx", ns=(0, 0))
+    with pytest.raises(StaleIndexError, match="older"):
+        CsvIndex(path)
+    with open(path + ".idx", "ab") as f:
+        f.write(b"\0" * 8)
+    with pytest.raises(ValueError, match="corrupt"):
+        CsvIndex(path, check_fresh=False)
+
+
+def test_ddi_case_quantity_comes_from_a_fresh_index(tmp_path, monkeypatch):
+    path = str(tmp_path / "data.csv")
+    _write_index(path, [b"a\n", b"1\n", b"2\n"])
+    commands = []
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", lambda command, *_args, **_kwargs: commands.append(command) or "")
+    xml = generate_ddi_codebook(
+        csv_path=path,
+        stats_data=[{"field": "a", "type": "Integer", "nullcount": 0, "cardinality": 2}],
+        schema_data={"properties": {"a": {"type": "integer"}}},
+        categorical_threshold=0,
+    )
+    assert "caseQnty>2<" in xml
+    assert "count" not in commands
@@ -0,0 +1,160 @@
+import json
+import sqlite3
+
+import pytest
+from typer.testing import CliRunner
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cli import app
+from dartfx.qsv.load import load_sqlite
+
+CSV_PATH = "tests/data/sdc/sdc_test.csv"
+STATS_PATH = "tests/data/sdc/sdc_test.stats.csv.data.jsonl"
+SCHEMA_PATH = "tests/data/sdc/sdc_test.csv.schema.json"
+
+SCHEMA = {
+    "properties": {
+        "id": {"type": ["integer"]},
+        "name": {"type": ["string", "null"]},
+        "score": {"type": ["number", "null"]},
+        "active": {"type": ["boolean", "null"]},
+    }
+}
+STATS = [
+    {"field": "id", "type": "Integer", "min": "1", "max": "5"},
+    {"field": "name", "type": "String"},
+    {"field": "score", "type": "Float"},
+    {"field": "active", "type": "Boolean"},
+]
+
+
+@pytest.fixture
+def small_csv(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text(
+        'id,name,score,active\n1,Ann,1.5,true\n2,"Smith, Bob",,false\n3,,2,\n4,Eve,3.25,true\n5,Joe,0,false\n',
+        encoding="utf-8",
+    )
+    return path
+
+
+def test_load_sqlite_types_nulls_and_batches(small_csv, tmp_path):
+    db = tmp_path / "out.db"
+    result = load_sqlite(small_csv, db, schema_data=SCHEMA, stats_data=STATS, batch_size=2, transaction_rows=3)
+    assert result.rows == 5
+    assert result.table == "tbl_people"
+    assert result.rows_per_second > 0
+    with sqlite3.connect(db) as conn:
+        rows = conn.execute(
+            "SELECT id, typeof(id), name, score, typeof(score), active FROM tbl_people ORDER BY id"
+        ).fetchall()
+    assert rows[0] == (1, "integer", "Ann", 1.5, "real", 1)
+    assert rows[1] == (2, "integer", "Smith, Bob", None, "null", 0)
+    assert rows[2][2:] == (None, 2.0, "real", None)
+
+
+def test_load_sqlite_deferred_primary_key_and_indexes(small_csv, tmp_path):
+    db = tmp_path / "out.db"
+    load_sqlite(small_csv, db, schema_data=SCHEMA, stats_data=STATS, primary_key="ID", indexes=["name"])
+    with sqlite3.connect(db) as conn:
+        indexes = {row[1]: row[2] for row in conn.execute("PRAGMA index_list(tbl_people)")}
+        assert indexes == {"tbl_people_pkey": 1, "tbl_people_name_idx": 0}
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute("INSERT INTO tbl_people (id) VALUES (1)")
+
+
+def test_load_sqlite_if_exists(small_csv, tmp_path):
+    db = tmp_path / "out.db"
+    load_sqlite(small_csv, db, schema_data=SCHEMA, stats_data=STATS)
+    with pytest.raises(ValueError, match="already exists"):
+        load_sqlite(small_csv, db, schema_data=SCHEMA, stats_data=STATS)
+    assert load_sqlite(small_csv, db, schema_data=SCHEMA, stats_data=STATS, if_exists="append").rows == 5
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT count(*) FROM tbl_people").fetchone() == (10,)
+    load_sqlite(small_csv, db, schema_data=SCHEMA, stats_data=STATS, if_exists="replace")
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT count(*) FROM tbl_people").fetchone() == (5,)
+
+
+def test_load_sqlite_rejects_unknown_primary_key(small_csv, tmp_path):
+    with pytest.raises(ValueError, match="does not exist"):
+        load_sqlite(small_csv, tmp_path / "out.db", schema_data=SCHEMA, stats_data=STATS, primary_key="missing")
+
+
+def test_load_sqlite_tab_delimited(tmp_path):
+    path = tmp_path / "people.tsv"
+    path.write_text("id\tname\tscore\tactive\n1\tAnn, Lee\t1.5\ttrue\n", encoding="utf-8")
+    load_sqlite(path, tmp_path / "out.db", schema_data=SCHEMA, stats_data=STATS)
+    with sqlite3.connect(tmp_path / "out.db") as conn:
+        assert conn.execute("SELECT * FROM tbl_people").fetchall() == [(1, "Ann, Lee", 1.5, 1)]
+
+
+def test_cli_tosql_load(tmp_path):
+    db = tmp_path / "sdc.db"
+    result = CliRunner().invoke(
+        app,
+        [
+            "tosql",
+            CSV_PATH,
+            "--stats-data",
+            STATS_PATH,
+            "--schema-data",
+            SCHEMA_PATH,
+            "--load",
+            str(db),
+        ],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Loaded 4580 rows into tbl_sdc_test" in result.output
+    assert "rows/s" in result.output
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT count(*), sum(urbrur) FROM tbl_sdc_test").fetchone() == (4580, 8514)
+
+    result = CliRunner().invoke(app, ["tosql", CSV_PATH, "--load", str(db), "-f", "postgres"])
+    assert result.exit_code == 1
+
+
+def _fake_qsv(monkeypatch):
+    """Fake qsv stats (with --infer-boolean) and schema for the people.csv fixture."""
+    calls = []
+
+    def run(command, args, **_kwargs):
+        calls.append(command)
+        if command == "stats":
+            assert "--infer-boolean" in args
+            return (
+                "field,type,nullcount,cardinality\n"
+                "id,Integer,0,5\nname,String,1,4\nscore,Float,1,4\nactive,Boolean,1,2\n"
+            )
+        if command == "schema":
+            # qsv schema types booleans as strings, only stats infer them
+            types = {"id": "integer", "name": "string", "score": "number", "active": "string"}
+            return json.dumps({"properties": {name: {"type": [t, "null"]} for name, t in types.items()}})
+        return "qsv 1.0.0"
+
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", run)
+    return calls
+
+
+def test_load_sqlite_profiles_booleans_when_stats_are_not_given(monkeypatch, small_csv, tmp_path):
+    calls = _fake_qsv(monkeypatch)
+    db = tmp_path / "out.db"
+    load_sqlite(small_csv, db)
+    assert calls.count("stats") == 1
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("SELECT active, typeof(active) FROM tbl_people ORDER BY id").fetchall() == [
+            (1, "integer"),
+            (0, "integer"),
+            (None, "null"),
+            (1, "integer"),
+            (0, "integer"),
+        ]
+
+
+def test_cli_tosql_load_and_output_profile_once(monkeypatch, small_csv, tmp_path):
+    calls = _fake_qsv(monkeypatch)
+    out_sql = tmp_path / "people.sql"
+    result = CliRunner().invoke(app, ["tosql", str(small_csv), "--load", str(tmp_path / "out.db"), "-o", str(out_sql)])
+    assert result.exit_code == 0, result.output
+    assert (calls.count("stats"), calls.count("schema")) == (1, 1)
+    assert '"active" INTEGER' in out_sql.read_text(encoding="utf-8")
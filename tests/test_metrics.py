@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import Count, Select
+from dartfx.qsv.metrics import Histogram, MetricsRegistry, get_metrics_registry, set_metrics_registry
+
+# Echoes stdin for select ("hello" otherwise) to stdout, writes a warning to stderr and fails on a "bad" argument
+FAKE_QSV = (
+    "import sys\n"
+    "data = sys.stdin.buffer.read() if sys.argv[1] == 'select' else b'hello\\n'\n"
+    "sys.stdout.buffer.write(data)\n"
+    "sys.stderr.write('warn')\n"
+    "sys.exit(1 if sys.argv[-1] == 'bad' else 0)"
+)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", lambda command, args: [sys.executable, "-c", FAKE_QSV, command, *args])
+    previous = get_metrics_registry()
+    registry = MetricsRegistry()
+    set_metrics_registry(registry)
+    yield registry
+    set_metrics_registry(previous)
+
+
+def test_run_records_invocation_metrics(registry, tmp_path):
+    data = tmp_path / "data.csv"
+    data.write_text("a\n1\n")
+    Count().run(str(data))
+    Select("a").run(stdin=b"a\n1\n2\n")
+    with pytest.raises(subprocess.CalledProcessError):
+        Count().run("bad")
+
+    count, select, failed = registry.recent
+    assert count.command == "count"
+    assert count.returncode == 0
+    assert count.input_sizes == {str(data): 4}
+    assert count.stdout_bytes == 6
+    assert count.stderr_bytes == 4
+    assert count.wall_time > 0
+    if hasattr(os, "wait4"):
+        assert count.cpu_time is not None
+        assert count.max_rss > 0
+    assert select.stdin_bytes == 6
+    assert failed.returncode == 1
+
+    commands = registry.to_dict()
+    assert commands["count"]["invocations"] == 2
+    assert commands["count"]["failures"] == 1
+    assert commands["select"]["stdout_bytes"]["sum"] == 6
+
+
+def test_stream_sinks_and_async_are_recorded(registry, tmp_path):
+    assert b"".join(Count().stream()) == b"hello\n"
+    Count().run(sink=tmp_path / "out.csv")
+    asyncio.run(Count().arun())
+    (Count() | Count()).run()
+    assert [m.stdout_bytes for m in registry.recent] == [6, 6, 6, None, 6]
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.0, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+    assert histogram.to_dict()["buckets"] == {"1": 2, "2": 3, "4": 4, "+Inf": 5}
+    assert histogram.quantile(0.5) == pytest.approx(1.5)
+    assert histogram.quantile(1.0) == 4.0
+    assert Histogram((1.0,)).quantile(0.5) is None
+
+
+def test_exports(registry):
+    Count().run()
+    data = json.loads(registry.to_json())
+    assert data["count"]["wall_seconds"]["count"] == 1
+    text = registry.to_prometheus()
+    assert "# TYPE qsv_wall_seconds histogram" in text
+    assert 'qsv_invocations_total{command="count"} 1' in text
+    assert 'qsv_stdout_bytes_bucket{command="count",le="1024"} 1' in text
+    assert 'qsv_stdout_bytes_count{command="count"} 1' in text
@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+import os
+import statistics
+import struct
+
+import pytest
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.model import CsvDataFile, DataProduct, QsvStatsFile
+
+
+def fake_stats_csv(data: bytes) -> str:
+    values = [int(row["x"]) for row in csv.DictReader(io.StringIO(data.decode()))]
+    row = {
+        "field": "x",
+        "type": "Integer",
+        "nullcount": 0,
+        "cardinality": len(set(values)),
+        "sum": sum(values),
+        "min": min(values),
+        "max": max(values),
+        "mean": statistics.fmean(values),
+        "variance": statistics.pvariance(values),
+        "n_negative": 0,
+        "n_zero": values.count(0),
+        "n_positive": len([v for v in values if v > 0]),
+        "q2_median": statistics.median(values),
+    }
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(row))
+    writer.writeheader()
+    writer.writerow(row)
+    return out.getvalue()
+
+
+@pytest.fixture
+def fake_qsv(monkeypatch):
+    scanned = []
+
+    def run(command, args, sink=None, stdin=None):  # noqa: ARG001
+        if command == "index":
+            output, path = args[1], args[2]
+            with open(path, "rb") as f:
+                lines = f.read().splitlines(keepends=True)
+            offsets, position = [], 0
+            for line in lines:
+                offsets.append(position)
+                position += len(line)
+            with open(output, "wb") as f:
+                f.write(b"".join(struct.pack(">Q", o) for o in offsets) + struct.pack(">Q", len(lines)))
+            return ""
+        if stdin is not None:
+            data = b"".join(stdin)
+        else:
+            with open(args[-1], "rb") as f:
+                data = f.read()
+        if command == "count":
+            return f"{data.count(b'\n') - (0 if '--no-headers' in args else 1)}\n"
+        assert command == "stats"
+        if "--no-headers" in args:
+            data = b"x\n" + data
+        scanned.append(data.count(b"\n") - 1)
+        return fake_stats_csv(data)
+
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", run)
+    return scanned
+
+
+@pytest.fixture
+def stats_file(tmp_path):
+    (tmp_path / "feed.csv").write_text("x\n" + "".join(f"{i}\n" for i in range(1, 6)))
+    datafile = CsvDataFile(product=DataProduct(root=str(tmp_path)), name="feed.csv")
+    return QsvStatsFile(datafile=datafile)
+
+
+def test_refresh_only_scans_appended_rows(stats_file, fake_qsv):
+    first = stats_file.refresh()
+    assert first[0].sum == 15
+    assert stats_file.load_checkpoint().rows == 5
+    with open(stats_file.datafile.filepath, "a") as f:
+        f.write("10\n20\n")
+    (x,) = stats_file.refresh()
+    assert fake_qsv == [5, 2]
+    assert (x.sum, x.min, x.max) == (45, "1", "20")
+    assert x.mean == pytest.approx(statistics.fmean([1, 2, 3, 4, 5, 10, 20]))
+    assert x.variance == pytest.approx(statistics.pvariance([1, 2, 3, 4, 5, 10, 20]))
+    assert x.q2_median is None
+    assert stats_file.load_refreshed()[0].sum == 45
+    assert not os.path.exists(stats_file.jsonl_filepath)  # qsv's own stats cache is not written
+    assert stats_file.load_checkpoint().rows == 7
+    stats_file.refresh()
+    assert fake_qsv == [5, 2]  # nothing appended
+
+
+@pytest.mark.usefixtures("fake_qsv")
+def test_refresh_reads_only_the_appended_bytes(stats_file, monkeypatch):
+    from dartfx.qsv import shard
+
+    stats_file.refresh()
+    offset = stats_file.load_checkpoint().offset
+    with open(stats_file.datafile.filepath, "a") as f:
+        f.write("10\n20\n")
+    reads = []
+    read_range = shard._read_range
+    monkeypatch.setattr(
+        shard, "_read_range", lambda path, start, end: reads.append((start, end)) or read_range(path, start, end)
+    )
+    stats_file.refresh()
+    assert sorted(reads) == [(0, 2), (offset, offset + 6), (offset, offset + 6)]
+    assert not os.path.exists(stats_file.datafile.filepath + ".idx")
+
+
+def test_refresh_without_headers(tmp_path, fake_qsv):
+    (tmp_path / "feed.csv").write_text("".join(f"{i}\n" for i in range(1, 6)))
+    stats_file = QsvStatsFile.from_path(tmp_path / "feed.csv")
+    (x,) = stats_file.refresh(qsv_cmd.Stats(no_headers=True))
+    assert stats_file.load_checkpoint().rows == 5
+    with open(stats_file.datafile.filepath, "a") as f:
+        f.write("10\n")
+    (x,) = stats_file.refresh(qsv_cmd.Stats(no_headers=True))
+    assert fake_qsv == [5, 1]
+    assert x.sum == 25
+    assert stats_file.load_checkpoint().rows == 6
+
+
+def test_append_to_an_unterminated_row_is_scanned_again(stats_file, fake_qsv):
+    with open(stats_file.datafile.filepath, "a") as f:
+        f.write("6")
+    stats_file.refresh()
+    with open(stats_file.datafile.filepath, "a") as f:
+        f.write("0\n")
+    (x,) = stats_file.refresh()
+    assert fake_qsv == [5, 6]
+    assert x.max == "60"
+
+
+def test_rewritten_file_is_scanned_again(stats_file, fake_qsv):
+    stats_file.refresh()
+    with open(stats_file.datafile.filepath, "w") as f:
+        f.write("x\n9\n8\n7\n6\n5\n4\n")
+    (x,) = stats_file.refresh()
+    assert fake_qsv == [5, 6]
+    assert x.sum == 39
+    assert x.q2_median == 6.5
+
+
+def test_other_options_force_a_full_scan(stats_file, fake_qsv):
+    stats_file.refresh()
+    with open(stats_file.datafile.filepath, "a") as f:
+        f.write("6\n")
+    stats_file.refresh(qsv_cmd.Stats(everything=True))
+    assert fake_qsv == [5, 6]
+
+
+def test_is_fresh_checks_mtime_size_and_options(stats_file):
+    from dartfx.qsv.cmd import Stats
+
+    with open(stats_file.jsonl_filepath, "w") as f:
+        f.write('{"field":"x","type":"Integer","nullcount":0,"cardinality":5}\n')
+    args = {"flag_select": "<All>", "flag_infer_dates": True, "flag_infer_boolean": True, "flag_round": 4}
+    size = os.path.getsize(stats_file.datafile.filepath)
+    with open(stats_file.args_filepath, "w") as f:
+        json.dump({**args, "filesize_bytes": size}, f)
+    assert stats_file.is_fresh()
+    assert not stats_file.is_fresh(Stats(infer_dates=True))
+    assert stats_file.is_fresh(Stats(infer_dates=True, infer_boolean=True, everything=True))
+    st = os.stat(stats_file.jsonl_filepath)
+    os.utime(stats_file.datafile.filepath, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert not stats_file.is_fresh()
+    assert QsvStatsFile.from_path(stats_file.datafile.filepath).args_filepath == stats_file.args_filepath
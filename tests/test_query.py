@@ -0,0 +1,129 @@
+import sys
+
+import pytest
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import Pipeline, Search, Select, Slice, Sort, Sqlp
+from dartfx.qsv.query import LazyCsv
+
+
+@pytest.fixture
+def people(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text("id,name,age,city,notes\n1,ann,31,paris,x\n2,bob,42,rome,y\n")
+    return str(path)
+
+
+def test_filters_are_pushed_before_sorts_and_selects_merged(people):
+    query = LazyCsv(people, engine="pipeline").select("name", "age", "city").sort("age").filter("city", "==", "rome")
+    rows, projection = query.select("name").optimized_ops()
+    assert [op.kind for op in rows] == ["filter", "sort"]
+    assert projection == ("name",)
+    assert query.select("name").plan().columns_read == ["name", "city", "age"]
+
+
+def test_filter_is_not_pushed_across_a_slice(people):
+    rows, _ = LazyCsv(people).head(10).filter("city", "==", "rome").optimized_ops()
+    assert [op.kind for op in rows] == ["slice", "filter"]
+
+
+def test_consecutive_slices_compose(people):
+    rows, _ = LazyCsv(people).slice(5, 20).slice(3, 100).head(4).optimized_ops()
+    assert [(op.start, op.length) for op in rows] == [(8, 4)]
+
+
+def test_columns_are_checked_against_the_selection(people):
+    with pytest.raises(ValueError, match="not in the current selection"):
+        LazyCsv(people).select("name").filter("age", ">", 30)
+    with pytest.raises(ValueError, match="Unknown filter operator"):
+        LazyCsv(people).filter("age", "~", 30)
+
+
+def test_compiles_to_one_sqlp_query(people):
+    query = (
+        LazyCsv(people, engine="sqlp")
+        .filter("age", ">=", 30)
+        .sort("name")
+        .sort("age", descending=True)
+        .filter("name", "startswith", "a.")
+        .select("name", "age")
+        .slice(10, 5)
+    )
+    plan = query.plan()
+    assert plan.engine == "sqlp"
+    assert isinstance(plan.command, Sqlp)
+    assert plan.sql == (
+        'SELECT "name", "age" FROM _t_1 WHERE "age" >= 30 AND CAST("name" AS VARCHAR) ~ \'^a\\.\' '
+        'ORDER BY "age" DESC, "name" LIMIT 5 OFFSET 10'
+    )
+
+
+def test_sort_after_slice_uses_a_subquery(people):
+    sql = LazyCsv(people, engine="sqlp").head(3).sort("name").to_sql()
+    assert sql == 'SELECT * FROM (SELECT * FROM _t_1 LIMIT 3) AS _q1 ORDER BY "name"'
+
+
+def test_sql_literals_are_escaped(people):
+    sql = LazyCsv(people, engine="sqlp").filter("name", "==", "o'neil", ignore_case=True).to_sql()
+    assert sql == "SELECT * FROM _t_1 WHERE lower(\"name\") = 'o''neil'"
+
+
+def test_pipeline_fallback_reads_only_needed_columns(people):
+    plan = (
+        LazyCsv(people, engine="pipeline").filter("city", "==", "rome").sort("age", numeric=True).select("name").plan()
+    )
+    assert isinstance(plan.command, Pipeline)
+    first, search, sort, last = plan.command.commands
+    assert isinstance(first, Select)
+    assert first.init_args == ["name,age,city"]
+    assert isinstance(search, Search)
+    assert search._get_args() == ["--select", "city", "--exact"]
+    assert search.init_args == ["rome"]
+    assert isinstance(sort, Sort)
+    assert sort._get_args() == ["--select", "age", "--numeric"]
+    assert isinstance(last, Select)
+    assert last.init_args == ["name"]
+
+
+def test_pipeline_fallback_rejects_comparisons(people):
+    with pytest.raises(ValueError, match="sqlp engine"):
+        LazyCsv(people, engine="pipeline").filter("age", ">", 30).plan()
+
+
+def test_auto_engine_depends_on_polars_feature(people, monkeypatch):
+    class _Runtime:
+        def __init__(self, features):
+            self.features = features
+
+        def has_feature(self, name):
+            return name in self.features
+
+    monkeypatch.setattr("dartfx.qsv.query.get_runtime", lambda: _Runtime({"polars"}))
+    assert LazyCsv(people).plan().engine == "sqlp"
+    monkeypatch.setattr("dartfx.qsv.query.get_runtime", lambda: _Runtime(set()))
+    assert isinstance(LazyCsv(people).head(2).plan().command, Slice)
+
+
+def test_explain_shows_plans_and_command(people):
+    text = LazyCsv(people, engine="pipeline").sort("age").filter("notes", "contains", "x").select("id").explain()
+    assert "logical:   sort(age) -> filter(notes contains 'x') -> select(id)" in text
+    assert "optimized: filter(notes contains 'x') -> sort(age) -> select(id)" in text
+    assert "columns:   id, notes, age" in text
+    assert f"run:       qsv select id,age,notes {people}" in text
+    assert "| qsv search --select notes x" in text
+    # The command line is the one the command runs with (qsv sqlp <input> <sql>)
+    sql = LazyCsv(people, engine="sqlp").select("id").to_sql()
+    assert LazyCsv(people, engine="sqlp").select("id").explain().endswith(f"run:       qsv sqlp {people} {sql}")
+
+
+def test_collect_runs_the_pipeline(people, monkeypatch):
+    calls = []
+
+    def fake_argv(command, args):
+        calls.append((command, args))
+        output = "sys.stdout.write('name\\nann\\n')" if command == "slice" else "sys.stdout.write(sys.stdin.read())"
+        return [sys.executable, "-c", f"import sys; {output}"]
+
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", fake_argv)
+    assert LazyCsv(people, engine="pipeline").select("name").head(1).collect() == "name\nann\n"
+    assert calls == [("slice", ["--len", "1", people]), ("select", ["name"])]
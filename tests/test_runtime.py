@@ -0,0 +1,83 @@
+import os
+import stat
+import sys
+
+import pytest
+
+from dartfx.qsv.runtime import QsvRuntime, _parse_version_output
+
+FAKE_QSV = """#!{python}
+import sys
+with open({log!r}, "a") as log:
+    log.write(" ".join(sys.argv[1:]) + "\\n")
+flag = sys.argv[1]
+if flag == "--version":
+    print("qsv {version}-mimalloc-apply;fetch;Luau 0.693;polars-0.51.0;python-3.12.8;to;-16-16;9.47 GiB-0 B")
+elif flag == "--list":
+    print("Installed commands (2):")
+    print("    count       Count records")
+    print("    stats       Infer data types and compute summary statistics")
+    print("")
+elif flag == "--envlist":
+    print('QSV_MAX_JOBS: "4"')
+"""
+
+
+@pytest.fixture
+def fake_qsv(tmp_path, monkeypatch):
+    """Install a fake `qsv` executable on PATH that logs each invocation."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "calls.log"
+    log.touch()
+
+    def install(version: str = "20.1.0") -> None:
+        exe = bin_dir / "qsv"
+        exe.write_text(FAKE_QSV.format(python=sys.executable, log=str(log), version=version))
+        exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+
+    install()
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}")
+    return install, log
+
+
+def test_parse_version_output():
+    parsed = _parse_version_output("qsv 20.1.0-mimalloc-apply;fetch;Luau 0.693;polars-0.51.0;to;-16-16;9 GiB")
+    assert parsed["version"] == "20.1.0"
+    assert parsed["allocator"] == "mimalloc"
+    assert parsed["features"] == ["apply", "fetch", "luau", "polars", "to"]
+    assert _parse_version_output("qsv 0.124.0")["version"] == "0.124.0"
+    assert _parse_version_output("not qsv")["version"] == "unknown"
+
+
+def test_runtime_resolves_and_caches_once(fake_qsv):
+    _, log = fake_qsv
+    runtime = QsvRuntime()
+    assert runtime.path.endswith("qsv")
+    assert runtime.version == "20.1.0"
+    assert runtime.has_feature("polars")
+    assert runtime.has_feature("Luau")
+    assert not runtime.has_feature("geocode")
+    assert [c["name"] for c in runtime.commands] == ["count", "stats"]
+    assert runtime.env == [{"name": "QSV_MAX_JOBS", "value": "4"}]
+    for _ in range(5):
+        assert runtime.version == "20.1.0"
+        assert runtime.commands
+        assert runtime.env
+    assert log.read_text().splitlines() == ["--version", "--list", "--envlist"]
+
+
+def test_runtime_invalidates_on_binary_change(fake_qsv):
+    install, log = fake_qsv
+    runtime = QsvRuntime()
+    assert runtime.version == "20.1.0"
+    install(version="21.0.0")
+    os.utime(runtime.path, ns=(0, 0))
+    assert runtime.version == "21.0.0"
+    assert log.read_text().splitlines() == ["--version", "--version"]
+
+
+def test_runtime_missing_binary(monkeypatch, tmp_path):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    with pytest.raises(RuntimeError, match="not installed"):
+        _ = QsvRuntime().path
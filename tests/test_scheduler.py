@@ -0,0 +1,97 @@
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import Select, Stats
+from dartfx.qsv.runtime import cgroup_cpu_limit
+from dartfx.qsv.scheduler import CpuBudget, disable_cpu_budget, enable_cpu_budget
+
+ECHO = "import os, sys\nprint(' '.join(sys.argv[1:]), os.environ.get('QSV_MAX_JOBS', '-'))"
+
+
+def test_budget_shares_grow_and_shrink():
+    budget = CpuBudget(total=8, max_jobs_per_invocation=4)
+    first = budget.acquire()
+    second = budget.acquire()
+    assert (first.jobs, second.jobs) == (4, 4)
+    # Exhausted: a non-blocking request over-commits the minimum
+    third = budget.acquire(block=False)
+    assert third.jobs == 1
+    assert budget.in_use() == 9
+    budget.release(first)
+    budget.release(third)
+    # With one invocation still running, the next one gets half of the budget
+    assert budget.acquire().jobs == 4
+    budget.release(second)
+    assert budget.acquire(want=1).jobs == 1
+    # A third of the budget once two are running
+    assert budget.acquire().jobs == 2
+    assert budget.acquire(want=3, fixed=True, block=False).jobs == 3
+
+
+def test_budget_blocks_until_release():
+    budget = CpuBudget(total=2)
+    held = budget.acquire()
+    assert held.jobs == 2
+    granted = []
+    waiter = threading.Thread(target=lambda: granted.append(budget.acquire().jobs))
+    waiter.start()
+    time.sleep(0.1)
+    assert granted == []
+    budget.release(held)
+    waiter.join(timeout=5)
+    assert granted == [2]
+
+
+def test_budget_shared_through_lock_file(tmp_path):
+    lock_file = tmp_path / "cpus.json"
+    # A reservation left behind by a process that no longer exists is discarded
+    lock_file.write_text(json.dumps({"999999999:stale": 8}))
+    one = CpuBudget(total=4, lock_file=lock_file)
+    other = CpuBudget(total=4, lock_file=lock_file, poll_interval=0.01)
+    with one.reserve() as jobs:
+        assert jobs == 4
+        assert other.in_use() == 4
+        assert other.acquire(block=False).jobs == 1
+    assert "999999999:stale" not in json.loads(lock_file.read_text())
+    assert one.in_use() == 1
+
+
+def test_commands_get_jobs_from_budget(monkeypatch):
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", lambda command, args: [sys.executable, "-c", ECHO, command, *args])
+    budget = enable_cpu_budget(CpuBudget(total=4))
+    try:
+        assert Stats().run("data.csv").split() == ["stats", "--jobs", "4", "data.csv", "-"]
+        assert Stats(jobs=2).run("data.csv").split() == ["stats", "--jobs", "2", "data.csv", "-"]
+        assert Select("a").run("data.csv").split() == ["select", "a", "data.csv", "-"]
+        assert budget.in_use() == 0
+
+        enable_cpu_budget(budget, use_env=True)
+        assert Stats().run("data.csv").split() == ["stats", "data.csv", "4"]
+    finally:
+        disable_cpu_budget()
+    assert Stats().run("data.csv").split() == ["stats", "data.csv", "-"]
+
+
+@pytest.mark.parametrize(
+    ("cgroup", "files", "expected"),
+    [
+        ("0::/app\n", {"app/cpu.max": "150000 100000\n", "cpu.max": "max 100000\n"}, 1.5),
+        ("0::/app\n", {"app/cpu.max": "max 100000\n"}, None),
+        ("4:cpu,cpuacct:/docker/x\n", {"cpu/cpu.cfs_quota_us": "200000", "cpu/cpu.cfs_period_us": "100000"}, 2.0),
+        ("4:cpu,cpuacct:/docker/x\n", {"cpu/cpu.cfs_quota_us": "-1", "cpu/cpu.cfs_period_us": "100000"}, None),
+    ],
+)
+def test_cgroup_cpu_limit(tmp_path, cgroup, files, expected):
+    proc_cgroup = tmp_path / "cgroup"
+    proc_cgroup.write_text(cgroup)
+    root = tmp_path / "sys"
+    for name, content in files.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    assert cgroup_cpu_limit(str(proc_cgroup), str(root)) == expected
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+from typer.testing import CliRunner
+
+from dartfx.qsv import utils
+from dartfx.qsv.cli import app
+from dartfx.qsv.server import ProfileClient, ProfileServer, ServerError
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n1,x\n2,y\n")
+    return str(path)
+
+
+@pytest.fixture
+def fake_generators(monkeypatch):
+    calls = []
+
+    def fake_stats(csv_path):
+        calls.append(("stats", csv_path))
+        return [{"field": "a"}, {"field": "b"}]
+
+    def fake_ddi(**params):
+        calls.append(("toddic", params))
+        time.sleep(0.1)
+        return f"<codeBook version='{params['version']}'/>"
+
+    def fake_sql(**params):
+        calls.append(("tosql", params))
+        return f"CREATE TABLE t; -- {params['flavor']}"
+
+    monkeypatch.setattr(
+        ProfileServer,
+        "_stats",
+        lambda self, csv_path: self._single_flight(
+            self._key("stats", {"csv_path": csv_path}), lambda: fake_stats(csv_path)
+        ),
+    )
+    monkeypatch.setattr(utils, "generate_ddi_codebook", fake_ddi)
+    monkeypatch.setattr(utils, "generate_sql", fake_sql)
+    return calls
+
+
+def test_responses_are_cached_and_stats_shared(csv_file, fake_generators):
+    server = ProfileServer("unused.sock")
+    first = server.handle({"op": "toddic", "params": {"csv_path": csv_file, "version": "2.5"}})
+    assert first == {"ok": True, "result": "<codeBook version='2.5'/>"}
+    assert server.handle({"op": "toddic", "params": {"csv_path": csv_file, "version": "2.5"}}) == first
+    assert server.handle({"op": "tosql", "params": {"csv_path": csv_file, "flavor": "sqlite"}})["ok"]
+    assert [call[0] for call in fake_generators] == ["stats", "toddic", "tosql"]
+    assert fake_generators[2][1]["stats_data"] == [{"field": "a"}, {"field": "b"}]
+
+
+def test_modified_file_is_profiled_again(csv_file, fake_generators):
+    server = ProfileServer("unused.sock")
+    server.handle({"op": "toddic", "params": {"csv_path": csv_file, "version": "2.6"}})
+    with open(csv_file, "a") as f:
+        f.write("3,z\n")
+    server.handle({"op": "toddic", "params": {"csv_path": csv_file, "version": "2.6"}})
+    assert [call[0] for call in fake_generators] == ["stats", "toddic", "stats", "toddic"]
+
+
+def test_concurrent_identical_requests_are_coalesced(csv_file, fake_generators):
+    server = ProfileServer("unused.sock")
+    results = []
+    request = {"op": "toddic", "params": {"csv_path": csv_file, "version": "2.6"}}
+    threads = [threading.Thread(target=lambda: results.append(server.handle(request))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(results) == 5
+    assert all(result["ok"] for result in results)
+    assert [call[0] for call in fake_generators] == ["stats", "toddic"]
+
+
+def test_invalid_requests_are_reported():
+    server = ProfileServer("unused.sock")
+    assert server.handle({"op": "nope"})["type"] == "ValueError"
+    assert "Unknown parameters" in server.handle({"op": "stats", "params": {"csv_path": "/x", "rm": 1}})["error"]
+    assert "absolute" in server.handle({"op": "stats", "params": {"csv_path": "data.csv"}})["error"]
+
+
+def test_rows_are_never_served_or_cached(csv_file, fake_generators):
+    server = ProfileServer("unused.sock")
+    for params in ({"insert_data": True}, {"insert_batch_rows": 1}, {"insert_batch_bytes": 1}):
+        response = server.handle({"op": "tosql", "params": {"csv_path": csv_file, **params}})
+        assert "Unknown parameters" in response["error"]
+    assert not fake_generators
+    assert not server._responses
+    result = CliRunner().invoke(app, ["tosql", csv_file, "--insert-data", "--socket", "unused.sock"])
+    assert result.exit_code == 1
+    assert "--insert-data cannot be used with --socket" in result.output
+
+
+@pytest.mark.usefixtures("fake_generators")
+def test_socket_roundtrip_and_cli_client(csv_file, tmp_path):
+    socket_dir = tempfile.mkdtemp(prefix="qsv-")
+    socket_path = os.path.join(socket_dir, "s.sock")
+    server = ProfileServer(socket_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    client = ProfileClient(socket_path, timeout=5)
+    for _ in range(100):
+        if client.is_available():
+            break
+        time.sleep(0.01)
+    try:
+        assert client.request("tosql", csv_path=csv_file, flavor="duckdb") == "CREATE TABLE t; -- duckdb"
+        with pytest.raises(ServerError, match="Unknown operation"):
+            client.request("drop")
+        output = tmp_path / "out.xml"
+        result = CliRunner().invoke(app, ["toddic", csv_file, "--socket", socket_path, "-o", str(output)])
+        assert result.exit_code == 0, result.output
+        assert output.read_text() == "<codeBook version='2.6'/>"
+    finally:
+        client.request("shutdown")
+        thread.join(5)
+    assert not os.path.exists(socket_path)
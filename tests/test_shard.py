@@ -0,0 +1,80 @@
+import os
+import struct
+import sys
+
+import pytest
+
+import dartfx.qsv.cmd as qsv_cmd
+from dartfx.qsv.cmd import Pseudo, Search, Select
+from dartfx.qsv.shard import ShardedExecutor
+
+
+def write_indexed_csv(path, header, rows):
+    lines = [header, *rows]
+    data = "".join(line + "\n" for line in lines).encode()
+    path.write_bytes(data)
+    offsets, position = [], 0
+    for line in lines:
+        offsets.append(position)
+        position += len(line) + 1
+    idx = path.with_name(path.name + ".idx")
+    idx.write_bytes(b"".join(struct.pack(">Q", offset) for offset in offsets) + struct.pack(">Q", len(lines)))
+    st = os.stat(path)
+    os.utime(idx, ns=(st.st_atime_ns, st.st_mtime_ns + 1))
+    return str(path)
+
+
+@pytest.fixture
+def big_csv(tmp_path):
+    return write_indexed_csv(
+        tmp_path / "big.csv", "id,tag", [f'{i},"{"keep" if i % 3 else "drop"}"' for i in range(10)]
+    )
+
+
+def test_plan_byte_ranges(big_csv):
+    shards = ShardedExecutor(Select("id"), shards=2, min_shard_rows=1).plan(big_csv)
+    with open(big_csv, "rb") as f:
+        data = f.read()
+    assert data[shards[0].start_byte : shards[0].end_byte].startswith(b'0,"drop"')
+    assert data[shards[1].start_byte : shards[1].end_byte].startswith(b'5,"keep"')
+    assert data[shards[1].end_byte :] == b""
+
+
+def test_plan_splits_rows_evenly(big_csv):
+    shards = ShardedExecutor(Select("id"), shards=3, min_shard_rows=1).plan(big_csv)
+    assert [(s.start_row, s.end_row) for s in shards] == [(0, 3), (3, 6), (6, 10)]
+    assert shards[-1].end_byte == os.path.getsize(big_csv)
+    assert all(a.end_byte == b.start_byte for a, b in zip(shards, shards[1:], strict=False))
+    assert len(ShardedExecutor(Select("id"), shards=8, min_shard_rows=4).plan(big_csv)) == 2
+
+
+def test_outputs_are_concatenated_in_order_with_one_header(big_csv, monkeypatch):
+    script = (
+        "import sys; lines = sys.stdin.readlines(); "
+        "sys.stdout.write(lines[0] + ''.join(line for line in lines[1:] if 'keep' in line))"
+    )
+    calls = []
+    monkeypatch.setattr(
+        qsv_cmd, "_qsv_argv", lambda _command, args: calls.append(args) or [sys.executable, "-c", script]
+    )
+    output = ShardedExecutor(Search("keep"), shards=4, min_shard_rows=1).run(big_csv)
+    expected = ["id,tag"] + [f'{i},"keep"' for i in range(10) if i % 3]
+    assert output.splitlines() == expected
+    assert calls == [["keep"]] * 4
+
+
+def test_row_dependent_commands_are_rejected():
+    with pytest.raises(ValueError, match="cannot be sharded"):
+        ShardedExecutor(Pseudo("id"))
+    with pytest.raises(ValueError, match="flag"):
+        ShardedExecutor(Search("x", flag="matched"))
+
+
+def test_outputs_are_spooled_and_streamed_in_chunks(big_csv, monkeypatch):
+    # An output header holding a quoted line break is dropped whole from every shard but the first
+    script = "import sys; lines = sys.stdin.readlines(); sys.stdout.write('\"i\\nd\",tag\\n' + ''.join(lines[1:]))"
+    monkeypatch.setattr(qsv_cmd, "_qsv_argv", lambda _command, _args: [sys.executable, "-c", script])
+    chunks = list(ShardedExecutor(Select("id"), shards=3, min_shard_rows=1).stream(big_csv, chunk_size=4))
+    assert max(len(chunk) for chunk in chunks) == 4
+    with open(big_csv, "rb") as f:
+        assert b"".join(chunks) == b'"i\nd",tag\n' + f.read().split(b"\n", 1)[1]
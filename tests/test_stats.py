@@ -0,0 +1,122 @@
+import math
+import statistics
+
+import pytest
+
+from dartfx.qsv.stats import NON_MERGEABLE_FIELDS, StatsAccumulator, merge_stats, to_stats_model
+
+
+def qsv_like_stats(name, values):
+    """Stats of one numeric column in the shape produced by `qsv stats` (population variance)."""
+    present = [v for v in values if v is not None]
+    lengths = [len(str(v)) if v is not None else 0 for v in values]
+    row = {
+        "field": name,
+        "type": "Integer" if present else "NULL",
+        "nullcount": str(len(values) - len(present)),
+        "cardinality": str(len(set(present))),
+        "sparsity": str((len(values) - len(present)) / len(values)),
+        "min_length": str(min(lengths)),
+        "max_length": str(max(lengths)),
+        "sum_length": str(sum(lengths)),
+        "avg_length": str(statistics.fmean(lengths)),
+        "variance_length": str(statistics.pvariance(lengths)),
+        "q2_median": str(statistics.median(present)) if present else "",
+    }
+    if present:
+        row.update(
+            sum=str(sum(present)),
+            min=str(min(present)),
+            max=str(max(present)),
+            mean=str(statistics.fmean(present)),
+            variance=str(statistics.pvariance(present)),
+            stddev=str(statistics.pstdev(present)),
+            geometric_mean=str(statistics.geometric_mean(present)),
+            harmonic_mean=str(statistics.harmonic_mean(present)),
+            n_negative="0",
+            n_zero="0",
+            n_positive=str(len(present)),
+        )
+    return row
+
+
+PARTITIONS = [[3, 9, None, 12], [1, 40, 7], [None, None], [5, 5, 5, 22, None]]
+
+
+def test_merged_stats_match_the_union():
+    merged = merge_stats([[qsv_like_stats("x", values)] for values in PARTITIONS])
+    (x,) = merged
+    union = [v for values in PARTITIONS for v in values]
+    present = [v for v in union if v is not None]
+    assert x.type == "Integer"
+    assert x.nullcount == 4
+    assert x.sparsity == pytest.approx(4 / len(union))
+    assert x.sum == sum(present)
+    assert (x.min, x.max, x.range) == ("1", "40", 39)
+    assert x.mean == pytest.approx(statistics.fmean(present))
+    assert x.variance == pytest.approx(statistics.pvariance(present))
+    assert x.stddev == pytest.approx(statistics.pstdev(present))
+    assert x.sem == pytest.approx(statistics.pstdev(present) / math.sqrt(len(present)))
+    assert x.geometric_mean == pytest.approx(statistics.geometric_mean(present))
+    assert x.harmonic_mean == pytest.approx(statistics.harmonic_mean(present))
+    assert x.n_positive == len(present)
+    lengths = [len(str(v)) if v is not None else 0 for v in union]
+    assert x.avg_length == pytest.approx(statistics.fmean(lengths))
+    assert x.variance_length == pytest.approx(statistics.pvariance(lengths))
+    assert (x.min_length, x.max_length, x.sum_length) == (0, 2, sum(lengths))
+
+
+def test_non_mergeable_fields_are_marked():
+    accumulator = StatsAccumulator()
+    accumulator.add([qsv_like_stats("x", PARTITIONS[0])])
+    assert accumulator.inexact_fields == frozenset()
+    assert accumulator.result()[0].q2_median == 9
+    accumulator.add([qsv_like_stats("x", PARTITIONS[1])])
+    assert accumulator.inexact_fields == NON_MERGEABLE_FIELDS
+    (x,) = accumulator.result()
+    assert x.q2_median is None
+    assert x.cardinality == 3  # lower bound: the largest partition cardinality
+
+
+def test_accumulators_merge_like_partitions():
+    left, right = StatsAccumulator(), StatsAccumulator()
+    left.add([qsv_like_stats("x", PARTITIONS[0])])
+    right.add([qsv_like_stats("x", PARTITIONS[1])])
+    right.add([qsv_like_stats("x", PARTITIONS[3])])
+    merged = left.merge(right).result()[0]
+    expected = merge_stats([[qsv_like_stats("x", PARTITIONS[i])] for i in (0, 1, 3)])[0]
+    assert merged.mean == pytest.approx(expected.mean)
+    assert merged.variance == pytest.approx(expected.variance)
+    assert left.rows == 12
+
+
+def test_mixed_types_widen_and_columns_must_match():
+    string_stats = {"field": "x", "type": "String", "nullcount": "0", "cardinality": "1", "min": "a", "max": "b"}
+    (x,) = merge_stats([[qsv_like_stats("x", [1, 2])], [string_stats]], rows=[2, 1])
+    assert x.type == "String"
+    assert x.mean is None
+    with pytest.raises(ValueError, match="differ"):
+        merge_stats([[qsv_like_stats("x", [1])], [qsv_like_stats("y", [1])]])
+    with pytest.raises(ValueError, match="pass rows"):
+        StatsAccumulator().add([string_stats])
+
+
+def test_row_count_is_not_inferred_from_rounded_sparsity():
+    values = [None] * 3 + list(range(1, 4578))
+    row = qsv_like_stats("x", values)
+    row["sparsity"] = str(round(3 / len(values), 4))  # qsv rounds to 4 decimals: 0.0007
+    assert StatsAccumulator.infer_rows([to_stats_model(row)]) == 4580
+    accumulator = StatsAccumulator()
+    accumulator.add([row])
+    accumulator.add([qsv_like_stats("x", PARTITIONS[0])])
+    (x,) = accumulator.result()
+    assert accumulator.rows == 4584
+    assert x.sparsity == pytest.approx(4 / 4584)
+    assert x.mean == pytest.approx(statistics.fmean([v for v in values + PARTITIONS[0] if v is not None]))
+
+    # Without exact counts, a rounded sparsity that fits several row counts is not used
+    text = {"field": "s", "type": "String", "nullcount": "3", "cardinality": "10", "sparsity": "0.0007"}
+    assert StatsAccumulator.infer_rows([to_stats_model(text)]) is None
+    with pytest.raises(ValueError, match="pass rows"):
+        StatsAccumulator().add([text])
+    assert StatsAccumulator.infer_rows([to_stats_model({**text, "nullcount": "1", "sparsity": "0.25"})]) == 4
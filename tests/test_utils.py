@@ -1,10 +1,13 @@
+import io
 import os
+import re
 import shutil
+import sqlite3
 import xml.etree.ElementTree as ET
 
 import pytest
 
-from dartfx.qsv import generate_ddi_codebook, generate_sql
+from dartfx.qsv import generate_ddi_codebook, generate_sql, profile_once, write_ddi_codebook, write_sql
 from dartfx.qsv.model import QsvStatsDataModel
 
 requires_qsv = pytest.mark.skipif(
@@ -235,6 +238,40 @@ def test_generate_ddi_codebook_pydantic_stats():
     assert 'otherType="sum">8514.0' in xml_str
 
 
+def test_write_ddi_codebook_matches_generate(tmp_path):
+    stats_data = [
+        {"field": "sex", "type": "Integer", "cardinality": "2", "nullcount": "0", "mode": "1"},
+        {"field": "income", "type": "Float", "mean": "10.5", "max_precision": "2", "cardinality": "90"},
+    ]
+    schema_data = {"properties": {"sex": {"type": ["integer"]}, "income": {"type": ["number"]}}}
+    frequency_data = {
+        "input": "survey.csv",
+        "rowcount": 100,
+        "fields": [{"field": "sex", "frequencies": [{"value": "1", "count": 40, "percentage": 40.0}]}],
+    }
+    kwargs = {"stats_data": stats_data, "schema_data": schema_data, "frequency_data": frequency_data}
+
+    def without_ids(xml_str):
+        return re.sub(r'ID="_[0-9a-f-]+"', "", xml_str)
+
+    expected = without_ids(generate_ddi_codebook(**kwargs))
+    output = tmp_path / "codebook.xml"
+    write_ddi_codebook(output, **kwargs)
+    assert without_ids(output.read_text(encoding="utf-8")) == expected
+    buffer = io.StringIO()
+    write_ddi_codebook(buffer, **kwargs)
+    assert without_ids(buffer.getvalue()) == expected
+    assert expected.count("<var ") == 2
+    ET.fromstring(buffer.getvalue().encode("utf-8"))
+
+
+def test_write_ddi_codebook_removes_incomplete_file(tmp_path):
+    output = tmp_path / "codebook.xml"
+    with pytest.raises(ValueError, match="versions"):
+        write_ddi_codebook(output, stats_data=[], schema_data={}, version="3.0")
+    assert not output.exists()
+
+
 @requires_qsv
 def test_generate_ddi_codebook_dynamic_qsv():
     csv_path = "tests/data/sdc/sdc_test.csv"
@@ -403,6 +440,85 @@ def test_generate_sql_primary_key():
         generate_sql(csv_path="test_data.csv", schema_data=schema_data, primary_key="non-existent")
 
 
+INSERT_SCHEMA = {
+    "properties": {
+        "id": {"type": ["integer"]},
+        "name": {"type": ["string", "null"]},
+        "score": {"type": ["number", "null"]},
+        "active": {"type": ["boolean", "null"]},
+    }
+}
+
+
+@pytest.fixture
+def insert_csv(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text(
+        'id,name,score,active\n1,O\'Hara,1.5,true\n2,"back\\slash",,false\n3,,n/a,\n4,"two\nlines",2e3,yes\n',
+        encoding="utf-8",
+    )
+    return str(path)
+
+
+def test_generate_sql_insert_data_runs_in_sqlite(insert_csv):
+    sql = generate_sql(insert_csv, schema_data=INSERT_SCHEMA, flavor="sqlite", insert_data=True, insert_batch_rows=3)
+    assert sql.count('INSERT INTO "tbl_people" ("id", "name", "score", "active") VALUES') == 2
+    assert "    (1, 'O''Hara', 1.5, 1)," in sql
+    with sqlite3.connect(":memory:") as conn:
+        conn.executescript(sql)
+        rows = conn.execute('SELECT id, name, score, typeof(score), active FROM "tbl_people"').fetchall()
+    assert rows == [
+        (1, "O'Hara", 1.5, "real", 1),
+        (2, "back\\slash", None, "null", 0),
+        (3, None, "n/a", "text", None),
+        (4, "two\nlines", 2000.0, "real", 1),
+    ]
+
+
+def test_generate_sql_insert_data_flavors(insert_csv):
+    postgres = generate_sql(insert_csv, schema_data=INSERT_SCHEMA, flavor="postgres", insert_data=True)
+    assert "    (2, 'back\\slash', NULL, FALSE)," in postgres
+    assert "    (3, NULL, 'n/a', NULL)," in postgres
+    mysql = generate_sql(insert_csv, schema_data=INSERT_SCHEMA, flavor="mysql", insert_data=True)
+    assert "INSERT INTO `tbl_people` (`id`, `name`, `score`, `active`) VALUES" in mysql
+    assert "    (2, 'back\\\\slash', NULL, FALSE)," in mysql
+    bigquery = generate_sql(insert_csv, schema_data=INSERT_SCHEMA, flavor="bigquery", insert_data=True)
+    assert "    (1, 'O\\'Hara', 1.5, TRUE)," in bigquery
+    assert "    (4, 'two\\nlines', 2e3, TRUE);" in bigquery
+    mssql = generate_sql(insert_csv, schema_data=INSERT_SCHEMA, flavor="mssql", insert_data=True)
+    assert "    (1, N'O''Hara', 1.5, 1)," in mssql
+    oracle = generate_sql(insert_csv, schema_data=INSERT_SCHEMA, flavor="oracle", insert_data=True)
+    assert oracle.count("INSERT ALL\n") == 1
+    assert oracle.count('    INTO "tbl_people" ("id", "name", "score", "active") VALUES (') == 4
+    assert oracle.endswith("\nSELECT 1 FROM DUAL;\n")
+
+
+def test_generate_sql_insert_batches_by_bytes(insert_csv):
+    sql = generate_sql(
+        insert_csv, schema_data=INSERT_SCHEMA, flavor="postgres", insert_data=True, insert_batch_bytes=40
+    )
+    statements = sql.split("VALUES\n")[1:]
+    # Each row fits in the budget but no two do; a larger row still gets its own statement
+    assert len(statements) == 4
+    assert all(statement.count("\n    (") == 0 for statement in statements)
+
+
+def test_write_sql_streams_same_script(insert_csv, tmp_path):
+    out = tmp_path / "people.sql"
+    write_sql(out, insert_csv, schema_data=INSERT_SCHEMA, flavor="duckdb", insert_data=True, insert_batch_rows=2)
+    expected = generate_sql(
+        insert_csv, schema_data=INSERT_SCHEMA, flavor="duckdb", insert_data=True, insert_batch_rows=2
+    )
+    # The scripts differ only by the generation date in the header
+    assert out.read_text(encoding="utf-8").splitlines()[4:] == expected.splitlines()[4:]
+
+    with open(insert_csv, "a", encoding="utf-8") as f:
+        f.write("5,too,many,values,here\n")
+    with pytest.raises(ValueError, match="Row 5 "):
+        write_sql(out, insert_csv, schema_data=INSERT_SCHEMA, flavor="duckdb", insert_data=True)
+    assert not out.exists()
+
+
 def test_generate_sql_static_new_flavors():
     schema_data = {
         "properties": {
@@ -631,3 +747,147 @@ def test_get_pyreadstat_reader():
 
     with pytest.raises(ValueError, match="Unsupported file extension"):
         get_pyreadstat_reader(".txt")
+
+
+def _fake_profiling_qsv(monkeypatch, barrier=None, concurrent=("stats", "count")):
+    """Fake qsv for a CSV with a low-cardinality column `a` and a unique column `b`."""
+    import json
+    import threading
+
+    import dartfx.qsv.cmd as qsv_cmd
+
+    calls = []
+    lock = threading.Lock()
+
+    def run(command, args, **_kwargs):
+        with lock:
+            calls.append((command, args))
+        if command in concurrent and barrier is not None:
+            barrier.wait()  # fails unless both commands run at the same time
+        if command == "stats":
+            return "field,type,nullcount,cardinality\na,String,0,2\nb,Integer,0,30\n"
+        if command == "schema":
+            return json.dumps({"properties": {"a": {"type": ["string"]}, "b": {"type": ["integer"]}}})
+        if command == "frequency":
+            selected = args[args.index("--select") + 1].split(",")
+            fields = [
+                {"field": f, "type": "String", "cardinality": 2, "nullcount": 0, "frequencies": []} for f in selected
+            ]
+            return json.dumps({"input": args[-1], "rowcount": 30, "fieldcount": len(fields), "fields": fields})
+        if command == "count":
+            return "30"
+        return "qsv 1.0.0"
+
+    monkeypatch.setattr(qsv_cmd, "_run_qsv_command", run)
+    return calls
+
+
+@pytest.fixture
+def profile_csv(tmp_path):
+    path = tmp_path / "data.csv"
+    path.write_text("a,b\n" + "".join(f"{'xy'[i % 2]},{i}\n" for i in range(30)))
+    return str(path)
+
+
+def test_generate_ddi_codebook_runs_stats_and_count_concurrently(monkeypatch, profile_csv):
+    import threading
+
+    calls = _fake_profiling_qsv(monkeypatch, threading.Barrier(2, timeout=5))
+    xml = generate_ddi_codebook(csv_path=profile_csv)
+    assert "<caseQnty>30</caseQnty>" in xml
+    assert [args[1] for command, args in calls if command == "frequency"] == ["a"]
+    # Without a stats cache, schema waits for the stats run that writes it
+    commands = [command for command, _ in calls]
+    assert commands.index("stats") < commands.index("schema")
+    assert calls[commands.index("stats")][1][:4] == [
+        "--infer-dates",
+        "--infer-boolean",
+        "--stats-jsonl",
+        "--cache-threshold",
+    ]
+
+
+def test_generate_ddi_codebook_speculative_frequency(monkeypatch, profile_csv):
+    import threading
+
+    calls = _fake_profiling_qsv(monkeypatch, threading.Barrier(2, timeout=5), concurrent=("stats", "frequency"))
+    generate_ddi_codebook(csv_path=profile_csv, speculative_frequency=True, categorical_threshold=5)
+    # `a` was guessed from the first rows, so frequency ran once, alongside stats
+    assert [args[1] for command, args in calls if command == "frequency"] == ["a"]
+
+
+def test_generate_sql_runs_schema_after_stats(monkeypatch, profile_csv):
+    calls = _fake_profiling_qsv(monkeypatch)
+    sql = generate_sql(csv_path=profile_csv, flavor="sqlite")
+    assert "CREATE TABLE" in sql
+    assert [command for command, _ in calls] == ["stats", "schema"]
+
+
+def _write_stats_cache(csv_path, **flags):
+    import json
+
+    stem = os.path.splitext(csv_path)[0]
+    with open(f"{stem}.stats.csv.data.jsonl", "w") as f:
+        f.write('{"field":"a","type":"String","nullcount":0,"cardinality":2}\n')
+        f.write('{"field":"b","type":"Integer","nullcount":0,"cardinality":30}\n')
+    args = {"flag_infer_dates": True, "flag_infer_boolean": True, "filesize_bytes": os.path.getsize(csv_path)}
+    with open(f"{stem}.stats.csv.json", "w") as f:
+        json.dump({**args, **flags}, f)
+
+
+def test_generators_reuse_fresh_stats_cache(monkeypatch, profile_csv):
+    import threading
+
+    _write_stats_cache(profile_csv)
+    calls = _fake_profiling_qsv(monkeypatch, threading.Barrier(2, timeout=5), concurrent=("schema", "count"))
+    xml = generate_ddi_codebook(csv_path=profile_csv)
+    assert 'otherType="cardinality">30<' in xml
+    sql_calls = _fake_profiling_qsv(monkeypatch)
+    sql = generate_sql(csv_path=profile_csv, flavor="sqlite")
+    assert "CREATE TABLE" in sql
+    assert "stats" not in [command for command, _ in calls + sql_calls]
+
+
+def test_generate_sql_runs_schema_alongside_cached_stats(monkeypatch, profile_csv):
+    import threading
+
+    from dartfx.qsv import utils
+
+    _write_stats_cache(profile_csv)
+    barrier = threading.Barrier(2, timeout=5)
+    calls = _fake_profiling_qsv(monkeypatch, barrier, concurrent=("schema",))
+    run_stats = utils._run_stats
+
+    def read_stats_cache(csv_path):
+        barrier.wait()  # fails unless schema runs at the same time
+        return run_stats(csv_path)
+
+    monkeypatch.setattr(utils, "_run_stats", read_stats_cache)
+    assert "CREATE TABLE" in generate_sql(csv_path=profile_csv, flavor="sqlite")
+    assert [command for command, _ in calls] == ["schema"]
+
+
+def test_generators_ignore_stale_stats_cache(monkeypatch, profile_csv):
+    _write_stats_cache(profile_csv, flag_infer_boolean=False)
+    calls = _fake_profiling_qsv(monkeypatch)
+    generate_sql(csv_path=profile_csv, flavor="sqlite")
+    _write_stats_cache(profile_csv)
+    with open(profile_csv, "a") as f:
+        f.write("x,30\n")
+    generate_sql(csv_path=profile_csv, flavor="sqlite")
+    assert [command for command, _ in calls] == ["stats", "schema", "stats", "schema"]
+
+
+def test_profile_once_serves_every_generator(monkeypatch, profile_csv):
+    calls = _fake_profiling_qsv(monkeypatch)
+    profile = profile_once(profile_csv)
+    assert profile.categorical_columns == ["a"]
+    assert profile.rowcount == 30
+    profiled = list(calls)
+    for version in ("2.5", "2.6"):
+        xml_str = generate_ddi_codebook(version=version, profile=profile)
+        assert f'version="{version}"' in xml_str
+        assert "<titl>data.csv</titl>" in xml_str
+    for flavor in ("postgres", "sqlite", "duckdb"):
+        assert '"tbl_data"' in generate_sql(flavor=flavor, profile=profile)
+    assert calls == profiled